@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import itertools
+import math
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+
+# 숫자가 작을수록 먼저 처리 (주문 확정/변경 > 일반 대화)
+PRIORITY_ORDER = 0
+PRIORITY_CHAT = 1
+PRIORITY_NAMES = {PRIORITY_ORDER: "order", PRIORITY_CHAT: "chat"}
+
+_priority: ContextVar[Optional[int]] = ContextVar("llm_priority", default=None)
+
+
+@contextmanager
+def priority_class(priority: int) -> Iterator[None]:
+    """Run LLM calls made in this block (and tasks created from it) with the given priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority(is_summary: bool = False) -> int:
+    """
+    Priority of the current LLM call: the enclosing priority_class, otherwise order summaries
+    (confirmation via chat, speculative summaries) rank as orders and everything else as chat.
+    """
+    priority = _priority.get()
+    if priority is not None:
+        return priority
+    return PRIORITY_ORDER if is_summary else PRIORITY_CHAT
+
+
+class AdmissionRejected(HTTPException):
+    """429 raised when an LLM call is not admitted (queue full, queue timeout or load shedding)."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(
+            status_code=429,
+            detail="요청이 많아 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        self.reason = reason
+
+
+class ProviderLimiter:
+    """
+    Priority semaphore for one provider: at most `limit` calls in flight, the rest wait in a
+    bounded queue ordered by (priority, arrival). When the queue is full a higher-priority
+    arrival evicts the newest lowest-priority waiter instead of being rejected itself.
+    """
+
+    def __init__(self, provider: str, limit: int, max_queue: int) -> None:
+        self.provider = provider
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.in_flight = 0
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        # 슬롯 점유 시간의 지수 이동 평균 (Retry-After 추정용)
+        self._hold_seconds = 1.0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return AdmissionRejected(reason, self.retry_after())
+
+    def retry_after(self) -> float:
+        return (len(self._waiters) + 1) / self.limit * self._hold_seconds
+
+    def saturated(self, priority: int) -> bool:
+        """True when a new call of this priority would be rejected right away."""
+        if self.in_flight < self.limit or len(self._waiters) < self.max_queue:
+            return False
+        return not self._waiters or self._waiters[-1][0] <= priority
+
+    async def acquire(self, priority: int, timeout: float) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            if not self._waiters or self._waiters[-1][0] <= priority:
+                raise self._reject("queueFull")
+            _, _, evicted = self._waiters.pop()
+            evicted.set_exception(self._reject("evicted"))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), future)
+        bisect.insort(self._waiters, entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout if timeout > 0 else None)
+        except asyncio.TimeoutError:
+            self._discard(entry)
+            raise self._reject("timeout") from None
+        except asyncio.CancelledError:
+            self._discard(entry)
+            raise
+        self.admitted += 1
+
+    def _discard(self, entry: tuple) -> None:
+        future = entry[2]
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+        elif future.done() and not future.cancelled() and future.exception() is None:
+            # 취소/타임아웃 직전에 슬롯을 넘겨받았다면 다음 대기자에게 돌려줌
+            self.release()
+
+    def release(self, held_seconds: Optional[float] = None) -> None:
+        if held_seconds is not None:
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held_seconds
+        while self._waiters:
+            _, _, future = self._waiters.pop(0)
+            if not future.done():
+                # 슬롯을 그대로 다음 대기자에게 넘김 (in_flight 유지)
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        queued: Dict[str, int] = {}
+        for priority, _, _ in self._waiters:
+            name = PRIORITY_NAMES.get(priority, str(priority))
+            queued[name] = queued.get(name, 0) + 1
+        return {
+            "limit": self.limit,
+            "inFlight": self.in_flight,
+            "queued": queued,
+            "maxQueue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "avgHoldMs": round(self._hold_seconds * 1000, 1),
+        }
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a short sleep (smoothed), i.e. CPU saturation."""
+
+    def __init__(self, interval_ms: float) -> None:
+        self.interval = max(10.0, interval_ms) / 1000
+        self.lag_ms = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - started - self.interval) * 1000)
+            # 한 번의 일시적 멈춤(지연 import 등)이 아니라 지속적인 지연에만 반응하도록 평활화
+            self.lag_ms = 0.7 * self.lag_ms + 0.3 * lag_ms
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+class AdmissionController:
+    """
+    Admission control in front of every provider call: per-provider concurrency limits with
+    a bounded priority queue, and shedding of chat-priority calls while the event loop lags.
+    """
+
+    def __init__(self) -> None:
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lag = LoopLagMonitor(settings.VOICE_ORDER_ADMISSION_LAG_INTERVAL_MS)
+        self.shed = 0
+
+    def start(self) -> None:
+        if settings.VOICE_ORDER_ADMISSION_ENABLED and settings.VOICE_ORDER_ADMISSION_MAX_LOOP_LAG_MS > 0:
+            self._lag.start()
+
+    async def close(self) -> None:
+        await self._lag.close()
+
+    def _limit(self, provider: str) -> int:
+        # VOICE_ORDER_ADMISSION_PROVIDER_LIMITS="huggingface=8,openai=64"
+        for entry in (settings.VOICE_ORDER_ADMISSION_PROVIDER_LIMITS or "").split(","):
+            name, _, value = entry.partition("=")
+            if name.strip().lower() == provider and value.strip().isdigit():
+                return int(value)
+        return settings.VOICE_ORDER_ADMISSION_MAX_CONCURRENCY
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            limiter = self._limiters[provider] = ProviderLimiter(
+                provider,
+                self._limit(provider),
+                settings.VOICE_ORDER_ADMISSION_MAX_QUEUE,
+            )
+        return limiter
+
+    def _shedding(self, priority: int) -> bool:
+        max_lag = settings.VOICE_ORDER_ADMISSION_MAX_LOOP_LAG_MS
+        return priority != PRIORITY_ORDER and max_lag > 0 and self._lag.lag_ms > max_lag
+
+    def _shed(self) -> AdmissionRejected:
+        self.shed += 1
+        return AdmissionRejected("loopLag", 1)
+
+    def precheck(self, providers: List[str], priority: int) -> None:
+        """Reject up front (before a streaming response starts) when no provider would admit the call."""
+        if not settings.VOICE_ORDER_ADMISSION_ENABLED:
+            return
+        if self._shedding(priority):
+            raise self._shed()
+        limiters = [self.limiter(provider) for provider in providers]
+        if limiters and all(limiter.saturated(priority) for limiter in limiters):
+            raise limiters[0]._reject("queueFull")
+
+    @asynccontextmanager
+    async def slot(self, provider: str, priority: int) -> AsyncIterator[None]:
+        if not settings.VOICE_ORDER_ADMISSION_ENABLED:
+            yield
+            return
+        if self._shedding(priority):
+            raise self._shed()
+        limiter = self.limiter(provider)
+        await limiter.acquire(priority, settings.VOICE_ORDER_ADMISSION_QUEUE_TIMEOUT_SECONDS)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            yield
+        finally:
+            limiter.release(loop.time() - started)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.VOICE_ORDER_ADMISSION_ENABLED,
+            "providers": {name: limiter.stats() for name, limiter in self._limiters.items()},
+            "loopLagMs": round(self._lag.lag_ms, 1),
+            "maxLoopLagMs": settings.VOICE_ORDER_ADMISSION_MAX_LOOP_LAG_MS,
+            "shed": self.shed,
+        }
+
+
+_admission_controller = AdmissionController()
+
+
+def get_admission_controller() -> AdmissionController:
+    return _admission_controller
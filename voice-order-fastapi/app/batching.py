@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+
+class BatchScheduler:
+    """
+    Collects concurrent requests and runs them as batches on a single worker.
+
+    Requests are grouped by key (e.g. generation parameters); only requests with the same key
+    share a batch. A batch is dispatched when max_batch_size requests are gathered or
+    max_wait_ms has passed since the first one arrived. run_batch(key, items) is a blocking
+    function executed in the thread pool and must return one result per item, in order.
+    Requests arriving while a batch is running are gathered for the next one.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[Hashable, List[Any]], Sequence[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+    ) -> None:
+        self._run_batch = run_batch
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._work())
+        return self._queue
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((key, item, future))
+        return await future
+
+    async def _gather(self) -> Dict[Hashable, List[Tuple[Any, asyncio.Future]]]:
+        loop = asyncio.get_running_loop()
+        key, item, future = await self._queue.get()
+        groups: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {key: [(item, future)]}
+        deadline = loop.time() + self._max_wait
+        while len(groups[key]) < self._max_batch_size:
+            timeout = deadline - loop.time()
+            try:
+                if timeout > 0:
+                    next_key, next_item, next_future = await asyncio.wait_for(self._queue.get(), timeout)
+                else:
+                    next_key, next_item, next_future = self._queue.get_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            groups.setdefault(next_key, []).append((next_item, next_future))
+        return groups
+
+    async def _work(self) -> None:
+        while True:
+            groups = await self._gather()
+            for key, entries in groups.items():
+                # 대기 중 취소된 요청은 배치에서 제외
+                entries = [(item, future) for item, future in entries if not future.done()]
+                for start in range(0, len(entries), self._max_batch_size):
+                    await self._dispatch(key, entries[start:start + self._max_batch_size])
+
+    async def _dispatch(self, key: Hashable, entries: List[Tuple[Any, asyncio.Future]]) -> None:
+        if not entries:
+            return
+        items = [item for item, _ in entries]
+        try:
+            results = await run_in_threadpool(self._run_batch, key, items)
+            if len(results) != len(items):
+                raise RuntimeError("배치 결과 개수가 요청 개수와 다릅니다.")
+        except Exception as exc:  # noqa: BLE001
+            for _, future in entries:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        self.batches += 1
+        self.items += len(items)
+        for (_, future), result in zip(entries, results):
+            if not future.done():
+                future.set_result(result)
@@ -18,6 +18,9 @@ DEFAULT_ENV_PATHS = [
     BASE_DIR / ".env",
     BASE_DIR.parent / ".env",
 ]
+# VOICE_ORDER_ENV_FILE로 다른 .env 파일을 지정 (벤치마크처럼 기본 .env 대신 별도 설정으로 띄울 때)
+if os.getenv("VOICE_ORDER_ENV_FILE"):
+    DEFAULT_ENV_PATHS = [Path(os.environ["VOICE_ORDER_ENV_FILE"]).expanduser()]
 
 # .env 파일 로드 (여러 경로 확인)
 for env_path in DEFAULT_ENV_PATHS:
@@ -46,16 +49,70 @@ class Settings(BaseSettings):
     VOICE_ORDER_HF_MAX_TOKENS: int = Field(default=256)
     VOICE_ORDER_HF_TEMPERATURE: float = Field(default=0.6)
     VOICE_ORDER_HF_TOP_P: float = Field(default=0.9)
+    # Hugging Face 호출용 공유 HTTP 커넥션 풀
+    VOICE_ORDER_HF_MAX_CONNECTIONS: int = 100
+    VOICE_ORDER_HF_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    VOICE_ORDER_HF_KEEPALIVE_EXPIRY: float = 30.0
+    VOICE_ORDER_HF_HTTP2: bool = False
+    VOICE_ORDER_HF_CONNECT_TIMEOUT: float = 5.0
+    VOICE_ORDER_HF_READ_TIMEOUT: float = 60.0
+    VOICE_ORDER_HF_WRITE_TIMEOUT: float = 10.0
+    VOICE_ORDER_HF_POOL_TIMEOUT: float = 5.0
     # Local finetune (transformers+peft) 옵션
     VOICE_ORDER_LOCAL_MODEL: Optional[str] = None  # base HF id 또는 로컬 경로
     VOICE_ORDER_LOCAL_ADAPTER: Optional[str] = None  # LoRA 어댑터 경로
     VOICE_ORDER_LOCAL_MAX_NEW_TOKENS: int = Field(default=256)
     VOICE_ORDER_LOCAL_TEMPERATURE: float = Field(default=0.6)
     VOICE_ORDER_LOCAL_TOP_P: float = Field(default=0.9)
+    # 동시 요청을 모아 한 번의 generate로 처리 (왼쪽 패딩 배치)
+    VOICE_ORDER_LOCAL_BATCH_MAX_SIZE: int = 8
+    VOICE_ORDER_LOCAL_BATCH_WAIT_MS: float = 20.0
+    # 시스템 프롬프트의 KV 캐시를 한 번만 계산해 재사용
+    VOICE_ORDER_LOCAL_PREFIX_CACHE: bool = True
+    # 스트리밍 생성에서 다음 토큰을 기다리는 최대 시간(초): 생성 스레드가 멈추면 스트림을 실패로 끝냄
+    VOICE_ORDER_LOCAL_STREAM_TIMEOUT_SECONDS: float = 60.0
 
     VOICE_ORDER_LLM_PROVIDER: str = Field(default="openai")
+    # 보조 제공자 (openai | huggingface | local). 주 제공자가 느리면 헤지 요청, 실패하면 대체 호출
+    VOICE_ORDER_LLM_FALLBACK_PROVIDER: Optional[str] = None
+    # 헤지 지연 = 최근 응답 시간의 백분위수 (표본이 부족하면 기본값), 최소/최대 범위로 제한
+    VOICE_ORDER_HEDGE_ENABLED: bool = True  # False면 실패/차단 시에만 보조 제공자 사용
+    VOICE_ORDER_HEDGE_PERCENTILE: float = 95.0
+    VOICE_ORDER_HEDGE_DELAY_MS: float = 2000.0
+    VOICE_ORDER_HEDGE_MIN_DELAY_MS: float = 300.0
+    VOICE_ORDER_HEDGE_MAX_DELAY_MS: float = 10000.0
+    VOICE_ORDER_HEDGE_WINDOW: int = 200
+    VOICE_ORDER_HEDGE_MIN_SAMPLES: int = 20
+    # 연속 실패 시 제공자를 잠시 제외하는 서킷 브레이커
+    VOICE_ORDER_BREAKER_FAILURE_THRESHOLD: int = 5
+    VOICE_ORDER_BREAKER_COOLDOWN_SECONDS: float = 30.0
+    # LLM 호출 승인 제어: 제공자별 동시 호출 상한과 우선순위 대기열 (주문 확정/변경 > 일반 대화)
+    VOICE_ORDER_ADMISSION_ENABLED: bool = True
+    VOICE_ORDER_ADMISSION_MAX_CONCURRENCY: int = 32
+    VOICE_ORDER_ADMISSION_PROVIDER_LIMITS: Optional[str] = None  # 예: "huggingface=8,openai=64"
+    VOICE_ORDER_ADMISSION_MAX_QUEUE: int = 64  # 가득 차면 429 (낮은 우선순위 대기자를 먼저 밀어냄)
+    VOICE_ORDER_ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    # 이벤트 루프 지연이 기준을 넘으면 일반 대화 요청을 즉시 거절 (0이면 비활성화)
+    VOICE_ORDER_ADMISSION_MAX_LOOP_LAG_MS: float = 200.0
+    VOICE_ORDER_ADMISSION_LAG_INTERVAL_MS: float = 100.0
+    # 요청별 구간 시간: Server-Timing 헤더, 기준(ms) 이상 걸린 요청은 JSON 한 줄로 기록 (0이면 비활성화)
+    VOICE_ORDER_SERVER_TIMING_ENABLED: bool = True
+    VOICE_ORDER_SLOW_REQUEST_MS: float = 3000.0
+    # /admin/* 엔드포인트용 토큰 (X-Admin-Token 헤더). 없으면 관리자 엔드포인트 비활성화
+    VOICE_ORDER_ADMIN_TOKEN: Optional[str] = Field(default=None, repr=False)
+    VOICE_ORDER_PROFILE_MAX_SECONDS: float = 60.0
+    # 실제 대화/제공자 응답 녹화 (bench.replay 재생용, 기본 비활성화)
+    VOICE_ORDER_RECORDING_ENABLED: bool = False
+    VOICE_ORDER_RECORDING_DIR: Optional[str] = None  # 기본값: app/data/recordings
+    VOICE_ORDER_RECORDING_SCRUB_PII: bool = True  # 이름/주소/전화번호/이메일/카드번호를 가짜 값으로 치환
     OPENAI_API_KEY: Optional[str] = Field(default=None, repr=False)
     VOICE_ORDER_CHAT_MODEL: str = Field(default="gpt-4o-mini")
+    # AsyncOpenAI 커넥션 풀 (동시 호출 수는 스레드가 아닌 소켓 수로 제한)
+    VOICE_ORDER_OPENAI_MAX_CONNECTIONS: int = 200
+    VOICE_ORDER_OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 40
+    VOICE_ORDER_OPENAI_TIMEOUT: float = 60.0
+    VOICE_ORDER_OPENAI_CONNECT_TIMEOUT: float = 5.0
+    VOICE_ORDER_OPENAI_MAX_RETRIES: int = 2
     VOICE_ORDER_HF_ENDPOINT: str = Field(
         default="https://router.huggingface.co/v1/chat/completions"
     )
@@ -74,12 +131,70 @@ class Settings(BaseSettings):
     VOICE_ORDER_SUMMARY_TEMPERATURE: float = 0.1
     VOICE_ORDER_SUMMARY_MAX_TOKENS: int = 512
     VOICE_ORDER_SUMMARY_TOP_P: float = 0.95
+    # 요약을 JSON 스키마 구조화 출력(response_format)으로 받음 (openai/huggingface). false면 기존 key = value 텍스트 형식
+    VOICE_ORDER_SUMMARY_STRUCTURED_OUTPUT: bool = True
+    VOICE_ORDER_SUMMARY_JSON_MAX_TOKENS: int = 512  # 여러 메뉴·구성 변경이 있는 주문도 잘리지 않도록 텍스트 형식과 같은 한도
 
     VOICE_ORDER_MENU_DATA_DIR: Optional[str] = None
+    # 메뉴 CSV 변경 감지 주기(초). 0이면 재시작 전까지 다시 읽지 않음
+    VOICE_ORDER_CATALOG_RELOAD_SECONDS: float = 2.0
     VOICE_ORDER_ORDER_DIR: Optional[str] = None
+    VOICE_ORDER_ORDER_STORE: str = Field(default="sqlite", description="sqlite | json")
+    VOICE_ORDER_ORDER_DB_PATH: Optional[str] = None  # 기본값: <주문 디렉터리>/orders.sqlite3
+    # 주문 저장 전용 writer 작업의 그룹 커밋 설정
+    VOICE_ORDER_ORDER_WRITER_MAX_BATCH: int = 64
+    VOICE_ORDER_ORDER_WRITER_LINGER_MS: float = 2.0
     VOICE_ORDER_ASSUMED_DELIVERY_DATE: str = "2025-12-08"
+    # 메뉴/스타일/가격 질문은 LLM 호출 없이 카탈로그로 답변
+    VOICE_ORDER_INTENT_ROUTER_ENABLED: bool = True
+    VOICE_ORDER_INTENT_MAX_CHARS: int = 60
+    # 규칙 기반 주문 추출 신뢰도가 기준 이상이면 요약용 LLM 호출을 생략
+    VOICE_ORDER_EXTRACTOR_ENABLED: bool = True
+    VOICE_ORDER_EXTRACTOR_MIN_CONFIDENCE: float = 0.8
+    # 주문 재확인 턴에서 요약을 미리 시작해 확정 시 재사용
+    VOICE_ORDER_SPECULATIVE_SUMMARY_ENABLED: bool = True
+    VOICE_ORDER_SPECULATIVE_SUMMARY_MAX_ENTRIES: int = 256
+    VOICE_ORDER_SPECULATIVE_SUMMARY_TTL_SECONDS: int = 600
 
+    # 긴 대화 압축: 시스템 프롬프트를 제외한 대화가 예산(토큰)을 넘으면 최근 N개 메시지만 남기고 주문 상태로 요약
+    VOICE_ORDER_HISTORY_TOKEN_BUDGET: int = 2000  # 0이면 비활성화
+    VOICE_ORDER_HISTORY_KEEP_TURNS: int = 6
+    VOICE_ORDER_SUMMARY_HISTORY_TOKEN_BUDGET: int = 0  # 주문 요약 프롬프트에도 적용 (0이면 전체 대화 사용)
+    VOICE_ORDER_TOKENIZER_FILE: Optional[str] = None  # 토큰 계산용 tokenizer.json (없으면 추정치)
+
+    VOICE_ORDER_STT_PROVIDER: str = "openai"  # openai | echo (테스트용 로컬 대체 엔진)
     VOICE_ORDER_STT_MODEL: str = Field(default="whisper-1")
+    # 업로드 오디오 제한 (nginx client_max_body_size 10M과 맞춤)
+    VOICE_ORDER_STT_MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    # 이 크기를 넘으면 메모리 대신 디스크로 넘김
+    VOICE_ORDER_STT_SPOOL_MAX_BYTES: int = 1024 * 1024
+    VOICE_ORDER_STT_CHUNK_BYTES: int = 64 * 1024
+    # 프로세스 전체에서 동시에 처리 중인 오디오 바이트 상한
+    VOICE_ORDER_STT_MAX_INFLIGHT_BYTES: int = 64 * 1024 * 1024
+    # STT 전 오디오 전처리 (모노/16kHz 변환, 앞뒤 무음 제거, Opus 재인코딩; pip install av numpy)
+    VOICE_ORDER_STT_PREPROCESS: bool = False
+    VOICE_ORDER_STT_VAD_THRESHOLD_DBFS: float = -45.0
+    VOICE_ORDER_STT_VAD_PADDING_MS: int = 200
+    VOICE_ORDER_STT_OPUS_BITRATE: int = 24000
+    # 전처리로 디코딩할 최대 길이: 디코딩 버퍼(16kHz int16)를 위 바이트 상한에서 미리 예약하며, 더 길면 원본 전송
+    VOICE_ORDER_STT_PREPROCESS_MAX_SECONDS: float = 60.0
+    # 실시간 음성 WebSocket: 부분 인식 주기와 발화 종료로 볼 무음 길이 (pcm16 입력)
+    VOICE_ORDER_REALTIME_PARTIAL_INTERVAL_MS: int = 1000
+    VOICE_ORDER_REALTIME_EOU_SILENCE_MS: int = 700
+    # pcm16 부분 인식은 새로 들어온 구간만 보내며, 경계에서 단어가 잘리지 않도록 앞 구간과 겹치게 보낼 길이
+    VOICE_ORDER_REALTIME_PARTIAL_OVERLAP_MS: int = 300
+    # webm은 구간만 잘라 디코딩할 수 없어 부분 인식마다 발화 전체를 다시 보내므로 기본 비활성화
+    VOICE_ORDER_REALTIME_WEBM_PARTIALS: bool = False
+
+    # 서버 측 대화 세션 (LRU + TTL)
+    VOICE_ORDER_SESSION_MAX_ENTRIES: int = 1000
+    VOICE_ORDER_SESSION_TTL_SECONDS: int = 1800
+
+    # 반복되는 대화 초반 응답 캐시 (기본 비활성화)
+    VOICE_ORDER_RESPONSE_CACHE_ENABLED: bool = False
+    VOICE_ORDER_RESPONSE_CACHE_MAX_ENTRIES: int = 512
+    VOICE_ORDER_RESPONSE_CACHE_TTL_SECONDS: int = 3600
+    VOICE_ORDER_RESPONSE_CACHE_MAX_USER_TURNS: int = 2
 
     class Config:
         env_file = ".env"  # .env 파일 명시적으로 지정
@@ -104,6 +219,49 @@ class Settings(BaseSettings):
         return self.VOICE_ORDER_SUMMARY_HF_MODEL or self.VOICE_ORDER_HF_MODEL
 
 
+def apply_model_preset(settings: Settings, preset: Optional[str]) -> None:
+    """Set provider/endpoint/model defaults for a preset (openai | hf_base | hf_finetune | local_finetune)."""
+    preset = (preset or "").strip().lower()
+    if preset == "openai":
+        settings.VOICE_ORDER_LLM_PROVIDER = "openai"
+        # VOICE_ORDER_CHAT_MODEL/env 값이 있으면 그대로, 없으면 기본 유지
+        settings.VOICE_ORDER_SUMMARY_MODEL = settings.VOICE_ORDER_SUMMARY_MODEL or settings.VOICE_ORDER_CHAT_MODEL
+    elif preset == "hf_base":
+        settings.VOICE_ORDER_LLM_PROVIDER = "huggingface"
+        settings.VOICE_ORDER_HF_ENDPOINT = (
+            settings.VOICE_ORDER_HF_BASE_ENDPOINT
+            or settings.VOICE_ORDER_HF_ENDPOINT
+            or "https://router.huggingface.co/v1/chat/completions"
+        )
+        settings.VOICE_ORDER_HF_MODEL = (
+            settings.VOICE_ORDER_HF_BASE_MODEL
+            or settings.VOICE_ORDER_HF_MODEL
+            or "meta-llama/Meta-Llama-3.1-8B-Instruct"
+        )
+        settings.VOICE_ORDER_SUMMARY_HF_MODEL = settings.VOICE_ORDER_SUMMARY_HF_MODEL or settings.VOICE_ORDER_HF_MODEL
+        settings.VOICE_ORDER_SUMMARY_HF_ENDPOINT = settings.VOICE_ORDER_SUMMARY_HF_ENDPOINT or settings.VOICE_ORDER_HF_ENDPOINT
+    elif preset == "hf_finetune":
+        settings.VOICE_ORDER_LLM_PROVIDER = "huggingface"
+        settings.VOICE_ORDER_HF_ENDPOINT = (
+            settings.VOICE_ORDER_HF_FINETUNE_ENDPOINT
+            or settings.VOICE_ORDER_HF_ENDPOINT
+            or "http://localhost:8000/v1/chat/completions"
+        )
+        settings.VOICE_ORDER_HF_MODEL = (
+            settings.VOICE_ORDER_HF_FINETUNE_MODEL
+            or settings.VOICE_ORDER_HF_MODEL
+            or "meta-llama/Meta-Llama-3.1-8B-Instruct"
+        )
+        settings.VOICE_ORDER_SUMMARY_HF_MODEL = settings.VOICE_ORDER_SUMMARY_HF_MODEL or settings.VOICE_ORDER_HF_MODEL
+        settings.VOICE_ORDER_SUMMARY_HF_ENDPOINT = settings.VOICE_ORDER_SUMMARY_HF_ENDPOINT or settings.VOICE_ORDER_HF_ENDPOINT
+    elif preset == "local_finetune":
+        settings.VOICE_ORDER_LLM_PROVIDER = "local"
+        settings.VOICE_ORDER_LOCAL_MODEL = settings.VOICE_ORDER_LOCAL_MODEL or "meta-llama/Meta-Llama-3.1-8B-Instruct"
+        settings.VOICE_ORDER_LOCAL_ADAPTER = settings.VOICE_ORDER_LOCAL_ADAPTER or str(
+            BASE_DIR.parent / "finetuning" / "outputs" / "llama3.1-8b-sft-h100" / "final"
+        )
+
+
 @lru_cache()
 def get_settings() -> Settings:
     settings = Settings()
@@ -117,46 +275,7 @@ def get_settings() -> Settings:
             settings.VOICE_ORDER_CLIENT_ORIGIN = env_origin
 
     # 모델 프리셋에 따라 기본값 자동 설정 (openai | hf_base | hf_finetune)
-    preset = (os.getenv("VOICE_ORDER_MODEL_PRESET") or settings.VOICE_ORDER_MODEL_PRESET or "").strip().lower()
-    if preset:
-        if preset == "openai":
-            settings.VOICE_ORDER_LLM_PROVIDER = "openai"
-            # VOICE_ORDER_CHAT_MODEL/env 값이 있으면 그대로, 없으면 기본 유지
-            settings.VOICE_ORDER_SUMMARY_MODEL = settings.VOICE_ORDER_SUMMARY_MODEL or settings.VOICE_ORDER_CHAT_MODEL
-        elif preset == "hf_base":
-            settings.VOICE_ORDER_LLM_PROVIDER = "huggingface"
-            settings.VOICE_ORDER_HF_ENDPOINT = (
-                settings.VOICE_ORDER_HF_BASE_ENDPOINT
-                or settings.VOICE_ORDER_HF_ENDPOINT
-                or "https://router.huggingface.co/v1/chat/completions"
-            )
-            settings.VOICE_ORDER_HF_MODEL = (
-                settings.VOICE_ORDER_HF_BASE_MODEL
-                or settings.VOICE_ORDER_HF_MODEL
-                or "meta-llama/Meta-Llama-3.1-8B-Instruct"
-            )
-            settings.VOICE_ORDER_SUMMARY_HF_MODEL = settings.VOICE_ORDER_SUMMARY_HF_MODEL or settings.VOICE_ORDER_HF_MODEL
-            settings.VOICE_ORDER_SUMMARY_HF_ENDPOINT = settings.VOICE_ORDER_SUMMARY_HF_ENDPOINT or settings.VOICE_ORDER_HF_ENDPOINT
-        elif preset == "hf_finetune":
-            settings.VOICE_ORDER_LLM_PROVIDER = "huggingface"
-            settings.VOICE_ORDER_HF_ENDPOINT = (
-                settings.VOICE_ORDER_HF_FINETUNE_ENDPOINT
-                or settings.VOICE_ORDER_HF_ENDPOINT
-                or "http://localhost:8000/v1/chat/completions"
-            )
-            settings.VOICE_ORDER_HF_MODEL = (
-                settings.VOICE_ORDER_HF_FINETUNE_MODEL
-                or settings.VOICE_ORDER_HF_MODEL
-                or "meta-llama/Meta-Llama-3.1-8B-Instruct"
-            )
-            settings.VOICE_ORDER_SUMMARY_HF_MODEL = settings.VOICE_ORDER_SUMMARY_HF_MODEL or settings.VOICE_ORDER_HF_MODEL
-            settings.VOICE_ORDER_SUMMARY_HF_ENDPOINT = settings.VOICE_ORDER_SUMMARY_HF_ENDPOINT or settings.VOICE_ORDER_HF_ENDPOINT
-        elif preset == "local_finetune":
-            settings.VOICE_ORDER_LLM_PROVIDER = "local"
-            settings.VOICE_ORDER_LOCAL_MODEL = settings.VOICE_ORDER_LOCAL_MODEL or "meta-llama/Meta-Llama-3.1-8B-Instruct"
-            settings.VOICE_ORDER_LOCAL_ADAPTER = settings.VOICE_ORDER_LOCAL_ADAPTER or str(
-                BASE_DIR.parent / "finetuning" / "outputs" / "llama3.1-8b-sft-h100" / "final"
-            )
+    apply_model_preset(settings, os.getenv("VOICE_ORDER_MODEL_PRESET") or settings.VOICE_ORDER_MODEL_PRESET)
     return settings
 
 
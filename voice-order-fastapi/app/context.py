@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import csv
+import threading
+import time
 from collections import OrderedDict, defaultdict
-from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List, Dict, NamedTuple
+from typing import Iterable, List, Dict, NamedTuple, Optional, Tuple
 
 from app.config import settings, APP_DIR
 
@@ -51,6 +52,9 @@ class CatalogData(NamedTuple):
     styles: List[Dict[str, str]]
 
 
+CATALOG_FILES = ("menus.csv", "menu_items.csv", "styles.csv")
+
+
 def _data_dir() -> Path:
     override_dir = getattr(settings, "VOICE_ORDER_MENU_DATA_DIR", None)
     if override_dir:
@@ -95,37 +99,13 @@ def _extract_menu_key(entry: Dict[str, str], candidate_fields: Iterable[str]) ->
     return ""
 
 
-@lru_cache()
-def _load_all_catalog_data() -> CatalogData:
-    """Load all catalog CSV files once and cache the result."""
-    data_dir = _data_dir()
-    return CatalogData(
-        menus=_parse_catalog_csv(data_dir / "menus.csv"),
-        menu_items=_parse_catalog_csv(data_dir / "menu_items.csv"),
-        styles=_parse_catalog_csv(data_dir / "styles.csv")
-    )
-
-
 def _format_structured_catalog(
     menus: Iterable[Dict[str, str]],
-    menu_items: Iterable[Dict[str, str]],
+    components: Dict[str, List[Dict[str, str]]],
     styles: Iterable[Dict[str, str]],
+    items: Iterable[Dict[str, str]],
 ) -> str:
     # menus.csv now uses the menu 이름 as the primary key, so we normalize by name.
-    components: Dict[str, List[Dict[str, str]]] = defaultdict(list)
-    item_catalog: OrderedDict[str, Dict[str, str]] = OrderedDict()
-
-    for item in menu_items:
-        menu_name = (item.get("menu_name") or item.get("menu") or item.get("menu_id") or "").strip()
-        menu_key = _normalize_menu_key(menu_name)
-        if menu_key:
-            components[menu_key].append(item)
-
-        comp_name = (item.get("item_name") or "").strip()
-        key = comp_name.casefold()
-        if comp_name and key not in item_catalog:
-            item_catalog[key] = item
-
     menu_lines: List[str] = []
     for menu in menus:
         name = (menu.get("name") or "").strip()
@@ -157,7 +137,7 @@ def _format_structured_catalog(
         style_lines.append("- 등록된 스타일 정보가 없습니다.")
 
     item_price_lines: List[str] = []
-    for item in item_catalog.values():
+    for item in items:
         unit_price = item.get("unit_price") or ""
         if not unit_price:
             continue
@@ -179,9 +159,169 @@ def _format_structured_catalog(
     )
 
 
-@lru_cache()
+def _format_menu_item_guide(menus: Iterable[Dict[str, str]], components: Dict[str, List[Dict[str, str]]]) -> str:
+    """menuItems guide for the summary prompt: priced components per menu."""
+    guide_lines = ["For the menuItems line, describe final quantities per component using comma-separated `항목=수량` pairs. Reflect any changes the customer requested. Use these component sets:"]
+
+    for menu in menus:
+        menu_key = _extract_menu_key(menu, ("menu_id", "name"))
+        # Skip non-food items (decorations, napkins, etc.) - only track items with prices
+        priced = [
+            (item.get("item_name") or "").strip()
+            for item in components.get(menu_key, [])
+            if item.get("unit_price")
+        ]
+        if priced:
+            guide_lines.append(f"- {(menu.get('name') or '').strip()}: {', '.join(priced)}")
+
+    guide_lines.append("If multiple 세트가 함께 주문되면 각 세트에 맞는 항목을 모두 포함하고, 언급되지 않은 항목은 `항목=미확인`으로 남기세요.")
+    guide_lines.append("")
+    guide_lines.append("IMPORTANT: When multiple menus are ordered, you must list each menu separately in the orderItems section below.")
+
+    return "\n".join(guide_lines)
+
+
+def _format_style_guide(styles: Iterable[Dict[str, str]]) -> str:
+    """Provide available style names to encourage consistent menuStyle output."""
+    lines = ["Use one of these 서빙 스타일 이름(또는 null) for menuStyle:"]
+    for style in styles:
+        name = style.get("name", "").strip()
+        if not name:
+            continue
+        description = style.get("description", "").strip() or "설명 없음"
+        lines.append(f"- {name}: {description}")
+    return "\n".join(lines)
+
+
+class CompiledCatalog:
+    """
+    Immutable snapshot of the catalog: parsed rows, dict indexes and the prompt strings built
+    from them. A reload builds a new snapshot and swaps the reference, so readers never see
+    a half-updated catalog; derived caches can be keyed on the snapshot itself.
+    """
+
+    __slots__ = (
+        "data",
+        "version",
+        "mtimes",
+        "loaded_at",
+        "menus_by_key",
+        "components_by_menu",
+        "items_by_name",
+        "styles_by_key",
+        "system_prompt",
+        "menu_item_guide",
+        "style_guide",
+    )
+
+    def __init__(self, data: CatalogData, version: int, mtimes: Tuple[Optional[int], ...]) -> None:
+        self.data = data
+        self.version = version
+        self.mtimes = mtimes
+        self.loaded_at = time.time()
+
+        # 메뉴 이름/ID, 구성품 이름, 스타일 이름/ID를 정규화한 키로 색인
+        self.menus_by_key: Dict[str, Dict[str, str]] = {}
+        for menu in data.menus:
+            for field in ("menu_id", "name"):
+                key = _normalize_menu_key(menu.get(field) or "")
+                if key:
+                    self.menus_by_key.setdefault(key, menu)
+
+        components: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        items: OrderedDict[str, Dict[str, str]] = OrderedDict()
+        for item in data.menu_items:
+            menu_key = _extract_menu_key(item, ("menu_name", "menu", "menu_id"))
+            if menu_key:
+                components[menu_key].append(item)
+            item_key = _normalize_menu_key(item.get("item_name") or "")
+            if item_key:
+                items.setdefault(item_key, item)
+        self.components_by_menu: Dict[str, List[Dict[str, str]]] = dict(components)
+        self.items_by_name: Dict[str, Dict[str, str]] = dict(items)
+
+        self.styles_by_key: Dict[str, Dict[str, str]] = {}
+        for style in data.styles:
+            for field in ("style_id", "name"):
+                key = _normalize_menu_key(style.get(field) or "")
+                if key:
+                    self.styles_by_key.setdefault(key, style)
+
+        self.system_prompt = BASE_SYSTEM_PROMPT + _format_structured_catalog(
+            data.menus, self.components_by_menu, data.styles, self.items_by_name.values()
+        )
+        self.menu_item_guide = _format_menu_item_guide(data.menus, self.components_by_menu)
+        self.style_guide = _format_style_guide(data.styles)
+
+    def menu(self, name: str) -> Optional[Dict[str, str]]:
+        return self.menus_by_key.get(_normalize_menu_key(name))
+
+    def components(self, menu_name: str) -> List[Dict[str, str]]:
+        return self.components_by_menu.get(_normalize_menu_key(menu_name), [])
+
+    def item(self, item_name: str) -> Optional[Dict[str, str]]:
+        return self.items_by_name.get(_normalize_menu_key(item_name))
+
+    def style(self, name: str) -> Optional[Dict[str, str]]:
+        return self.styles_by_key.get(_normalize_menu_key(name))
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "loadedAt": self.loaded_at,
+            "menus": len(self.data.menus),
+            "menuItems": len(self.data.menu_items),
+            "styles": len(self.data.styles),
+            "systemPromptChars": len(self.system_prompt),
+        }
+
+
+def _catalog_mtimes(data_dir: Path) -> Tuple[Optional[int], ...]:
+    mtimes = []
+    for name in CATALOG_FILES:
+        try:
+            mtimes.append((data_dir / name).stat().st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+_catalog: CompiledCatalog | None = None
+_catalog_checked_at = 0.0
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> CompiledCatalog:
+    """
+    Current compiled catalog. CSV mtimes are checked at most every
+    VOICE_ORDER_CATALOG_RELOAD_SECONDS (0 disables reloading) and the snapshot is rebuilt
+    when any file changed, so menu edits go live without a restart.
+    """
+    global _catalog, _catalog_checked_at
+    catalog = _catalog
+    interval = settings.VOICE_ORDER_CATALOG_RELOAD_SECONDS
+    now = time.monotonic()
+    if catalog is not None and (interval <= 0 or now - _catalog_checked_at < interval):
+        return catalog
+
+    with _catalog_lock:
+        catalog = _catalog
+        if catalog is not None and (interval <= 0 or now - _catalog_checked_at < interval):
+            return catalog
+        data_dir = _data_dir()
+        mtimes = _catalog_mtimes(data_dir)
+        _catalog_checked_at = now
+        if catalog is not None and catalog.mtimes == mtimes:
+            return catalog
+
+        data = CatalogData(*(_parse_catalog_csv(data_dir / name) for name in CATALOG_FILES))
+        compiled = CompiledCatalog(data, (catalog.version + 1) if catalog else 1, mtimes)
+        if catalog is not None:
+            print(f"✅ 메뉴 카탈로그 다시 로드됨 (v{compiled.version})")
+        _catalog = compiled
+        return compiled
+
+
 def get_system_prompt() -> str:
-    """Get system prompt with all catalog data loaded once and cached."""
-    catalog = _load_all_catalog_data()
-    formatted = _format_structured_catalog(catalog.menus, catalog.menu_items, catalog.styles)
-    return BASE_SYSTEM_PROMPT + formatted
+    """System prompt with the catalog appended; rebuilt only when the catalog is reloaded."""
+    return get_catalog().system_prompt
@@ -35,6 +35,8 @@ INITIAL_LANGUAGE = _load_language_data()["initialLanguage"]
 LANGUAGE_NAMES = _load_language_data()["languageNames"]
 UI_MESSAGES = _load_language_data()["uiMessages"]
 _GREETINGS = _load_language_data()["greetings"]
+# 카탈로그 질문(메뉴/스타일/가격)에 LLM 없이 답할 때 쓰는 언어별 템플릿
+CATALOG_ANSWERS = _load_language_data().get("catalogAnswers", {})
 
 
 def detect_language_code(text: Optional[str]) -> str:
@@ -76,5 +78,18 @@ def greeting_by_language(lang_code: str, customer_name: str) -> str:
     return template.replace("{name}", name)
 
 
+def extract_greeting_name(text: Optional[str]) -> Optional[str]:
+    """Return the customer name if text is exactly one of the greeting templates, else None."""
+    if not text:
+        return None
+    for template in _GREETINGS.values():
+        head, sep, tail = template.partition("{name}")
+        if not sep or len(text) <= len(head) + len(tail):
+            continue
+        if text.startswith(head) and text.endswith(tail):
+            return text[len(head):len(text) - len(tail)]
+    return None
+
+
 def get_ui_text(lang_code: str) -> Dict[str, str]:
     return UI_MESSAGES.get(lang_code, UI_MESSAGES["en-US"])
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from app.config import settings
+from app.order_extractor import extract_order, mentions_customer_details
+from app.schemas import ChatMessage
+
+try:
+    from tokenizers import Tokenizer
+except Exception:  # noqa: BLE001
+    Tokenizer = None
+
+
+# 채팅 포맷의 메시지별 부가 토큰(역할 헤더, 구분자)
+_MESSAGE_OVERHEAD_TOKENS = 4
+_WIDE_CHAR_PATTERN = re.compile(r"[\u1100-\u11ff\u3040-\u30ff\u3130-\u318f\u4e00-\u9fff\uac00-\ud7a3]")
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9]+")
+_SUMMARY_LINE_CHARS = 80
+
+
+class TokenCounter:
+    """Offline token estimate: one token per Hangul/CJK character, ~4 characters per Latin word piece."""
+
+    name = "estimate"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        wide = len(_WIDE_CHAR_PATTERN.findall(text))
+        words = sum((len(word) + 3) // 4 for word in _WORD_PATTERN.findall(text))
+        rest = len(_WIDE_CHAR_PATTERN.sub("", _WORD_PATTERN.sub("", text)).replace(" ", ""))
+        return wide + words + rest
+
+    def count_messages(self, messages: Sequence[ChatMessage]) -> int:
+        return sum(self.count(message.content) + _MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+class TokenizerFileCounter(TokenCounter):
+    """Exact counts from a local tokenizer.json (tokenizers package, no network)."""
+
+    def __init__(self, path: Path) -> None:
+        self.name = str(path)
+        self._tokenizer = Tokenizer.from_file(str(path))
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def _tokenizer_file(provider: str) -> Optional[Path]:
+    if settings.VOICE_ORDER_TOKENIZER_FILE:
+        return Path(settings.VOICE_ORDER_TOKENIZER_FILE).expanduser()
+    if provider == "local" and settings.VOICE_ORDER_LOCAL_MODEL:
+        # HF 모델 id가 아니라 로컬 디렉터리일 때만 사용 (허브 접근 없음)
+        return Path(settings.VOICE_ORDER_LOCAL_MODEL).expanduser() / "tokenizer.json"
+    return None
+
+
+@lru_cache()
+def get_token_counter(provider: str) -> TokenCounter:
+    """Token counter for the provider; falls back to the estimate when no local tokenizer is available."""
+    path = _tokenizer_file(provider)
+    if path is not None and path.is_file() and Tokenizer is not None:
+        try:
+            return TokenizerFileCounter(path)
+        except Exception as e:  # noqa: BLE001
+            print(f"⚠️ 토크나이저 로드 실패, 추정치를 사용합니다: {e}")
+    return TokenCounter()
+
+
+def _shorten(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= _SUMMARY_LINE_CHARS else text[:_SUMMARY_LINE_CHARS - 1] + "…"
+
+
+def build_order_state_note(older: Sequence[ChatMessage], max_tokens: int, counter: TokenCounter) -> str:
+    """
+    Compact order state for folded turns: the fields the extractor could resolve, every customer
+    turn that gave a name or address (the extractor cannot fill those reliably), then the
+    customer's most recent requests from those turns as far as max_tokens allows.
+    """
+    summary = extract_order(older, "", settings.VOICE_ORDER_ASSUMED_DELIVERY_DATE).summary
+    lines = ["Earlier turns were condensed. Order state so far (verify with the customer if unsure):"]
+    if summary.customerName:
+        lines.append(f"- customerName: {summary.customerName}")
+    if summary.customerAddress:
+        lines.append(f"- customerAddress: {summary.customerAddress}")
+    for item in summary.orderItems or []:
+        style = f" / {item.menuStyle}" if item.menuStyle else ""
+        lines.append(f"- menu: {item.menuName}{style} x{item.quantity or 1} ({item.menuItems})")
+    if summary.deliveryTime:
+        lines.append(f"- deliveryTime: {summary.deliveryTime}")
+    if summary.useCoupon is not None or summary.couponCode:
+        lines.append(f"- coupon: {summary.couponCode or ('use' if summary.useCoupon else 'none')}")
+
+    # 이름/주소를 말한 턴은 예산과 관계없이 유지 (잘리지 않도록 원문 그대로)
+    details = [
+        message for message in older
+        if message.role == "user" and mentions_customer_details(message.content)
+    ]
+    if details:
+        lines.append("Customer name/address as given by the customer:")
+        lines.extend(f"- {' '.join(message.content.split())}" for message in details)
+
+    header = "Latest customer requests in those turns:"
+    remaining = max_tokens - counter.count("\n".join([*lines, header]))
+    requests: List[str] = []
+    for message in reversed(older):
+        if message.role != "user" or not message.content.strip() or any(message is detail for detail in details):
+            continue
+        line = f"- {_shorten(message.content)}"
+        cost = counter.count(line)
+        if cost > remaining:
+            break
+        requests.insert(0, line)
+        remaining -= cost
+    if requests:
+        lines.append(header)
+        lines.extend(requests)
+    return "\n".join(lines)
+
+
+def compact_history(
+    messages: Sequence[ChatMessage],
+    *,
+    budget: Optional[int] = None,
+    keep_turns: Optional[int] = None,
+    counter: Optional[TokenCounter] = None,
+) -> List[ChatMessage]:
+    """
+    Keep the leading system prompt and the last keep_turns messages verbatim; once the other
+    messages exceed the token budget, fold them into one order-state system note. The latest
+    system instruction (e.g. a language switch) among the folded turns is carried over.
+    A budget <= 0 disables compaction.
+    """
+    messages = list(messages)
+    budget = settings.VOICE_ORDER_HISTORY_TOKEN_BUDGET if budget is None else budget
+    keep_turns = settings.VOICE_ORDER_HISTORY_KEEP_TURNS if keep_turns is None else keep_turns
+    if budget <= 0:
+        return messages
+    counter = counter or get_token_counter(settings.VOICE_ORDER_LLM_PROVIDER.lower())
+
+    head = messages[:1] if messages and messages[0].role == "system" else []
+    body = messages[len(head):]
+    if counter.count_messages(body) <= budget:
+        return messages
+
+    # 최근 keep_turns개의 user/assistant 메시지(사이의 시스템 메시지 포함)는 그대로 유지
+    split = len(body)
+    kept = 0
+    while split > 0 and kept < keep_turns:
+        split -= 1
+        if body[split].role != "system":
+            kept += 1
+    older, recent = body[:split], body[split:]
+    if not any(message.role != "system" for message in older):
+        return messages
+
+    carried = [message for message in older if message.role == "system"][-1:]
+    allowance = budget - counter.count_messages([*carried, *recent]) - _MESSAGE_OVERHEAD_TOKENS
+    note = ChatMessage(role="system", content=build_order_state_note(older, allowance, counter))
+    return [*head, note, *carried, *recent]
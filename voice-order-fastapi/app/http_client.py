@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import httpx
+
+from app.config import settings
+
+try:
+    import h2  # noqa: F401  # HTTP/2 지원은 선택 사항 (pip install httpx[http2])
+except Exception:  # noqa: BLE001
+    h2 = None
+
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    http2 = settings.VOICE_ORDER_HF_HTTP2
+    if http2 and h2 is None:
+        print("⚠️ VOICE_ORDER_HF_HTTP2가 켜져 있지만 h2 패키지가 없어 HTTP/1.1을 사용합니다.")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=settings.VOICE_ORDER_HF_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.VOICE_ORDER_HF_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.VOICE_ORDER_HF_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        connect=settings.VOICE_ORDER_HF_CONNECT_TIMEOUT,
+        read=settings.VOICE_ORDER_HF_READ_TIMEOUT,
+        write=settings.VOICE_ORDER_HF_WRITE_TIMEOUT,
+        pool=settings.VOICE_ORDER_HF_POOL_TIMEOUT,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the application-scoped pooled HTTP client used for Hugging Face calls.
+    Normally created by the FastAPI lifespan; created lazily when used outside the app.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _build_http_client()
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def get_http_pool_stats() -> dict:
+    """Snapshot of the connection pool (connections by state and queued requests)."""
+    stats = {
+        "open": _http_client is not None and not _http_client.is_closed,
+        "http2": settings.VOICE_ORDER_HF_HTTP2 and h2 is not None,
+        "maxConnections": settings.VOICE_ORDER_HF_MAX_CONNECTIONS,
+        "maxKeepaliveConnections": settings.VOICE_ORDER_HF_MAX_KEEPALIVE_CONNECTIONS,
+        "connections": 0,
+        "idleConnections": 0,
+        "activeConnections": 0,
+        "pendingRequests": 0,
+    }
+    if not stats["open"]:
+        return stats
+
+    # httpx는 풀 상태를 공개 API로 노출하지 않으므로 httpcore 풀을 직접 조회
+    pool = getattr(_http_client._transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for connection in connections if connection.is_idle())
+    stats["connections"] = len(connections)
+    stats["idleConnections"] = idle
+    stats["activeConnections"] = len(connections) - idle
+    stats["pendingRequests"] = len(getattr(pool, "_requests", []) or [])
+    return stats
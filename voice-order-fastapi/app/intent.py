@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import re
+import threading
+from typing import List, Optional, Sequence
+
+from app.config import settings
+from app.context import get_catalog
+from app.conversation import CATALOG_ANSWERS, detect_language_code
+from app.order_extractor import _component_aliases, _extractor_catalog, _flexible_pattern
+from app.schemas import ChatMessage
+
+
+_PRICE_CUES = ("얼마", "가격", "금액", "비용", "how much", "price", "cost", "いくら", "値段", "価格", "料金", "多少钱", "价格", "价钱", "费用")
+_MENU_CUES = ("메뉴", "menu", "メニュー", "菜单")
+_STYLE_CUES = ("스타일", "style", "スタイル", "风格")
+_QUESTION_CUES = (
+    "?", "？", "뭐", "무엇", "어떤", "어떻게", "알려", "종류", "있어", "있나", "보여", "차이", "설명",
+    "what", "which", "list", "options", "difference", "tell me",
+    "何", "どんな", "違い", "什么", "哪些", "区别", "有",
+)
+# 추천 요청은 기념일 확인 등 대화 흐름이 필요하므로 LLM에 맡김
+_RECOMMEND_CUES = ("추천", "recommend", "suggest", "おすすめ", "推荐")
+_ORDER_CUE_PATTERN = re.compile(
+    r"주문|할게|할래|주세요|으로 해|로 해|추가|빼|변경|바꿔|예약|배달|"
+    r"\border\b|i'll take|i will take|i'd like|\badd\b|\bremove\b|\bchange\b|\bdeliver|\bbook\b|"
+    r"注文|ください|お願い|予約|订|点餐|我要|配送",
+    re.IGNORECASE,
+)
+# "알려 주세요"처럼 정보 요청에 붙는 "주세요"는 주문 표현이 아님
+_INFO_REQUEST_PATTERN = re.compile(r"(알려|보여|설명해|말해)\s*주(세요|실래요|시겠어요)")
+# 한국어 템플릿의 "(은)는" 표기는 앞 단어의 받침에 따라 은/는으로 바꿈
+_TOPIC_PARTICLE_PATTERN = re.compile(r"([^\s(]*)(\([^)]*\))?\(은\)는")
+
+
+def _topic_particle(match: re.Match) -> str:
+    word, suffix = match.group(1), match.group(2) or ""
+    # "와인(병)"처럼 괄호가 붙으면 괄호 안 마지막 글자로 판단
+    last = (suffix[1:-1] or word)[-1:]
+    has_final = "\uac00" <= last <= "\ud7a3" and (ord(last) - 0xAC00) % 28 != 0
+    return f"{word}{suffix}{'은' if has_final else '는'}"
+
+
+class IntentRouterStats:
+    def __init__(self) -> None:
+        self.routed: dict[str, int] = {}
+        self.fallthrough = 0
+        self._lock = threading.Lock()
+
+    def record(self, intent: Optional[str]) -> None:
+        with self._lock:
+            if intent is None:
+                self.fallthrough += 1
+            else:
+                self.routed[intent] = self.routed.get(intent, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": settings.VOICE_ORDER_INTENT_ROUTER_ENABLED,
+                "routed": dict(self.routed),
+                "fallthrough": self.fallthrough,
+            }
+
+
+_router_stats = IntentRouterStats()
+
+
+def get_intent_router_stats() -> IntentRouterStats:
+    return _router_stats
+
+
+def _has_any(text: str, cues: Sequence[str]) -> bool:
+    return any(cue in text for cue in cues)
+
+
+def _price(value: Optional[str]) -> Optional[int]:
+    try:
+        return int((value or "").replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _matches(text: str) -> tuple[List[str], List[str], List[str], str]:
+    """Menu, style and component names found in text, plus the text with those names removed."""
+    catalog = _extractor_catalog()
+    stripped = text
+    menus = []
+    for menu in catalog.menus:
+        if menu.pattern.search(stripped):
+            menus.append(menu.name)
+            stripped = menu.pattern.sub(" ", stripped)
+    styles = []
+    for name, pattern in catalog.styles:
+        if pattern.search(stripped):
+            styles.append(name)
+            stripped = pattern.sub(" ", stripped)
+
+    items: List[str] = []
+    names = list(get_catalog().items_by_name.values())
+    # 전체 이름("와인(병)")이 있으면 그것만, 없으면 별칭("와인")으로 찾아 모호하면 여러 개가 남음
+    exact = [item["item_name"] for item in names if item.get("item_name") and item["item_name"] in stripped]
+    if exact:
+        items = exact
+    else:
+        for item in names:
+            item_name = item.get("item_name") or ""
+            aliases = "|".join(_flexible_pattern(alias) for alias in _component_aliases(item_name) if alias)
+            if item_name and aliases and re.search(f"(?:{aliases})", stripped):
+                items.append(item_name)
+    for item_name in items:
+        stripped = stripped.replace(item_name, " ")
+    return menus, styles, items, stripped
+
+
+def _classify(text: str) -> Optional[str]:
+    lowered = text.casefold()
+    if _has_any(lowered, _PRICE_CUES):
+        return "price"
+    if _has_any(lowered, _RECOMMEND_CUES) or not _has_any(lowered, _QUESTION_CUES):
+        return None
+    asks_menus = _has_any(lowered, _MENU_CUES)
+    asks_styles = _has_any(lowered, _STYLE_CUES)
+    if asks_menus == asks_styles:
+        return None
+    return "menuList" if asks_menus else "styleList"
+
+
+def _answer_price(templates: dict, menus: List[str], styles: List[str], items: List[str]) -> Optional[tuple[str, str]]:
+    catalog = get_catalog()
+    currency = templates["currency"]
+
+    def fmt(amount: int) -> str:
+        return currency.format(amount=f"{amount:,}")
+
+    if len(menus) == 1 and len(styles) <= 1:
+        base = _price((catalog.menu(menus[0]) or {}).get("price"))
+        if base is None:
+            return None
+        if styles:
+            surcharge = _price((catalog.style(styles[0]) or {}).get("price"))
+            if surcharge is None:
+                return None
+            text = templates["menuStylePrice"].format(
+                menu=menus[0], style=styles[0], price=fmt(base + surcharge), base=fmt(base), surcharge=fmt(surcharge)
+            )
+            return "menuStylePrice", text
+        surcharges = ", ".join(
+            f"{style['name']} +{fmt(_price(style.get('price')) or 0)}"
+            for style in catalog.data.styles
+            if style.get("name") and _price(style.get("price"))
+        )
+        return "menuPrice", templates["menuPrice"].format(menu=menus[0], price=fmt(base), surcharges=surcharges)
+    if menus:
+        return None
+    if len(styles) == 1 and not items:
+        surcharge = _price((catalog.style(styles[0]) or {}).get("price"))
+        if surcharge is None:
+            return None
+        return "stylePrice", templates["stylePrice"].format(style=styles[0], surcharge=fmt(surcharge))
+    if len(items) == 1 and not styles:
+        unit_price = _price((catalog.item(items[0]) or {}).get("unit_price"))
+        if unit_price is None:
+            return None
+        return "itemPrice", templates["itemPrice"].format(item=items[0], price=fmt(unit_price))
+    return None
+
+
+def _answer_menu_list(templates: dict) -> str:
+    lines = [
+        templates["menuLine"].format(
+            name=menu.get("name", ""),
+            servings=menu.get("servings", ""),
+            description=menu.get("description", ""),
+        )
+        for menu in get_catalog().data.menus
+        if menu.get("name")
+    ]
+    return templates["menuList"].format(menus="\n".join(lines))
+
+
+def _answer_style_list(templates: dict) -> str:
+    lines = [
+        templates["styleLine"].format(
+            name=style.get("name", ""),
+            description=style.get("description", ""),
+            notes=style.get("notes", ""),
+        ).replace(" ()", "").replace("（）", "")
+        for style in get_catalog().data.styles
+        if style.get("name")
+    ]
+    return templates["styleList"].format(styles="\n".join(lines))
+
+
+def _route(text: str) -> Optional[tuple[str, str]]:
+    if len(text) > settings.VOICE_ORDER_INTENT_MAX_CHARS or any(ch.isdigit() for ch in text):
+        return None
+    if _ORDER_CUE_PATTERN.search(_INFO_REQUEST_PATTERN.sub(" ", text)):
+        return None
+    intent = _classify(text)
+    if intent is None:
+        return None
+
+    menus, styles, items, stripped = _matches(text)
+    templates = CATALOG_ANSWERS.get(detect_language_code(stripped))
+    if not templates:
+        return None
+    if intent == "price":
+        return _answer_price(templates, menus, styles, items)
+    if menus:
+        # 특정 메뉴에 대한 질문은 구성 설명/추천이 필요하므로 LLM에 맡김
+        return None
+    if intent == "menuList":
+        return intent, _answer_menu_list(templates)
+    return intent, _answer_style_list(templates)
+
+
+def answer_catalog_question(messages: Sequence[ChatMessage]) -> Optional[str]:
+    """
+    Answer menu list, serving style and price questions straight from the catalog in the
+    customer's language. Returns None (use the LLM) for anything ambiguous: several intents
+    or menus at once, quantities, order/change requests, recommendations or unsupported languages.
+    """
+    if not settings.VOICE_ORDER_INTENT_ROUTER_ENABLED or not messages:
+        return None
+    last = messages[-1]
+    if last.role != "user" or not last.content.strip():
+        return None
+    routed = _route(last.content.strip())
+    _router_stats.record(routed[0] if routed else None)
+    return _TOPIC_PARTICLE_PATTERN.sub(_topic_particle, routed[1]) if routed else None
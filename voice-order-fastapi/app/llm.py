@@ -1,30 +1,51 @@
 from __future__ import annotations
 
-from typing import Iterable, List
-import functools
+from typing import AsyncIterator, Iterable, List
+import copy
+import json
+import queue
 import threading
+import time
 
-import httpx
 from fastapi import HTTPException
-from fastapi.concurrency import run_in_threadpool
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from openai import BadRequestError
 
+from app.admission import current_priority, get_admission_controller
+from app.batching import BatchScheduler
 from app.config import settings
 from app.context import get_system_prompt, BASE_SYSTEM_PROMPT
+from app.conversation import ORDER_CONFIRMATION_TOKEN
+from app.history import compact_history, get_token_counter
+from app.http_client import get_http_client
+from app.intent import answer_catalog_question
+from app.metrics import LLM_IN_FLIGHT, LLM_TTFT_SECONDS, observe_stage, record_tokens
 from app.openai_client import get_openai_client
-from app.order_summary import build_summary_prompt, parse_summary_text
+from app.order_extractor import extract_order
+from app.order_summary import build_summary_prompt, parse_summary_json, parse_summary_text, summary_response_format
+from app.recording import add_usage, get_recorder, track_usage
+from app.response_cache import CacheLookup, build_cache_lookup, get_response_cache, is_cacheable_reply
+from app.routing import get_provider_router
 from app.schemas import ChatMessage, OrderSummary
+from app.timing import timed
 
 try:
     import torch
-    from transformers import AutoModelForCausalLM, AutoTokenizer, GenerationConfig
+    from transformers import AutoModelForCausalLM, AutoTokenizer, GenerationConfig, TextIteratorStreamer
     from peft import PeftModel
 except Exception:  # noqa: BLE001
     torch = None
     AutoModelForCausalLM = None
     AutoTokenizer = None
     GenerationConfig = None
+    TextIteratorStreamer = None
     PeftModel = None
 
+try:
+    from transformers import DynamicCache
+except Exception:  # noqa: BLE001
+    DynamicCache = None
+
 
 def _with_system_prompt(messages: Iterable[ChatMessage]) -> List[ChatMessage]:
     messages = list(messages)
@@ -42,35 +63,94 @@ def _normalize_messages(messages: Iterable[ChatMessage]) -> List[dict]:
     ]
 
 
-async def _call_openai_chat(messages: List[dict], model: str) -> str:
-    client = get_openai_client()
+def _record_usage(provider: str, model: str, messages: List[dict], reply: str, usage: dict | None = None) -> None:
+    """Token counts for metrics: provider-reported usage when present, otherwise the local estimate."""
+    usage = usage or {}
+    input_tokens, output_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+    if input_tokens is None or output_tokens is None:
+        counter = get_token_counter(provider)
+        input_tokens = counter.count_messages([ChatMessage(**message) for message in messages])
+        output_tokens = counter.count(reply)
+    record_tokens(provider, model, input_tokens, output_tokens)
+    add_usage(input_tokens, output_tokens)
 
-    def _create_chat_completion() -> str:
-        completion = client.chat.completions.create(
-            model=model,
-            messages=messages,
-        )
-        choice = completion.choices[0].message.content if completion.choices else None
-        if not choice:
-            raise RuntimeError("OpenAI 응답이 비어 있습니다.")
-        return choice
 
-    return await run_in_threadpool(_create_chat_completion)
+# response_format(json_schema)을 거부한 모델/엔드포인트: 이후 요약은 스키마 없이 JSON 프롬프트만으로 요청
+_structured_output_unsupported: set[str] = set()
 
 
-async def _call_hf_chat(
+def _mentions_structured_output(error_text: str) -> bool:
+    text = error_text.lower()
+    return any(term in text for term in ("response_format", "json_schema", "grammar"))
+
+
+def _structured_output_rejected(target: str, error: object) -> None:
+    _structured_output_unsupported.add(target)
+    print(f"⚠️ {target}: 구조화 출력(response_format)을 지원하지 않아 스키마 없이 요청합니다. ({error})")
+
+
+async def _call_openai_chat(
     messages: List[dict],
-    endpoint: str,
     model: str,
-    temperature: float,
-    top_p: float,
-    max_tokens: int,
+    response_format: dict | None = None,
+    max_tokens: int | None = None,
 ) -> str:
+    client = get_openai_client()
+    options = {}
+    if max_tokens:
+        options["max_tokens"] = max_tokens
+    target = f"openai:{model}"
+    if response_format is not None and target not in _structured_output_unsupported:
+        try:
+            completion = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                response_format=response_format,
+                **options,
+            )
+        except BadRequestError as e:
+            if not _mentions_structured_output(str(e)):
+                raise
+            _structured_output_rejected(target, e)
+            completion = await client.chat.completions.create(model=model, messages=messages, **options)
+    else:
+        completion = await client.chat.completions.create(model=model, messages=messages, **options)
+    choice = completion.choices[0].message.content if completion.choices else None
+    if not choice:
+        raise RuntimeError("OpenAI 응답이 비어 있습니다.")
+    _record_usage("openai", model, messages, choice, completion.usage.model_dump() if completion.usage else None)
+    if response_format is not None and completion.choices[0].finish_reason == "length":
+        raise RuntimeError(f"OpenAI 요약 JSON이 max_tokens({max_tokens})에서 잘렸습니다.")
+    return choice
+
+
+async def _stream_openai_chat(messages: List[dict], model: str) -> AsyncIterator[str]:
+    client = get_openai_client()
+    stream = await client.chat.completions.create(model=model, messages=messages, stream=True)
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+def _hf_headers() -> dict:
     headers = {"Content-Type": "application/json"}
     token = settings.huggingface_token
     if token:
         headers["Authorization"] = f"Bearer {token}"
+    return headers
+
 
+def _hf_payload(
+    messages: List[dict],
+    model: str,
+    temperature: float,
+    top_p: float,
+    max_tokens: int,
+    response_format: dict | None = None,
+) -> dict:
     payload = {
         "model": model,
         "messages": messages,
@@ -78,25 +158,101 @@ async def _call_hf_chat(
         "top_p": top_p,
         "max_tokens": max_tokens,
     }
+    if response_format is not None:
+        payload["response_format"] = response_format
+    return payload
 
-    async with httpx.AsyncClient(timeout=60) as client:
+
+async def _call_hf_chat(
+    messages: List[dict],
+    endpoint: str,
+    model: str,
+    temperature: float,
+    top_p: float,
+    max_tokens: int,
+    response_format: dict | None = None,
+) -> str:
+    headers = _hf_headers()
+    structured = response_format is not None
+    if endpoint in _structured_output_unsupported:
+        response_format = None
+    payload = _hf_payload(messages, model, temperature, top_p, max_tokens, response_format)
+
+    client = get_http_client()
+    response = await client.post(endpoint, json=payload, headers=headers)
+    if response_format is not None and response.status_code in (400, 422) and _mentions_structured_output(response.text):
+        # 구조화 출력을 모르는 TGI/vLLM 버전: 스키마 없이 한 번 더 요청
+        _structured_output_rejected(endpoint, response.text[:200])
+        payload.pop("response_format")
         response = await client.post(endpoint, json=payload, headers=headers)
-        if response.status_code >= 400:
-            raise HTTPException(status_code=502, detail=f"Hugging Face 호출 실패: {response.text}")
-        data = response.json()
+    if response.status_code >= 400:
+        raise HTTPException(status_code=502, detail=f"Hugging Face 호출 실패: {response.text}")
+    data = response.json()
 
-    return (
-        data.get("choices", [{}])[0]
-        .get("message", {})
+    choice = (data.get("choices") or [{}])[0]
+    text = (
+        choice.get("message", {})
         .get("content")
         or data.get("generated_text")
         or data.get("text")
         or ""
     )
+    _record_usage("huggingface", model, messages, text, data.get("usage"))
+    if structured and choice.get("finish_reason") == "length":
+        # 잘린 JSON을 텍스트 파서로 넘기면 메뉴 없는 주문이 저장되므로 실패로 처리
+        raise HTTPException(status_code=502, detail=f"Hugging Face 요약 JSON이 max_tokens({max_tokens})에서 잘렸습니다.")
+    return text
+
+
+def _parse_hf_stream_line(line: str) -> str | None:
+    """Extract the text delta from one OpenAI-compatible SSE line (None when the stream is done)."""
+    line = line.strip()
+    if not line.startswith("data:"):
+        return ""
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return None
+    try:
+        event = json.loads(data)
+    except json.JSONDecodeError:
+        return ""
+    choice = (event.get("choices") or [{}])[0]
+    return (
+        (choice.get("delta") or {}).get("content")
+        or choice.get("text")
+        or (event.get("token") or {}).get("text")
+        or ""
+    )
+
+
+async def _stream_hf_chat(
+    messages: List[dict],
+    endpoint: str,
+    model: str,
+    temperature: float,
+    top_p: float,
+    max_tokens: int,
+) -> AsyncIterator[str]:
+    headers = _hf_headers()
+    payload = _hf_payload(messages, model, temperature, top_p, max_tokens)
+    payload["stream"] = True
+
+    client = get_http_client()
+    async with client.stream("POST", endpoint, json=payload, headers=headers) as response:
+        if response.status_code >= 400:
+            body = (await response.aread()).decode("utf-8", errors="replace")
+            raise HTTPException(status_code=502, detail=f"Hugging Face 호출 실패: {body}")
+        async for line in response.aiter_lines():
+            delta = _parse_hf_stream_line(line)
+            if delta is None:
+                break
+            if delta:
+                yield delta
 
 
 # -------- Output sanitization --------
 
+@timed()
 def _strip_system_echo(text: str) -> str:
     """Remove accidental system-prompt echoes from model output."""
     cleaned = text or ""
@@ -119,9 +275,113 @@ def _strip_system_echo(text: str) -> str:
     return cleaned.strip()
 
 
+# 에코로 시작할 수 있는 응답 앞부분: 역할 접두어 또는 시스템 프롬프트
+_ECHO_STARTS = ("system", "assistant", BASE_SYSTEM_PROMPT[:20].lower())
+# 에코로 시작한 응답도 이 길이를 넘으면 앞부분이 정해진 것으로 봄
+_ECHO_WINDOW_CHARS = len(BASE_SYSTEM_PROMPT) + 200
+
+
+class StreamingEchoFilter:
+    """
+    Applies _strip_system_echo to a streamed reply chunk by chunk.
+
+    The sanitizer only reshapes the start of a reply, so it runs on the accumulated text only
+    until that start is settled (the text cannot be an echo, a role prefix is followed by text,
+    or the echo window is exceeded); after that chunks pass through and only
+    ORDER_CONFIRMATION_TOKEN is removed. Visible text never contains the token, even when it
+    is split across chunks. If sanitizing cuts text that was already emitted, feed() reports
+    a reset and returns the full visible text instead of a delta.
+    """
+
+    def __init__(self) -> None:
+        self._raw = ""
+        self._emitted = ""
+        # 앞부분이 정해진 뒤: 응답 조각들과 아직 내보내지 않은 꼬리(공백, 잘린 확정 토큰)
+        self._parts: List[str] | None = None
+        self._pending = ""
+        self._started = False
+
+    @property
+    def reply(self) -> str:
+        """Sanitized full reply so far, including the confirmation token if present."""
+        if self._parts is None:
+            return _strip_system_echo(self._raw)
+        return "".join(self._parts).strip()
+
+    def _visible(self) -> str:
+        visible = self.reply.replace(ORDER_CONFIRMATION_TOKEN, "").strip()
+        # Hold back a leading role prefix ("assis...") until it can be stripped as a whole.
+        if "assistant:".startswith(visible.lower()):
+            return ""
+        # Hold back a trailing partial confirmation token ("<<CONF...").
+        for size in range(min(len(ORDER_CONFIRMATION_TOKEN) - 1, len(visible)), 0, -1):
+            if ORDER_CONFIRMATION_TOKEN.startswith(visible[-size:]):
+                return visible[:-size].rstrip()
+        return visible
+
+    def _settled(self) -> bool:
+        text = self._raw.lstrip().lower()
+        if not text:
+            return False
+        if len(self._raw) > _ECHO_WINDOW_CHARS:
+            return True
+        if text.startswith("assistant"):
+            return bool(text[len("assistant"):].lstrip(" :\n-"))
+        return not any(text.startswith(start) or start.startswith(text) for start in _ECHO_STARTS)
+
+    def _release(self) -> str:
+        """Emit pending text except trailing whitespace and a trailing partial confirmation token."""
+        pending = self._pending.replace(ORDER_CONFIRMATION_TOKEN, "")
+        if not self._started:
+            pending = pending.lstrip()
+        core = pending.rstrip()
+        for size in range(min(len(ORDER_CONFIRMATION_TOKEN) - 1, len(core)), 0, -1):
+            if ORDER_CONFIRMATION_TOKEN.startswith(core[-size:]):
+                core = core[:-size].rstrip()
+                break
+        self._pending = pending[len(core):]
+        self._started = self._started or bool(core)
+        return core
+
+    def feed(self, chunk: str) -> tuple[str, bool]:
+        """Add a raw chunk and return (text, reset) for the client."""
+        if self._parts is not None:
+            self._parts.append(chunk)
+            self._pending += chunk
+            return self._release(), False
+
+        self._raw += chunk
+        if not self._settled():
+            visible = self._visible()
+            if visible.startswith(self._emitted):
+                delta = visible[len(self._emitted):]
+                self._emitted = visible
+                return delta, False
+            self._emitted = visible
+            return visible, True
+
+        # 앞부분 결정: 마지막으로 한 번 정리한 뒤부터는 청크를 그대로 전달
+        sanitized = _strip_system_echo(self._raw)
+        self._parts = [sanitized, self._raw[len(self._raw.rstrip()):]]
+        visible = "".join(self._parts).replace(ORDER_CONFIRMATION_TOKEN, "").lstrip()
+        self._raw = ""
+        reset = not visible.startswith(self._emitted)
+        self._started = bool(self._emitted) and not reset
+        self._pending = visible if reset else visible[len(self._emitted):]
+        return self._release(), reset
+
+
+def _sanitize_streamed_reply(chunks: Iterable[str]) -> str:
+    """The reply a client sees for these raw chunks (StreamingEchoFilter.reply), for caching and recording."""
+    echo_filter = StreamingEchoFilter()
+    for chunk in chunks:
+        echo_filter.feed(chunk)
+    return echo_filter.reply
+
+
 # -------- Local (transformers + peft) --------
 _local_lock = threading.Lock()
-_local_loaded = {"model": None, "tokenizer": None}
+_local_loaded = {"model": None, "tokenizer": None, "prefix": None}
 
 
 def _load_local_model() -> tuple:
@@ -149,17 +409,62 @@ def _load_local_model() -> tuple:
         model.eval()
         _local_loaded["model"] = model
         _local_loaded["tokenizer"] = tokenizer
-        return model, tokenizer
+        _local_loaded["prefix"] = None
+    # 모델 로드 직후 시스템 프롬프트 prefix를 미리 prefill
+    _get_prompt_prefix(model, tokenizer)
+    return model, tokenizer
 
 
-def _generate_local(messages: List[dict], is_summary: bool = False) -> str:
-    model, tokenizer = _load_local_model()
-    max_new_tokens = settings.VOICE_ORDER_LOCAL_MAX_NEW_TOKENS
-    temperature = settings.VOICE_ORDER_LOCAL_TEMPERATURE
-    top_p = settings.VOICE_ORDER_LOCAL_TOP_P
+class _PromptPrefix:
+    """Rendered system-prompt prefix with its prefilled past_key_values."""
 
-    prompt = tokenizer.apply_chat_template(messages, add_generation_prompt=True, return_tensors="pt").to(model.device)
-    gen_cfg = GenerationConfig(
+    __slots__ = ("system_prompt", "text", "input_ids", "cache")
+
+    def __init__(self, system_prompt: str, text: str, input_ids, cache) -> None:
+        self.system_prompt = system_prompt
+        self.text = text
+        self.input_ids = input_ids
+        self.cache = cache
+
+
+def _get_prompt_prefix(model, tokenizer) -> _PromptPrefix | None:
+    """
+    Return the KV-cache prefix for the current system prompt, rebuilding it when the
+    catalog prompt text changes. None when prefix caching is disabled or unsupported.
+    """
+    if not settings.VOICE_ORDER_LOCAL_PREFIX_CACHE or DynamicCache is None:
+        return None
+    system_prompt = get_system_prompt()
+    with _local_lock:
+        prefix = _local_loaded["prefix"]
+        if prefix is not None and prefix.system_prompt == system_prompt:
+            return prefix
+
+        text = tokenizer.apply_chat_template(
+            [{"role": "system", "content": system_prompt}],
+            add_generation_prompt=False,
+            tokenize=False,
+        )
+        input_ids = tokenizer(text, return_tensors="pt", add_special_tokens=False)["input_ids"].to(model.device)
+        with torch.no_grad():
+            cache = model(input_ids=input_ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
+        prefix = _PromptPrefix(system_prompt, text, input_ids, cache)
+        _local_loaded["prefix"] = prefix
+        return prefix
+
+
+def _local_generation_params(is_summary: bool = False) -> tuple:
+    """(max_new_tokens, temperature, top_p) for local generation; requests batch together only when equal."""
+    return (
+        settings.VOICE_ORDER_LOCAL_MAX_NEW_TOKENS,
+        settings.VOICE_ORDER_LOCAL_TEMPERATURE,
+        settings.VOICE_ORDER_LOCAL_TOP_P,
+    )
+
+
+def _local_generation_config(tokenizer, params: tuple) -> "GenerationConfig":
+    max_new_tokens, temperature, top_p = params
+    return GenerationConfig(
         max_new_tokens=max_new_tokens,
         temperature=temperature,
         top_p=top_p,
@@ -167,26 +472,189 @@ def _generate_local(messages: List[dict], is_summary: bool = False) -> str:
         eos_token_id=tokenizer.eos_token_id,
         pad_token_id=tokenizer.pad_token_id,
     )
+
+
+def _prepare_local_inputs(model, tokenizer, conversations: List[List[dict]]) -> dict:
+    """
+    Tokenize conversations for model.generate with left padding.
+    When every conversation starts with the cached system-prompt prefix, only the conversation
+    tokens are new: a copy of the prefix cache is passed as past_key_values so generate()
+    skips re-prefilling the system prompt.
+    """
+    rendered = [
+        tokenizer.apply_chat_template(messages, add_generation_prompt=True, tokenize=False)
+        for messages in conversations
+    ]
+    prefix = _get_prompt_prefix(model, tokenizer)
+    if prefix is None or not all(text.startswith(prefix.text) for text in rendered):
+        # 채팅 템플릿에 BOS가 이미 포함되어 있으므로 special token은 추가하지 않음
+        return dict(tokenizer(rendered, return_tensors="pt", padding=True, add_special_tokens=False).to(model.device))
+
+    suffixes = [text[len(prefix.text):] for text in rendered]
+    suffix_inputs = tokenizer(suffixes, return_tensors="pt", padding=True, add_special_tokens=False).to(model.device)
+    batch_size = len(conversations)
+    prefix_ids = prefix.input_ids.expand(batch_size, -1)
+    cache = copy.deepcopy(prefix.cache)
+    if batch_size > 1:
+        cache.batch_repeat_interleave(batch_size)
+    return {
+        "input_ids": torch.cat([prefix_ids, suffix_inputs["input_ids"]], dim=1),
+        # 패딩은 prefix 뒤에 위치하지만 attention_mask로 가려지고 position id도 mask 기준으로 계산됨
+        "attention_mask": torch.cat([torch.ones_like(prefix_ids), suffix_inputs["attention_mask"]], dim=1),
+        "past_key_values": cache,
+    }
+
+
+def _generate_local_batch(params: tuple, conversations: List[List[dict]]) -> List[str]:
+    """Run one left-padded model.generate over several conversations."""
+    model, tokenizer = _load_local_model()
+    inputs = _prepare_local_inputs(model, tokenizer, conversations)
+    gen_cfg = _local_generation_config(tokenizer, params)
     with torch.no_grad():
-        outputs = model.generate(prompt, generation_config=gen_cfg)
-    text = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    rendered = tokenizer.apply_chat_template(messages, add_generation_prompt=True, tokenize=False)
-    return text.replace(rendered, "").strip()
+        outputs = model.generate(**inputs, generation_config=gen_cfg)
+    # 모든 프롬프트가 같은 위치에서 끝나므로 생성된 토큰만 잘라서 디코딩
+    prompt_length = inputs["input_ids"].shape[1]
+    return [
+        tokenizer.decode(output[prompt_length:], skip_special_tokens=True).strip()
+        for output in outputs
+    ]
+
+
+def _generate_local(messages: List[dict], is_summary: bool = False) -> str:
+    return _generate_local_batch(_local_generation_params(is_summary), [messages])[0]
+
+
+_local_scheduler = BatchScheduler(
+    _generate_local_batch,
+    max_batch_size=settings.VOICE_ORDER_LOCAL_BATCH_MAX_SIZE,
+    max_wait_ms=settings.VOICE_ORDER_LOCAL_BATCH_WAIT_MS,
+)
 
 
-async def _generate_llm_response(messages: List[dict], is_summary: bool = False) -> str:
+def _start_local_stream(messages: List[dict]) -> tuple["TextIteratorStreamer", List[BaseException]]:
     """
-    Unified LLM provider selection logic.
-    Routes to OpenAI or HuggingFace based on settings.
+    Start model.generate in a background thread and return its token streamer plus a list that
+    receives the generation error, if any (the streamer is ended either way so readers never hang).
     """
+    model, tokenizer = _load_local_model()
+    if TextIteratorStreamer is None:
+        raise RuntimeError("transformers가 설치되어 있지 않습니다.")
+
+    inputs = _prepare_local_inputs(model, tokenizer, [messages])
+    gen_cfg = _local_generation_config(tokenizer, _local_generation_params())
+    streamer = TextIteratorStreamer(
+        tokenizer,
+        skip_prompt=True,
+        skip_special_tokens=True,
+        timeout=settings.VOICE_ORDER_LOCAL_STREAM_TIMEOUT_SECONDS,
+    )
+    errors: List[BaseException] = []
+
+    def _run() -> None:
+        finished = False
+        try:
+            with torch.no_grad():
+                model.generate(**inputs, generation_config=gen_cfg, streamer=streamer)
+            finished = True
+        except BaseException as e:  # noqa: BLE001
+            errors.append(e)
+        finally:
+            # generate는 정상 종료 시에만 streamer.end()를 호출하므로 실패 시 직접 종료
+            if not finished:
+                streamer.end()
+
+    threading.Thread(target=_run, daemon=True).start()
+    return streamer, errors
+
+
+async def _stream_local(messages: List[dict]) -> AsyncIterator[str]:
+    streamer, errors = await run_in_threadpool(_start_local_stream, messages)
+    try:
+        async for text in iterate_in_threadpool(streamer):
+            if text:
+                yield text
+    except queue.Empty:
+        raise RuntimeError(
+            f"로컬 모델이 {settings.VOICE_ORDER_LOCAL_STREAM_TIMEOUT_SECONDS:g}초 동안 토큰을 생성하지 않았습니다."
+        ) from None
+    if errors:
+        raise errors[0]
+
+
+def _provider_signature(is_summary: bool = False) -> tuple:
+    """Provider, endpoint/model and sampling parameters that determine a reply."""
     provider = settings.VOICE_ORDER_LLM_PROVIDER.lower()
+    if provider == "openai":
+        model = settings.summary_model if is_summary else (settings.VOICE_ORDER_CHAT_MODEL or "gpt-4o-mini")
+        return (provider, model)
+    if provider == "local":
+        return (
+            provider,
+            settings.VOICE_ORDER_LOCAL_MODEL,
+            settings.VOICE_ORDER_LOCAL_ADAPTER,
+            *_local_generation_params(is_summary),
+        )
+    if is_summary:
+        return (
+            provider,
+            settings.summary_hf_endpoint,
+            settings.summary_hf_model,
+            settings.VOICE_ORDER_SUMMARY_TEMPERATURE,
+            settings.VOICE_ORDER_SUMMARY_TOP_P,
+            settings.VOICE_ORDER_SUMMARY_MAX_TOKENS,
+        )
+    return (
+        provider,
+        settings.VOICE_ORDER_HF_ENDPOINT,
+        settings.VOICE_ORDER_HF_MODEL,
+        settings.VOICE_ORDER_HF_TEMPERATURE,
+        settings.VOICE_ORDER_HF_TOP_P,
+        settings.VOICE_ORDER_HF_MAX_TOKENS,
+    )
+
 
+def _response_cache_lookup(messages: List[dict], is_summary: bool) -> CacheLookup | None:
+    """Cache lookup for chat turns when the response cache is enabled; summaries always bypass it."""
+    if is_summary or not settings.VOICE_ORDER_RESPONSE_CACHE_ENABLED:
+        return None
+    lookup = build_cache_lookup(messages, _provider_signature(is_summary))
+    if lookup is None:
+        get_response_cache().bypassed += 1
+    return lookup
+
+
+@timed()
+async def _generate_llm_response(messages: List[dict], is_summary: bool = False, structured: bool = False) -> str:
+    """Serve chat turns from the response cache when possible, otherwise call the provider."""
+    lookup = _response_cache_lookup(messages, is_summary)
+    if lookup is not None:
+        cached = get_response_cache().get(lookup.key)
+        if cached is not None:
+            return lookup.restore(cached)
+
+    reply = await _call_llm_provider(messages, is_summary, structured)
+    if lookup is not None and is_cacheable_reply(reply):
+        get_response_cache().put(lookup.key, lookup.template(reply))
+    return reply
+
+
+async def _call_provider(provider: str, messages: List[dict], is_summary: bool = False, structured: bool = False) -> str:
+    """
+    Call one provider (openai | local | huggingface) and sanitize its reply.
+    structured: JSON-schema summary (response_format, shorter max tokens); the local model only gets the prompt.
+    """
     if provider == "openai":
         model = settings.summary_model if is_summary else (settings.VOICE_ORDER_CHAT_MODEL or "gpt-4o-mini")
-        raw = await _call_openai_chat(messages, model)
+        if structured:
+            raw = await _call_openai_chat(
+                messages, model, summary_response_format(), settings.VOICE_ORDER_SUMMARY_JSON_MAX_TOKENS
+            )
+        else:
+            raw = await _call_openai_chat(messages, model)
         return _strip_system_echo(raw)
     if provider == "local":
-        raw = await run_in_threadpool(functools.partial(_generate_local, messages, is_summary))
+        raw = await _local_scheduler.submit(_local_generation_params(is_summary), messages)
+        _record_usage(provider, settings.VOICE_ORDER_LOCAL_MODEL, messages, raw)
         return _strip_system_echo(raw)
 
     # HuggingFace parameters
@@ -197,7 +665,8 @@ async def _generate_llm_response(messages: List[dict], is_summary: bool = False)
             settings.summary_hf_model,
             settings.VOICE_ORDER_SUMMARY_TEMPERATURE,
             settings.VOICE_ORDER_SUMMARY_TOP_P,
-            settings.VOICE_ORDER_SUMMARY_MAX_TOKENS,
+            settings.VOICE_ORDER_SUMMARY_JSON_MAX_TOKENS if structured else settings.VOICE_ORDER_SUMMARY_MAX_TOKENS,
+            summary_response_format() if structured else None,
         )
         return _strip_system_echo(raw)
 
@@ -216,15 +685,188 @@ async def _generate_llm_response(messages: List[dict], is_summary: bool = False)
     return _strip_system_echo(raw)
 
 
-async def generate_completion(messages: List[ChatMessage]) -> str:
-    scoped_messages = _with_system_prompt(messages)
+def _stream_provider(provider: str, messages: List[dict], is_summary: bool = False) -> AsyncIterator[str]:
+    """Raw chunk stream of one provider."""
+    if provider == "openai":
+        model = settings.summary_model if is_summary else (settings.VOICE_ORDER_CHAT_MODEL or "gpt-4o-mini")
+        return _stream_openai_chat(messages, model)
+    if provider == "local":
+        return _stream_local(messages)
+    if is_summary:
+        return _stream_hf_chat(
+            messages,
+            settings.summary_hf_endpoint,
+            settings.summary_hf_model,
+            settings.VOICE_ORDER_SUMMARY_TEMPERATURE,
+            settings.VOICE_ORDER_SUMMARY_TOP_P,
+            settings.VOICE_ORDER_SUMMARY_MAX_TOKENS,
+        )
+    return _stream_hf_chat(
+        messages,
+        settings.VOICE_ORDER_HF_ENDPOINT,
+        settings.VOICE_ORDER_HF_MODEL,
+        settings.VOICE_ORDER_HF_TEMPERATURE,
+        settings.VOICE_ORDER_HF_TOP_P,
+        settings.VOICE_ORDER_HF_MAX_TOKENS,
+    )
+
+
+def _model_label(provider: str, is_summary: bool) -> str:
+    if provider == "openai":
+        return settings.summary_model if is_summary else (settings.VOICE_ORDER_CHAT_MODEL or "gpt-4o-mini")
+    if provider == "local":
+        return settings.VOICE_ORDER_LOCAL_MODEL or ""
+    return settings.summary_hf_model if is_summary else settings.VOICE_ORDER_HF_MODEL
+
+
+async def _admitted_call(provider: str, messages: List[dict], is_summary: bool, structured: bool = False) -> str:
+    async with get_admission_controller().slot(provider, current_priority(is_summary)):
+        stage = "llm_summary" if is_summary else "llm_chat"
+        with observe_stage(stage, provider, _model_label(provider, is_summary)), LLM_IN_FLIGHT.labels(provider).track_inprogress():
+            return await _call_provider(provider, messages, is_summary, structured)
+
+
+async def _admitted_stream(provider: str, messages: List[dict], is_summary: bool) -> AsyncIterator[str]:
+    # 스트림이 끝날 때까지 제공자 슬롯을 점유
+    async with get_admission_controller().slot(provider, current_priority(is_summary)):
+        model = _model_label(provider, is_summary)
+        stage = "llm_summary" if is_summary else "llm_chat"
+        started = time.perf_counter()
+        chunks: List[str] = []
+        with observe_stage(stage, provider, model), LLM_IN_FLIGHT.labels(provider).track_inprogress():
+            async for chunk in _stream_provider(provider, messages, is_summary):
+                if not chunks:
+                    LLM_TTFT_SECONDS.labels(provider, model).observe(time.perf_counter() - started)
+                chunks.append(chunk)
+                yield chunk
+        _record_usage(provider, model, messages, "".join(chunks))
+
+
+async def _call_llm_provider(messages: List[dict], is_summary: bool = False, structured: bool = False) -> str:
+    """
+    Unified LLM provider selection logic.
+    Routes to VOICE_ORDER_LLM_PROVIDER, hedged with / falling back to VOICE_ORDER_LLM_FALLBACK_PROVIDER.
+    """
+    started = time.perf_counter()
+    reply = await get_provider_router().call(
+        lambda provider: _admitted_call(provider, messages, is_summary, structured),
+        kind="summary" if is_summary else "chat",
+    )
+    # 요약 호출은 고객 이름을 알 수 있는 summarize_order에서 기록
+    if not is_summary:
+        get_recorder().record_llm(messages, is_summary, reply, (time.perf_counter() - started) * 1000)
+    return reply
+
+
+async def _stream_llm_response(messages: List[dict], is_summary: bool = False) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of _generate_llm_response.
+    Yields raw provider chunks; callers sanitize them with StreamingEchoFilter.
+    """
+    lookup = _response_cache_lookup(messages, is_summary)
+    if lookup is not None:
+        cached = get_response_cache().get(lookup.key)
+        if cached is not None:
+            yield lookup.restore(cached)
+            return
+
+    started = time.perf_counter()
+    stream = get_provider_router().stream(lambda provider: _admitted_stream(provider, messages, is_summary))
+
+    chunks: List[str] = []
+    async for chunk in stream:
+        chunks.append(chunk)
+        yield chunk
+
+    if not is_summary:
+        get_recorder().record_llm(messages, is_summary, "".join(chunks), (time.perf_counter() - started) * 1000)
+    if lookup is not None:
+        # 스트리밍 필터는 응답 앞부분만 정리하므로 _strip_system_echo 대신 클라이언트가 받은 것과 같은 결과를 저장
+        reply = _sanitize_streamed_reply(chunks)
+        if is_cacheable_reply(reply):
+            get_response_cache().put(lookup.key, lookup.template(reply))
+
+
+async def _generate_completion(messages: List[ChatMessage]) -> str:
+    routed = answer_catalog_question(messages)
+    if routed is not None:
+        return routed
+    scoped_messages = compact_history(_with_system_prompt(messages))
     normalized = _normalize_messages(scoped_messages)
     return await _generate_llm_response(normalized, is_summary=False)
 
 
+async def generate_completion(messages: List[ChatMessage]) -> str:
+    started = time.perf_counter()
+    with track_usage() as usage:
+        reply = await _generate_completion(messages)
+    get_recorder().record_chat(messages, reply, (time.perf_counter() - started) * 1000, usage)
+    return reply
+
+
+async def stream_completion(messages: List[ChatMessage]) -> AsyncIterator[str]:
+    started = time.perf_counter()
+    chunks: List[str] = []
+    with track_usage() as usage:
+        routed = answer_catalog_question(messages)
+        if routed is not None:
+            chunks.append(routed)
+            yield routed
+        else:
+            scoped_messages = compact_history(_with_system_prompt(messages))
+            normalized = _normalize_messages(scoped_messages)
+            async for chunk in _stream_llm_response(normalized, is_summary=False):
+                chunks.append(chunk)
+                yield chunk
+    get_recorder().record_chat(
+        messages,
+        _sanitize_streamed_reply(chunks),
+        (time.perf_counter() - started) * 1000,
+        usage,
+        stream=True,
+    )
+
+
+def structured_summary_enabled() -> bool:
+    """JSON-schema summaries when enabled and the primary provider supports response_format."""
+    return settings.VOICE_ORDER_SUMMARY_STRUCTURED_OUTPUT and settings.VOICE_ORDER_LLM_PROVIDER in ("openai", "huggingface")
+
+
+def extract_confident_order(history: List[ChatMessage], final_message: str) -> OrderSummary | None:
+    """Rule-based summary when the extractor is enabled and confident enough, else None."""
+    if not settings.VOICE_ORDER_EXTRACTOR_ENABLED:
+        return None
+    extraction = extract_order(history, final_message, settings.VOICE_ORDER_ASSUMED_DELIVERY_DATE)
+    if extraction.confidence >= settings.VOICE_ORDER_EXTRACTOR_MIN_CONFIDENCE:
+        return extraction.summary
+    return None
+
+
 async def summarize_order(history: List[ChatMessage], final_message: str) -> OrderSummary:
-    # history already has system prompt from generate_completion, no need to add again
-    prompt_messages = build_summary_prompt(history, final_message, settings.VOICE_ORDER_ASSUMED_DELIVERY_DATE)
-    raw_text = await _generate_llm_response(prompt_messages, is_summary=True)
-    parsed = parse_summary_text(raw_text)
+    recorder = get_recorder()
+    started = time.perf_counter()
+    with track_usage() as usage:
+        confident = extract_confident_order(history, final_message)
+        if confident is not None:
+            recorder.record_summary(history, final_message, confident, "extractor", (time.perf_counter() - started) * 1000, usage)
+            return confident
+
+        # history already has system prompt from generate_completion, no need to add again
+        structured = structured_summary_enabled()
+        prompt_messages = build_summary_prompt(
+            history,
+            final_message,
+            settings.VOICE_ORDER_ASSUMED_DELIVERY_DATE,
+            settings.VOICE_ORDER_SUMMARY_HISTORY_TOKEN_BUDGET,
+            structured=structured,
+        )
+        llm_started = time.perf_counter()
+        raw_text = await _generate_llm_response(prompt_messages, is_summary=True, structured=structured)
+        llm_ms = (time.perf_counter() - llm_started) * 1000
+    parsed = parse_summary_json(raw_text) if structured else parse_summary_text(raw_text)
+    if recorder.enabled:
+        recorder.record_llm(
+            prompt_messages, True, raw_text, llm_ms, names=[parsed.customerName], addresses=[parsed.customerAddress]
+        )
+        recorder.record_summary(history, final_message, parsed, "llm", (time.perf_counter() - started) * 1000, usage)
     return parsed
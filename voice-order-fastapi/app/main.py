@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import secrets
+import threading
+from contextlib import asynccontextmanager
 from datetime import datetime
-from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Sequence
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, Header, HTTPException, Query, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse, Response, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 
+from app.admission import PRIORITY_CHAT, PRIORITY_ORDER, get_admission_controller, priority_class
 from app.config import settings, APP_DIR, BASE_DIR as PROJECT_ROOT
-from app.context import get_system_prompt
+from app.context import get_catalog, get_system_prompt
 from app.conversation import (
     ORDER_CONFIRMATION_TOKEN,
     INITIAL_LANGUAGE,
@@ -19,7 +26,13 @@ from app.conversation import (
     get_ui_text,
     greeting_by_language,
 )
-from app.llm import generate_completion, summarize_order
+from app.intent import get_intent_router_stats
+from app.http_client import close_http_client, get_http_client, get_http_pool_stats
+from app.openai_client import close_openai_client
+from app.order_store import get_order_store
+from app.order_writer import get_order_writer
+from app.llm import StreamingEchoFilter, generate_completion, stream_completion
+from app.metrics import MetricsMiddleware, observe_stage, render_metrics
 from app.schemas import (
     ChatMessage,
     ChatRequest,
@@ -28,11 +41,40 @@ from app.schemas import (
     OrderConfirmRequest,
     OrderConfirmResponse,
     OrderSummary,
+    SessionCreateRequest,
+    SessionCreateResponse,
+    SessionMessageRequest,
+    Turn,
+    VoiceTurnResponse,
 )
-from app.stt import transcribe_audio
-
-
-app = FastAPI(title="Voice Order API (FastAPI)")
+from app.realtime import AUDIO_FORMATS, PartialTranscriber, UtteranceBuffer
+from app.recording import get_recorder
+from app.response_cache import get_response_cache
+from app.routing import get_provider_router
+from app.session import ConversationSession, get_session_store
+from app.speculation import get_speculative_summaries, maybe_start_speculative_summary, summarize_confirmed_order
+from app.stt import get_audio_budget, get_audio_preprocess_stats, short_language_code, transcribe_audio
+from app.timing import TimingMiddleware, get_profiler, timed
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # 공유 HTTP 커넥션 풀은 앱 수명 동안 유지하고 종료 시 정리
+    get_http_client()
+    order_writer.start()
+    admission.start()
+    try:
+        yield
+    finally:
+        await admission.close()
+        await order_writer.close()
+        await run_in_threadpool(get_recorder().flush)
+        await close_http_client()
+        await close_openai_client()
+        order_store.close()
+
+
+app = FastAPI(title="Voice Order API (FastAPI)", lifespan=lifespan)
 
 # CORS 설정: 여러 오리진 허용 (.env 파일에서 로드)
 allowed_origins_str = settings.VOICE_ORDER_CLIENT_ORIGIN
@@ -60,6 +102,8 @@ print(
     f"(preset={getattr(settings, 'VOICE_ORDER_MODEL_PRESET', None)})"
 )
 
+app.add_middleware(TimingMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -68,12 +112,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-orders_dir = (
-    Path(settings.VOICE_ORDER_ORDER_DIR).resolve()
-    if settings.VOICE_ORDER_ORDER_DIR
-    else APP_DIR / "data" / "orders"
-)
-orders_dir.mkdir(parents=True, exist_ok=True)
+order_store = get_order_store()
+order_writer = get_order_writer(order_store)
+admission = get_admission_controller()
+print(f"✅ 주문 저장소: {order_store.name}")
 static_dir = APP_DIR / "static"
 
 
@@ -82,6 +124,41 @@ async def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics() -> Response:
+    """Prometheus exposition of stage latencies, token counts, in-flight gauges, cache ratios and errors."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+def _require_admin(token: str | None) -> None:
+    if not settings.VOICE_ORDER_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="관리자 엔드포인트가 비활성화되어 있습니다.")
+    if not token or not secrets.compare_digest(token, settings.VOICE_ORDER_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다.")
+
+
+@app.post("/admin/profile")
+async def admin_profile(
+    seconds: float = Query(5.0, gt=0),
+    intervalMs: float = Query(5.0, ge=1),
+    threads: str = Query("loop", pattern="^(loop|all)$"),
+    x_admin_token: str | None = Header(default=None),
+) -> PlainTextResponse:
+    """
+    Sample stacks for N seconds and return them in collapsed-stack format (flamegraph.pl,
+    speedscope, inferno). threads=loop samples only the event loop thread, threads=all every thread.
+    """
+    _require_admin(x_admin_token)
+    seconds = min(seconds, settings.VOICE_ORDER_PROFILE_MAX_SECONDS)
+    loop_thread = threading.get_ident() if threads == "loop" else None
+    try:
+        stacks, samples = await run_in_threadpool(get_profiler().run, seconds, intervalMs, loop_thread)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    return PlainTextResponse(stacks, headers={"X-Profile-Samples": str(samples)})
+
+
 @app.get("/config/model-info")
 async def fetch_model_info() -> dict:
     """Return current LLM routing info (provider, endpoints, models, preset)."""
@@ -106,6 +183,72 @@ async def fetch_model_info() -> dict:
     }
 
 
+@app.get("/config/http-pool")
+async def fetch_http_pool_stats() -> dict:
+    """Return connection pool stats of the shared Hugging Face HTTP client."""
+    return get_http_pool_stats()
+
+
+@app.get("/config/response-cache")
+async def fetch_response_cache_stats() -> dict:
+    """Return hit/miss counters of the LLM response cache."""
+    return get_response_cache().stats()
+
+
+@app.get("/config/speculative-summary")
+async def fetch_speculative_summary_stats() -> dict:
+    """Return counters of background summaries started at the order read-back."""
+    return get_speculative_summaries().stats()
+
+
+@app.get("/config/order-writer")
+async def fetch_order_writer_stats() -> dict:
+    """Return queue depth and group-commit counters of the order writer."""
+    return order_writer.stats()
+
+
+@app.get("/config/audio-budget")
+async def fetch_audio_budget_stats() -> dict:
+    """Return audio bytes currently held by in-flight transcriptions."""
+    return get_audio_budget().stats()
+
+
+@app.get("/config/audio-preprocess")
+async def fetch_audio_preprocess_stats() -> dict:
+    """Return bytes/seconds in vs out of the optional STT audio preprocessing."""
+    return get_audio_preprocess_stats().stats()
+
+
+@app.get("/config/catalog")
+async def fetch_catalog_stats() -> dict:
+    """Return the version and size of the currently loaded menu catalog."""
+    return get_catalog().stats()
+
+
+@app.get("/config/intent-router")
+async def fetch_intent_router_stats() -> dict:
+    """Return how many chat turns were answered from the catalog without the LLM."""
+    return get_intent_router_stats().stats()
+
+
+@app.get("/config/llm-routing")
+async def fetch_llm_routing_stats() -> dict:
+    """Return provider breaker states, observed latencies and hedge/fallback counters."""
+    return get_provider_router().stats()
+
+
+@app.get("/config/admission")
+async def fetch_admission_stats() -> dict:
+    """Return per-provider concurrency/queue usage, rejections and the event loop lag."""
+    return admission.stats()
+
+
+@app.get("/config/recording")
+async def fetch_recording_stats() -> dict:
+    """Return whether traffic recording for bench.replay is on and how many entries were written."""
+    return get_recorder().stats()
+
+
 @app.get("/config/system-prompt")
 async def fetch_system_prompt() -> dict:
     return {"prompt": get_system_prompt()}
@@ -153,15 +296,16 @@ async def root() -> RedirectResponse:
     return RedirectResponse("/health", status_code=302)
 
 
+@timed()
 async def _save_order(
-    history: list[ChatMessage],
+    history: Sequence[ChatMessage | Turn],
     final_message: str,
     *,
     existing_order_id: str | None = None,
     order_type: str = "주문확정",
 ) -> tuple[str, OrderSummary]:
-    """Save order to JSON file and return order ID and summary."""
-    summary = await summarize_order(history, final_message)
+    """Save order to the order store and return order ID and summary."""
+    summary = await summarize_confirmed_order(history, final_message)
     confirmed_at = datetime.utcnow().isoformat()
 
     if existing_order_id:
@@ -182,29 +326,20 @@ async def _save_order(
         "summary": summary.model_dump(),
     }
 
-    order_path = orders_dir / f"{safe_id}.json"
-    order_path.parent.mkdir(parents=True, exist_ok=True)
-    order_path.write_text(
-        json.dumps(order_record, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    with observe_stage("persist", order_store.name):
+        await order_writer.submit(order_record)
 
     return safe_id, summary
 
 
-@app.post("/api/llm/generate", response_model=ChatResponse)
-async def llm_generate(payload: ChatRequest) -> ChatResponse:
-    if not payload.messages:
-        raise HTTPException(status_code=400, detail="messages 배열이 필요합니다.")
-
-    reply = await generate_completion(payload.messages)
-
+async def _finalize_reply(history: Sequence[ChatMessage | Turn], reply: str) -> ChatResponse:
+    """Build the ChatResponse for a reply, auto-saving the order on ORDER_CONFIRMATION_TOKEN."""
     # Check if order is confirmed
     if ORDER_CONFIRMATION_TOKEN in reply:
         # Auto-save order when confirmation token is detected
         try:
             order_id, summary = await _save_order(
-                payload.messages,
+                history,
                 reply,
                 order_type="주문확정",
             )
@@ -222,25 +357,388 @@ async def llm_generate(payload: ChatRequest) -> ChatResponse:
             clean_message = reply.replace(ORDER_CONFIRMATION_TOKEN, "").strip()
             return ChatResponse(message=clean_message, orderConfirmed=False)
 
+    maybe_start_speculative_summary(history, reply)
     return ChatResponse(message=reply, orderConfirmed=False)
 
 
+def _ndjson_frame(frame: dict) -> str:
+    return json.dumps(frame, ensure_ascii=False) + "\n"
+
+
+@app.post("/api/llm/generate", response_model=ChatResponse)
+async def llm_generate(payload: ChatRequest) -> ChatResponse:
+    if not payload.messages:
+        raise HTTPException(status_code=400, detail="messages 배열이 필요합니다.")
+
+    reply = await generate_completion(payload.messages)
+    return await _finalize_reply(payload.messages, reply)
+
+
+async def _reply_events(
+    history: Sequence[ChatMessage | Turn],
+    on_response: Callable[[ChatResponse], None] | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Stream the reply as frames:
+    {"type": "delta", "text"} appends text, {"type": "reset", "text"} replaces everything shown so far,
+    {"type": "error", "detail"} ends a failed stream and {"type": "done", ...ChatResponse} ends a successful one.
+    """
+    echo_filter = StreamingEchoFilter()
+    try:
+        async for chunk in stream_completion(history):
+            text, reset = echo_filter.feed(chunk)
+            if reset:
+                yield {"type": "reset", "text": text}
+            elif text:
+                yield {"type": "delta", "text": text}
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e)
+        print(f"Warning: LLM stream failed: {detail}")
+        frame = {"type": "error", "detail": detail}
+        retry_after = (getattr(e, "headers", None) or {}).get("Retry-After")
+        if retry_after:
+            frame["retryAfter"] = int(retry_after)
+        yield frame
+        return
+
+    response = await _finalize_reply(history, echo_filter.reply)
+    if on_response is not None:
+        on_response(response)
+    yield {"type": "done", **response.model_dump()}
+
+
+def _reply_frames(
+    history: Sequence[ChatMessage | Turn],
+    on_response: Callable[[ChatResponse], None] | None = None,
+) -> AsyncIterator[str]:
+    """_reply_events serialized as NDJSON lines."""
+
+    async def _frames():
+        async for event in _reply_events(history, on_response):
+            yield _ndjson_frame(event)
+
+    return _frames()
+
+
+@app.post("/api/llm/generate/stream")
+async def llm_generate_stream(payload: ChatRequest) -> StreamingResponse:
+    if not payload.messages:
+        raise HTTPException(status_code=400, detail="messages 배열이 필요합니다.")
+    # 스트림이 시작되면 상태 코드를 바꿀 수 없으므로 과부하는 미리 429로 응답
+    admission.precheck(get_provider_router().providers(), PRIORITY_CHAT)
+    return StreamingResponse(_reply_frames(payload.messages), media_type="application/x-ndjson")
+
+
+# -------- Server-side conversation sessions --------
+
+def _require_session(session_id: str) -> ConversationSession:
+    session = get_session_store().get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없거나 만료되었습니다.")
+    return session
+
+
+def _prepare_session_turn(session: ConversationSession, message: str) -> tuple[list[Turn], str]:
+    """Return the turns to add for a new customer message (plus a language switch instruction if needed)."""
+    if not message or not message.strip():
+        raise HTTPException(status_code=400, detail="message가 비어 있습니다.")
+    new_turns: list[Turn] = []
+    language = detect_language_code(message)
+    if language != session.language:
+        new_turns.append(Turn("system", build_language_instruction(language)))
+    new_turns.append(Turn("user", message.strip()))
+    return new_turns, language
+
+
+def _commit_session_turn(
+    session: ConversationSession,
+    new_turns: list[Turn],
+    language: str,
+    response: ChatResponse,
+) -> None:
+    # 응답이 성공한 경우에만 세션에 반영해 실패한 턴이 기록에 남지 않도록 함
+    session.turns.extend(new_turns)
+    session.turns.append(Turn("assistant", response.message))
+    session.language = language
+    if response.orderConfirmed and response.orderId:
+        session.order_id = response.orderId
+    response.sessionId = session.session_id
+
+
+@app.post("/api/session", response_model=SessionCreateResponse)
+async def session_create(payload: SessionCreateRequest) -> SessionCreateResponse:
+    language = payload.language or INITIAL_LANGUAGE
+    greeting = greeting_by_language(language, payload.customerName or "고객님")
+    session = get_session_store().create(language, [Turn("assistant", greeting)])
+    return SessionCreateResponse(sessionId=session.session_id, language=language, greeting=greeting)
+
+
+@app.get("/api/session/{session_id}")
+async def session_detail(session_id: str) -> dict:
+    session = _require_session(session_id)
+    return {
+        "sessionId": session.session_id,
+        "language": session.language,
+        "orderId": session.order_id,
+        "messages": [turn._asdict() for turn in session.turns],
+    }
+
+
+@app.delete("/api/session/{session_id}")
+async def session_delete(session_id: str) -> dict:
+    return {"deleted": get_session_store().delete(session_id)}
+
+
+@app.post("/api/session/{session_id}/messages", response_model=ChatResponse)
+async def session_message(session_id: str, payload: SessionMessageRequest) -> ChatResponse:
+    session = _require_session(session_id)
+    new_turns, language = _prepare_session_turn(session, payload.message)
+    history = [*session.turns, *new_turns]
+
+    reply = await generate_completion(history)
+    response = await _finalize_reply(history, reply)
+    _commit_session_turn(session, new_turns, language, response)
+    return response
+
+
+@app.post("/api/session/{session_id}/messages/stream")
+async def session_message_stream(session_id: str, payload: SessionMessageRequest) -> StreamingResponse:
+    session = _require_session(session_id)
+    new_turns, language = _prepare_session_turn(session, payload.message)
+    history = [*session.turns, *new_turns]
+
+    def _on_response(response: ChatResponse) -> None:
+        _commit_session_turn(session, new_turns, language, response)
+
+    admission.precheck(get_provider_router().providers(), PRIORITY_CHAT)
+    return StreamingResponse(_reply_frames(history, _on_response), media_type="application/x-ndjson")
+
+
 @app.post("/api/stt/transcribe")
 async def stt_transcribe(file: UploadFile = File(...), language: str | None = None) -> dict:
     transcript = await transcribe_audio(file, language)
     return {"transcript": transcript}
 
 
-@app.post("/api/order/confirm", response_model=OrderConfirmResponse)
-async def order_confirm(payload: OrderConfirmRequest) -> OrderConfirmResponse:
+# -------- Single round-trip voice turn --------
+
+_chat_history_adapter = TypeAdapter(list[ChatMessage])
+
+
+def _parse_history_field(history: str | None) -> list[ChatMessage]:
+    if not history:
+        return []
+    try:
+        return _chat_history_adapter.validate_json(history)
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="history는 메시지 배열(JSON)이어야 합니다.")
+
+
+@app.post("/api/voice/turn", response_model=VoiceTurnResponse)
+async def voice_turn(
+    file: UploadFile = File(...),
+    sessionId: str | None = Form(None),
+    history: str | None = Form(None),
+    language: str | None = Form(None),
+    stream: bool = False,
+):
+    """
+    Audio in, reply out: transcribe, detect the language and generate the reply in one request.
+    Uses the server session when sessionId is given, otherwise the JSON history (with the client's
+    current language). With stream=true the response is NDJSON: a {"type": "transcript", ...} frame
+    followed by the same frames as /api/llm/generate/stream.
+    """
+    session = _require_session(sessionId) if sessionId else None
+    turns = [] if session is not None else _parse_history_field(history)
+    if session is None and not turns:
+        raise HTTPException(status_code=400, detail="sessionId 또는 history가 필요합니다.")
+    if stream:
+        # 스트림이 시작되면 상태 코드를 바꿀 수 없으므로 과부하는 음성 인식 전에 429로 응답
+        admission.precheck(get_provider_router().providers(), PRIORITY_CHAT)
+
+    try:
+        transcript = (await transcribe_audio(file, None)).strip()
+    except RuntimeError:
+        transcript = ""
+    if not transcript:
+        raise HTTPException(status_code=422, detail="음성을 인식하지 못했습니다.")
+
+    if session is not None:
+        new_turns, detected = _prepare_session_turn(session, transcript)
+        conversation = [*session.turns, *new_turns]
+    else:
+        detected = detect_language_code(transcript)
+        new_turns = []
+        if detected != (language or INITIAL_LANGUAGE):
+            new_turns.append(ChatMessage(role="system", content=build_language_instruction(detected)))
+        new_turns.append(ChatMessage(role="user", content=transcript))
+        conversation = [*turns, *new_turns]
+    instruction = new_turns[0].content if new_turns[0].role == "system" else None
+    header = {"transcript": transcript, "language": detected, "languageInstruction": instruction}
+
+    def _on_response(response: ChatResponse) -> None:
+        if session is not None:
+            _commit_session_turn(session, new_turns, detected, response)
+
+    if stream:
+        async def _frames():
+            yield _ndjson_frame({"type": "transcript", **header})
+            async for event in _reply_events(conversation, _on_response):
+                yield _ndjson_frame(event)
+
+        return StreamingResponse(_frames(), media_type="application/x-ndjson")
+
+    reply = await generate_completion(conversation)
+    response = await _finalize_reply(conversation, reply)
+    _on_response(response)
+    return VoiceTurnResponse(**response.model_dump(), **header)
+
+
+# -------- Realtime voice (WebSocket) --------
+
+async def _run_voice_turn(
+    session: ConversationSession,
+    buffer: UtteranceBuffer,
+    partials: PartialTranscriber,
+    send: Callable[[dict], Awaitable[None]],
+) -> None:
+    """Finish the buffered utterance: final transcript, then the LLM reply frames."""
+    if not len(buffer):
+        await partials.cancel()
+        return
+    try:
+        transcript = (await partials.finish(buffer)).strip()
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e)
+        print(f"Warning: realtime transcription failed: {detail}")
+        await send({"type": "error", "detail": detail})
+        return
+    finally:
+        buffer.reset()
+
+    await send({"type": "final", "text": transcript})
+    if not transcript:
+        return
+
+    new_turns, language = _prepare_session_turn(session, transcript)
+    history = [*session.turns, *new_turns]
+
+    def _on_response(response: ChatResponse) -> None:
+        _commit_session_turn(session, new_turns, language, response)
+
+    async for event in _reply_events(history, _on_response):
+        await send(event)
+
+
+@app.websocket("/api/voice/realtime")
+async def voice_realtime(
+    websocket: WebSocket,
+    sessionId: str | None = None,
+    language: str | None = None,
+    customerName: str | None = None,
+    audio_format: str = Query("webm", alias="format"),
+    sampleRate: int = 16000,
+) -> None:
+    """
+    Realtime voice turns over a WebSocket.
+    Client -> server: binary audio chunks, {"type": "end"} to finish the utterance, {"type": "cancel"} to drop it.
+    Server -> client: {"type": "ready", "sessionId", "language", "greeting"}, {"type": "partial", "text"},
+    {"type": "final", "text"}, then the same delta/reset/error/done frames as the streaming chat endpoints.
+    With format=pcm16 (16-bit mono at sampleRate) trailing silence also ends the utterance.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+
+    async def send(frame: dict) -> None:
+        async with send_lock:
+            await websocket.send_text(json.dumps(frame, ensure_ascii=False))
+
+    if audio_format not in AUDIO_FORMATS:
+        await send({"type": "error", "detail": f"format은 {', '.join(AUDIO_FORMATS)} 중 하나여야 합니다."})
+        await websocket.close(code=1003)
+        return
+
+    greeting = None
+    if sessionId:
+        session = get_session_store().get(sessionId)
+        if session is None:
+            await send({"type": "error", "detail": "세션을 찾을 수 없거나 만료되었습니다."})
+            await websocket.close(code=1008)
+            return
+    else:
+        session_language = language or INITIAL_LANGUAGE
+        greeting = greeting_by_language(session_language, customerName or "고객님")
+        session = get_session_store().create(session_language, [Turn("assistant", greeting)])
+    await send({"type": "ready", "sessionId": session.session_id, "language": session.language, "greeting": greeting})
+
+    buffer = UtteranceBuffer(audio_format, sampleRate)
+    partials = PartialTranscriber(
+        short_language_code(language),
+        lambda text: send({"type": "partial", "text": text}),
+    )
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            chunk = message.get("bytes")
+            if chunk is not None:
+                if not buffer.append(chunk):
+                    await partials.cancel()
+                    buffer.reset()
+                    await send({"type": "error", "detail": "발화가 너무 길거나 처리 중인 음성이 많습니다."})
+                elif buffer.end_of_utterance:
+                    await _run_voice_turn(session, buffer, partials, send)
+                else:
+                    partials.maybe_start(buffer)
+                continue
+
+            try:
+                control = json.loads(message.get("text") or "{}")
+            except json.JSONDecodeError:
+                control = {}
+            kind = control.get("type") if isinstance(control, dict) else None
+            if kind == "end":
+                await _run_voice_turn(session, buffer, partials, send)
+            elif kind == "cancel":
+                await partials.cancel()
+                buffer.reset()
+            else:
+                await send({"type": "error", "detail": "알 수 없는 메시지입니다."})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await partials.cancel()
+        buffer.reset()
+
+
+def _resolve_order_history(
+    payload: OrderConfirmRequest,
+) -> tuple[Sequence[ChatMessage | Turn], str, ConversationSession | None]:
+    """Use the server-side session when sessionId is given, otherwise the posted history."""
+    if payload.sessionId:
+        session = _require_session(payload.sessionId)
+        if not session.turns:
+            raise HTTPException(status_code=400, detail="history가 비어 있습니다.")
+        final_message = payload.finalMessage or session.last_assistant_message()
+        return list(session.turns), final_message, session
     if not payload.history:
         raise HTTPException(status_code=400, detail="history가 비어 있습니다.")
+    return payload.history, payload.finalMessage or "", None
 
-    order_id, summary = await _save_order(
-        payload.history,
-        payload.finalMessage or "",
-        order_type="주문확정",
-    )
+
+@app.post("/api/order/confirm", response_model=OrderConfirmResponse)
+async def order_confirm(payload: OrderConfirmRequest) -> OrderConfirmResponse:
+    history, final_message, session = _resolve_order_history(payload)
+
+    with priority_class(PRIORITY_ORDER):
+        order_id, summary = await _save_order(
+            history,
+            final_message,
+            order_type="주문확정",
+        )
+    if session is not None:
+        session.order_id = order_id
 
     return OrderConfirmResponse(
         orderId=order_id,
@@ -251,24 +749,55 @@ async def order_confirm(payload: OrderConfirmRequest) -> OrderConfirmResponse:
 
 @app.post("/api/order/change", response_model=OrderConfirmResponse)
 async def order_change(payload: OrderChangeRequest) -> OrderConfirmResponse:
-    if not payload.history:
-        raise HTTPException(status_code=400, detail="history가 비어 있습니다.")
+    history, final_message, _ = _resolve_order_history(payload)
     if not payload.orderId or not payload.orderId.strip():
         raise HTTPException(status_code=400, detail="orderId가 필요합니다.")
 
-    target_path = orders_dir / f"{payload.orderId}.json"
-    if not target_path.exists():
+    if not await run_in_threadpool(order_store.exists, payload.orderId):
         raise HTTPException(status_code=404, detail="해당 orderId를 찾을 수 없습니다.")
 
-    order_id, summary = await _save_order(
-        payload.history,
-        payload.finalMessage or "",
-        existing_order_id=payload.orderId,
-        order_type="주문변경",
-    )
+    with priority_class(PRIORITY_ORDER):
+        order_id, summary = await _save_order(
+            history,
+            final_message,
+            existing_order_id=payload.orderId,
+            order_type="주문변경",
+        )
 
     return OrderConfirmResponse(
         orderId=order_id,
         confirmedAt=summary.orderTime or datetime.utcnow().isoformat(),
         order=summary,
     )
+
+
+@app.get("/api/orders")
+async def order_list(
+    confirmedFrom: str | None = None,
+    confirmedTo: str | None = None,
+    deliveryFrom: str | None = None,
+    deliveryTo: str | None = None,
+    limit: int = 100,
+    x_admin_token: str | None = Header(default=None),
+) -> dict:
+    """List saved orders filtered by ISO-8601 confirmedAt/deliveryTime ranges (admin token required)."""
+    _require_admin(x_admin_token)
+    orders = await run_in_threadpool(
+        order_store.list,
+        confirmed_from=confirmedFrom,
+        confirmed_to=confirmedTo,
+        delivery_from=deliveryFrom,
+        delivery_to=deliveryTo,
+        limit=max(1, min(limit, 1000)),
+    )
+    return {"orders": orders}
+
+
+@app.get("/api/orders/{order_id}")
+async def order_detail(order_id: str, x_admin_token: str | None = Header(default=None)) -> dict:
+    """Saved order record by orderId (admin token required: it holds customer name and address)."""
+    _require_admin(x_admin_token)
+    record = await run_in_threadpool(order_store.get, order_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="해당 orderId를 찾을 수 없습니다.")
+    return record
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from fastapi import HTTPException
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.process_collector import ProcessCollector
+
+# LLM 호출은 수십 초까지 걸릴 수 있으므로 긴 구간까지 포함
+_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+
+STAGE_SECONDS = Histogram(
+    "voice_order_stage_seconds",
+    "Latency of one pipeline stage (stt, llm_chat, llm_summary, persist).",
+    ["stage", "provider", "model"],
+    buckets=_LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+REQUEST_SECONDS = Histogram(
+    "voice_order_http_request_seconds",
+    "Whole-request latency until the last body byte is sent.",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "voice_order_http_requests_in_flight",
+    "HTTP requests currently being handled.",
+    registry=REGISTRY,
+)
+LLM_TTFT_SECONDS = Histogram(
+    "voice_order_llm_time_to_first_token_seconds",
+    "Time from sending a streaming LLM request to its first text chunk.",
+    ["provider", "model"],
+    buckets=_LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+LLM_TOKENS = Counter(
+    "voice_order_llm_tokens",
+    "LLM tokens by direction (provider usage when reported, otherwise the local estimate).",
+    ["provider", "model", "direction"],
+    registry=REGISTRY,
+)
+LLM_IN_FLIGHT = Gauge(
+    "voice_order_llm_calls_in_flight",
+    "Provider calls currently waiting for an answer.",
+    ["provider"],
+    registry=REGISTRY,
+)
+ERRORS = Counter(
+    "voice_order_errors",
+    "Errors by stage and exception type.",
+    ["stage", "type"],
+    registry=REGISTRY,
+)
+
+
+def error_type(error: BaseException) -> str:
+    if isinstance(error, HTTPException):
+        return f"HTTP{error.status_code}"
+    return type(error).__name__
+
+
+def record_error(stage: str, error: BaseException) -> None:
+    ERRORS.labels(stage, error_type(error)).inc()
+
+
+@contextmanager
+def observe_stage(stage: str, provider: str, model: Optional[str] = None) -> Iterator[None]:
+    """Time a stage; failures are counted by type and cancelled calls (hedge losers) are not observed."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_error(stage, e)
+        STAGE_SECONDS.labels(stage, provider, model or "").observe(time.perf_counter() - started)
+        raise
+    STAGE_SECONDS.labels(stage, provider, model or "").observe(time.perf_counter() - started)
+
+
+def record_tokens(provider: str, model: Optional[str], input_tokens: int, output_tokens: int) -> None:
+    LLM_TOKENS.labels(provider, model or "", "input").inc(max(0, input_tokens))
+    LLM_TOKENS.labels(provider, model or "", "output").inc(max(0, output_tokens))
+
+
+class _StatsCollector:
+    """Exports the counters the existing /config/* stats objects already keep."""
+
+    def collect(self):
+        # 순환 import를 피하기 위해 수집 시점에 가져옴
+        from app.admission import get_admission_controller
+        from app.intent import get_intent_router_stats
+        from app.response_cache import get_response_cache
+        from app.routing import get_provider_router
+        from app.speculation import get_speculative_summaries
+
+        response_cache = get_response_cache().stats()
+        speculative = get_speculative_summaries().stats()
+        intent = get_intent_router_stats().stats()
+        caches = {
+            "response": (response_cache["hits"], response_cache["misses"]),
+            "speculative_summary": (speculative["reused"], speculative["missed"]),
+            "intent_router": (sum(intent["routed"].values()), intent["fallthrough"]),
+        }
+        lookups = CounterMetricFamily(
+            "voice_order_cache_lookups", "Cache lookups by result.", labels=["cache", "result"]
+        )
+        ratios = GaugeMetricFamily(
+            "voice_order_cache_hit_ratio", "Hits / (hits + misses) since start.", labels=["cache"]
+        )
+        for name, (hits, misses) in caches.items():
+            lookups.add_metric([name, "hit"], hits)
+            lookups.add_metric([name, "miss"], misses)
+            ratios.add_metric([name], hits / (hits + misses) if hits + misses else 0.0)
+        yield lookups
+        yield ratios
+
+        admission = get_admission_controller().stats()
+        queued = GaugeMetricFamily(
+            "voice_order_llm_queued_calls", "Provider calls waiting for an admission slot.", labels=["provider", "priority"]
+        )
+        rejected = CounterMetricFamily(
+            "voice_order_admission_rejections", "Calls rejected by admission control.", labels=["provider", "reason"]
+        )
+        for provider, limiter in admission["providers"].items():
+            for priority in ("order", "chat"):
+                queued.add_metric([provider, priority], limiter["queued"].get(priority, 0))
+            for reason, count in limiter["rejected"].items():
+                rejected.add_metric([provider, reason], count)
+        rejected.add_metric(["", "loopLag"], admission["shed"])
+        yield queued
+        yield rejected
+        yield GaugeMetricFamily("voice_order_event_loop_lag_ms", "Smoothed event loop lag.", value=admission["loopLagMs"])
+
+        breaker = GaugeMetricFamily(
+            "voice_order_llm_breaker_open", "1 while the provider circuit breaker is not closed.", labels=["provider"]
+        )
+        for provider, state in get_provider_router().stats()["providers"].items():
+            breaker.add_metric([provider], 0 if state["breaker"] == "closed" else 1)
+        yield breaker
+
+
+REGISTRY.register(_StatsCollector())
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing HTTP requests to the end of the response body (streams included)."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def _send(message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, _send)
+        except Exception as e:
+            record_error("request", e)
+            raise
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            # 경로 파라미터(sessionId 등)로 라벨이 늘어나지 않도록 라우트 템플릿을 사용
+            REQUEST_SECONDS.labels(
+                scope.get("method", ""),
+                getattr(route, "path", "unmatched"),
+                str(status["code"]),
+            ).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
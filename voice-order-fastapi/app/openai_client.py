@@ -1,22 +1,45 @@
 from __future__ import annotations
 
+import httpx
 from fastapi import HTTPException
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 from app.config import settings
 
 
-_openai_client: OpenAI | None = None
+_openai_client: AsyncOpenAI | None = None
 
 
-def get_openai_client() -> OpenAI:
+def get_openai_client() -> AsyncOpenAI:
     """
-    Returns a singleton OpenAI client instance.
+    Returns a singleton AsyncOpenAI client instance.
+    Concurrency is bounded by its connection pool rather than a thread pool.
     Raises HTTPException if OPENAI_API_KEY is not configured.
     """
     global _openai_client
     if _openai_client is None:
         if not settings.OPENAI_API_KEY:
             raise HTTPException(status_code=500, detail="OPENAI_API_KEY가 설정되어 있지 않습니다.")
-        _openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.VOICE_ORDER_OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.VOICE_ORDER_OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        _openai_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=http_client,
+            timeout=httpx.Timeout(
+                settings.VOICE_ORDER_OPENAI_TIMEOUT,
+                connect=settings.VOICE_ORDER_OPENAI_CONNECT_TIMEOUT,
+            ),
+            max_retries=settings.VOICE_ORDER_OPENAI_MAX_RETRIES,
+        )
     return _openai_client
+
+
+async def close_openai_client() -> None:
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
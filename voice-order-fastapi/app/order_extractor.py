@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.context import CompiledCatalog, get_catalog
+from app.conversation import extract_greeting_name
+from app.schemas import ChatMessage, OrderItem, OrderSummary
+
+
+# 숫자 대신 쓰이는 한국어 수사
+_KOREAN_NUMBERS = {
+    "한": 1, "하나": 1, "두": 2, "둘": 2, "세": 3, "셋": 3, "네": 4, "넷": 4,
+    "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10,
+}
+_NUMBER = r"(\d+|" + "|".join(sorted(_KOREAN_NUMBERS, key=len, reverse=True)) + r")"
+# "기준 2인분"은 메뉴 구성 설명이므로 세트 수량 단위에서 제외
+_SET_QUANTITY_PATTERN = re.compile(_NUMBER + r"\s*(?:개|세트|set)", re.IGNORECASE)
+_COMPONENT_UNITS = r"(?:개|잔|병|접시|포트|조각|장|인분)?"
+
+_RELATIVE_DAYS = {"오늘": 0, "내일": 1, "모레": 2, "글피": 3, "today": 0, "tomorrow": 1}
+_WEEKDAYS = {"월": 0, "화": 1, "수": 2, "목": 3, "금": 4, "토": 5, "일": 6}
+_PM_MARKERS = ("오후", "저녁", "밤", "pm")
+_AM_MARKERS = ("오전", "아침", "새벽", "am")
+
+# 구성 수량 변경 요청: 안내 문구의 숫자가 총수량인지 기본 구성에 더할 수량("스테이크 1개 추가")인지
+# 구분할 수 없으므로 항상 LLM 요약 사용
+_MODIFICATION_CUES = ("추가", "늘려", "줄여", "변경", "바꿔", "바꾸", "더", "로 해", "으로 해", "로 할게", "으로 할게", "만 주", "만 해")
+# 고객이 이름을 직접 말한 경우: 인사말에서 이름을 찾지 못하면 LLM 요약 사용
+_NAME_CUES = ("이름", "성함", "저는")
+# 구성품 제외/대체 요청: 추출기가 표현할 수 없으므로 항상 LLM 요약 사용
+_REMOVAL_CUES = ("빼", "말고", "없이", "제외", "대신", "대체")
+_ADDRESS_CUES = ("주소", "아파트", "번지", "오피스텔", "빌라", "배달지", "배송지")
+_REGIONS = "서울|부산|대구|인천|광주|대전|울산|세종|경기|강원|충북|충남|전북|전남|경북|경남|제주"
+# 주소 뒤에 붙는 조사/어미 ("역삼동으로", "강남구에", "서울까지")
+_ADDRESS_TAIL = r"(?=[^가-힣]|$|(?:으로|로|에서|에|까지|쪽|이요|요|이에요|예요|입니다|이고|인데))"
+# 주소로 보이는 구간: 시/도 이름, 시·구 + 구·동, 조사가 붙은 구·동 이름, 도로명 + 번호, 동·호·층 번호
+_ADDRESS_PATTERN = re.compile(
+    rf"(?<![가-힣])(?:{_REGIONS})(?:특별시|광역시|특별자치시|특별자치도|시|도)?{_ADDRESS_TAIL}"
+    rf"|[가-힣]{{1,10}}(?:시|군|구)\s*[가-힣]{{1,10}}(?:구|동|읍|면|가){_ADDRESS_TAIL}"
+    r"|(?<![가-힣])[가-힣]{1,3}(?:구|군|동|읍|면)(?=으로|로|에서|에|까지|쪽)"
+    r"|[가-힣]{1,15}(?:로|길)\s*\d+(?:-\d+)?(?![\d-])(?!\s*(?:개|세트|인분|명|병|잔|접시|시|분|일|월))"
+    rf"|\d+\s*(?:동|호|층|번지){_ADDRESS_TAIL}"
+)
+_GREETING_NAME_PATTERN = re.compile(r"(?<![가-힣A-Za-z])([가-힣]{2,4}|[A-Za-z]{2,10})\s*고객님")
+_NAME_STOPWORDS = {"우리", "저희", "모든", "소중한", "이건", "해당", "많은"}
+_NEGATION_CUES = ("안 ", "않", "없", "말고")
+_COUPON_CODE_PATTERN = re.compile(r"\b[A-Z][A-Z0-9]{5,}\b")
+
+
+class OrderExtraction(NamedTuple):
+    """Rule-based order summary with a confidence score and the reasons it was lowered."""
+    summary: OrderSummary
+    confidence: float
+    reasons: List[str]
+
+
+class _MenuEntry(NamedTuple):
+    name: str
+    pattern: re.Pattern
+    # (catalog item name, alias pattern, default qty) for priced components only
+    components: List[Tuple[str, re.Pattern, int]]
+
+
+class _ExtractorCatalog(NamedTuple):
+    menus: List[_MenuEntry]
+    styles: List[Tuple[str, re.Pattern]]
+
+
+def _flexible_pattern(text: str) -> str:
+    """Regex matching text with optional whitespace between its words."""
+    return r"\s*".join(re.escape(part) for part in text.split())
+
+
+def _component_aliases(item_name: str) -> List[str]:
+    aliases = [item_name]
+    base = re.sub(r"\(.*?\)", "", item_name).strip()
+    if base and base != item_name:
+        aliases.append(base)
+    words = base.split()
+    if len(words) > 1:
+        aliases.append(words[-1])
+    return aliases
+
+
+def _extractor_catalog() -> _ExtractorCatalog:
+    return _compile_extractor_catalog(get_catalog())
+
+
+@lru_cache(maxsize=1)
+def _compile_extractor_catalog(compiled: CompiledCatalog) -> _ExtractorCatalog:
+    """Regex index over a catalog snapshot; recompiled when the catalog is reloaded."""
+    catalog = compiled.data
+    components: Dict[str, List[Tuple[str, re.Pattern, int]]] = {}
+    for item in catalog.menu_items:
+        menu_name = (item.get("menu_name") or item.get("menu") or "").strip()
+        item_name = (item.get("item_name") or "").strip()
+        # 가격이 없는 비식품 항목(접시, 냅킨 등)은 변경할 수 없으므로 제외
+        if not menu_name or not item_name or not item.get("unit_price"):
+            continue
+        aliases = "|".join(_flexible_pattern(alias) for alias in _component_aliases(item_name))
+        try:
+            default_qty = int(item.get("default_qty") or 1)
+        except ValueError:
+            default_qty = 1
+        components.setdefault(menu_name, []).append((item_name, re.compile(f"(?:{aliases})"), default_qty))
+
+    menus = []
+    for menu in catalog.menus:
+        name = (menu.get("name") or "").strip()
+        if name:
+            menus.append(_MenuEntry(name, re.compile(_flexible_pattern(name)), components.get(name, [])))
+
+    styles = []
+    for style in catalog.styles:
+        name = (style.get("name") or "").strip()
+        if not name:
+            continue
+        short = name.replace("스타일", "").strip()
+        alias = _flexible_pattern(name) + (f"|{re.escape(short)}" if short and short != name else "")
+        styles.append((name, re.compile(f"(?:{alias})")))
+    return _ExtractorCatalog(menus, styles)
+
+
+def _to_int(token: str) -> int:
+    return int(token) if token.isdigit() else _KOREAN_NUMBERS[token]
+
+
+def _menu_segments(text: str, menus: Iterable[_MenuEntry]) -> List[Tuple[_MenuEntry, str]]:
+    """Split text into one segment per mentioned menu (from the mention to the next menu mention)."""
+    mentions = []
+    for menu in menus:
+        for match in menu.pattern.finditer(text):
+            mentions.append((match.start(), match.end(), menu))
+    mentions.sort(key=lambda mention: mention[0])
+
+    segments: Dict[str, Tuple[_MenuEntry, List[str]]] = {}
+    for index, (start, end, menu) in enumerate(mentions):
+        stop = mentions[index + 1][0] if index + 1 < len(mentions) else len(text)
+        segments.setdefault(menu.name, (menu, []))[1].append(text[end:stop])
+    return [(menu, " ".join(parts)) for menu, parts in segments.values()]
+
+
+def _explicit_components(segment: str, menu: _MenuEntry) -> Tuple[Dict[str, int], str]:
+    """Return component quantities stated in the segment and the segment with those mentions removed."""
+    quantities: Dict[str, int] = {}
+    remaining = segment
+    for item_name, pattern, _ in menu.components:
+        match = re.search(pattern.pattern + r"\s*(?:=|:|x|×)?\s*" + _NUMBER + r"\s*" + _COMPONENT_UNITS, remaining)
+        if match:
+            quantities[item_name] = _to_int(match.group(1))
+            remaining = remaining[:match.start()] + " " + remaining[match.end():]
+    return quantities, remaining
+
+
+def _resolve_date(text: str, base: date) -> Optional[date]:
+    try:
+        return _parse_date(text, base)
+    except ValueError:
+        # 존재하지 않는 날짜(예: 13월 40일)는 해석하지 않음
+        return None
+
+
+def _parse_date(text: str, base: date) -> Optional[date]:
+    iso = re.search(r"(\d{4})-(\d{1,2})-(\d{1,2})", text)
+    if iso:
+        return date(int(iso.group(1)), int(iso.group(2)), int(iso.group(3)))
+
+    month_day = re.search(r"(?:(\d{4})\s*년\s*)?(\d{1,2})\s*월\s*(\d{1,2})\s*일", text)
+    if month_day:
+        year = int(month_day.group(1)) if month_day.group(1) else base.year
+        resolved = date(year, int(month_day.group(2)), int(month_day.group(3)))
+        if not month_day.group(1) and resolved < base:
+            resolved = resolved.replace(year=base.year + 1)
+        return resolved
+
+    lowered = text.lower()
+    for word, offset in sorted(_RELATIVE_DAYS.items(), key=lambda pair: -len(pair[0])):
+        if word in lowered:
+            return base + timedelta(days=offset)
+
+    weekday = re.search(r"(이번\s*주|다음\s*주)?\s*([월화수목금토일])요일", text)
+    if weekday:
+        target = _WEEKDAYS[weekday.group(2)]
+        days_ahead = (target - base.weekday()) % 7
+        if weekday.group(1) and "다음" in weekday.group(1):
+            # 다음 주 = 기준 날짜가 속한 주의 다음 주 (월요일 시작)
+            days_ahead = 7 - base.weekday() + target
+        return base + timedelta(days=days_ahead)
+
+    day_only = re.search(r"(?<![\d월])(\d{1,2})\s*일(?!\s*(?:간|동안))", text)
+    if day_only:
+        resolved = base.replace(day=int(day_only.group(1)))
+        if resolved < base:
+            month = base.month % 12 + 1
+            resolved = resolved.replace(year=base.year + (1 if month == 1 else 0), month=month)
+        return resolved
+    return None
+
+
+def _resolve_time(text: str) -> Tuple[Optional[Tuple[int, int]], bool]:
+    """Return ((hour, minute), ambiguous) for the first time expression in text."""
+    colon = re.search(r"(\d{1,2}):(\d{2})", text)
+    korean = re.search(r"(\d{1,2})\s*시\s*(?:(\d{1,2})\s*분|(반))?", text)
+    match = colon or korean
+    if not match:
+        return None, False
+
+    hour = int(match.group(1))
+    if colon:
+        minute = int(match.group(2))
+    else:
+        minute = int(match.group(2)) if match.group(2) else (30 if match.group(3) else 0)
+
+    context = text[max(0, match.start() - 6):match.end() + 3].lower()
+    if any(marker in context for marker in _PM_MARKERS):
+        if hour < 12:
+            hour += 12
+        return (hour, minute), False
+    if any(marker in context for marker in _AM_MARKERS):
+        return (hour % 12, minute), False
+    # 오전/오후 표기가 없는 1~11시는 해석이 모호함
+    return (hour, minute), 1 <= hour <= 11
+
+
+def _customer_name(history: List[ChatMessage], text: str) -> Optional[str]:
+    for message in history:
+        if message.role == "assistant":
+            name = extract_greeting_name(message.content)
+            if name:
+                return name.strip()
+    # 인사말 템플릿과 문구가 다르면 안내 문구의 "OOO 고객님"에서 찾음
+    for content in [text, *(message.content for message in reversed(history) if message.role == "assistant")]:
+        for match in _GREETING_NAME_PATTERN.finditer(content or ""):
+            if match.group(1) not in _NAME_STOPWORDS:
+                return match.group(1)
+    return None
+
+
+def _coupon(user_text: str) -> Tuple[Optional[str], Optional[bool], bool]:
+    """Return (couponCode, useCoupon, ambiguous)."""
+    if "쿠폰" not in user_text and "coupon" not in user_text.lower():
+        return None, None, False
+    code_match = _COUPON_CODE_PATTERN.search(user_text)
+    code = code_match.group(0) if code_match else None
+    window = user_text[user_text.find("쿠폰"):][:20] if "쿠폰" in user_text else ""
+    if any(cue in window for cue in _NEGATION_CUES):
+        return None, False, False
+    return code, True, code is None
+
+
+def mentions_customer_details(text: str) -> bool:
+    """True when text looks like it gives the customer's name or a delivery address."""
+    return any(cue in text for cue in (*_ADDRESS_CUES, *_NAME_CUES)) or bool(_ADDRESS_PATTERN.search(text))
+
+
+def extract_order(history: Iterable[ChatMessage], final_message: str, assumed_date: str) -> OrderExtraction:
+    """
+    Build an OrderSummary from the confirmation read-back using the menu/style/component catalog.
+    The confidence score drops for every field that could not be resolved unambiguously,
+    so callers can fall back to LLM summarization below a threshold.
+    """
+    history = list(history)
+    catalog = _extractor_catalog()
+    reasons: List[str] = []
+
+    # 최종 확정 메시지에 주문 내용이 다시 명시되므로 우선 사용하고, 없으면 직전 안내 메시지를 사용
+    source = final_message or ""
+    segments = _menu_segments(source, catalog.menus)
+    if not segments:
+        for message in reversed(history):
+            if message.role == "assistant":
+                segments = _menu_segments(message.content, catalog.menus)
+                if segments:
+                    source = message.content
+                    break
+    if not segments:
+        return OrderExtraction(OrderSummary(customerName=_customer_name(history, source)), 0.0, ["menu not found"])
+
+    confidence = 1.0
+    user_text = " ".join(message.content for message in history if message.role == "user")
+
+    order_items: List[OrderItem] = []
+    for menu, segment in segments:
+        explicit, remaining = _explicit_components(segment, menu)
+        # 구성품 수량("스테이크 2개")을 제거한 뒤 메뉴명 바로 뒤의 세트 수량을 찾음
+        quantity_match = _SET_QUANTITY_PATTERN.search(remaining[:40])
+        quantity = _to_int(quantity_match.group(1)) if quantity_match else 1
+        menu_items = ", ".join(
+            f"{item_name}={explicit.get(item_name, default_qty * quantity)}"
+            for item_name, _, default_qty in menu.components
+        )
+
+        style = None
+        for style_name, pattern in catalog.styles:
+            if pattern.search(segment):
+                style = style_name
+                break
+        if style is None:
+            confidence -= 0.3
+            reasons.append(f"style missing for {menu.name}")
+        order_items.append(OrderItem(menuName=menu.name, menuStyle=style, menuItems=menu_items, quantity=quantity))
+
+    base_date = datetime.strptime(assumed_date, "%Y-%m-%d").date()
+    delivery_date = _resolve_date(source, base_date)
+    delivery_time, ambiguous_time = _resolve_time(source)
+    delivery = None
+    if delivery_date is None:
+        confidence -= 0.3
+        reasons.append("delivery date missing")
+    else:
+        hour, minute = delivery_time or (0, 0)
+        delivery = datetime(delivery_date.year, delivery_date.month, delivery_date.day, hour, minute).isoformat()
+        if delivery_time is None:
+            confidence -= 0.2
+            reasons.append("delivery time missing")
+        elif ambiguous_time:
+            confidence -= 0.3
+            reasons.append("delivery time am/pm ambiguous")
+
+    coupon_code, use_coupon, ambiguous_coupon = _coupon(user_text)
+    if ambiguous_coupon:
+        confidence -= 0.2
+        reasons.append("coupon mentioned without code")
+    # 추출기는 주소, 구성 변경, 직접 말한 이름을 채우지 못하므로 임계값과 무관하게 LLM 요약으로 넘김
+    if any(cue in user_text for cue in _ADDRESS_CUES) or _ADDRESS_PATTERN.search(f"{user_text} {source}"):
+        confidence = 0.0
+        reasons.append("address mentioned")
+    if any(cue in user_text for cue in _REMOVAL_CUES):
+        confidence = 0.0
+        reasons.append("component removal or substitution requested")
+    if any(cue in f"{user_text} {source}" for cue in _MODIFICATION_CUES):
+        confidence = 0.0
+        reasons.append("component changes requested")
+    customer_name = _customer_name(history, source)
+    if customer_name is None and any(cue in user_text for cue in _NAME_CUES):
+        confidence = 0.0
+        reasons.append("customer name given but not found")
+
+    summary = OrderSummary(
+        customerName=customer_name,
+        deliveryTime=delivery,
+        couponCode=coupon_code,
+        useCoupon=use_coupon,
+        orderItems=order_items,
+    )
+    # parse_summary_text와 동일하게 단일 메뉴일 때는 기존 필드도 채움
+    if len(order_items) == 1:
+        item = order_items[0]
+        summary.menuName = item.menuName
+        summary.menuStyle = item.menuStyle
+        summary.menuItems = item.menuItems
+        summary.quantity = item.quantity
+    return OrderExtraction(summary, max(confidence, 0.0), reasons)
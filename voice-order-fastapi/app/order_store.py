@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from app.config import settings, APP_DIR
+
+
+def default_orders_dir() -> Path:
+    if settings.VOICE_ORDER_ORDER_DIR:
+        return Path(settings.VOICE_ORDER_ORDER_DIR).resolve()
+    return APP_DIR / "data" / "orders"
+
+
+def _delivery_time(record: dict) -> Optional[str]:
+    summary = record.get("summary") or {}
+    return summary.get("deliveryTime") or None
+
+
+class OrderStore(ABC):
+    """Storage engine interface for confirmed order records (orderType/orderId/confirmedAt/summary)."""
+
+    name = "base"
+
+    @abstractmethod
+    def save(self, record: dict) -> None:
+        ...
+
+    def save_many(self, records: Iterable[dict]) -> int:
+        count = 0
+        for record in records:
+            self.save(record)
+            count += 1
+        return count
+
+    @abstractmethod
+    def get(self, order_id: str) -> Optional[dict]:
+        ...
+
+    def exists(self, order_id: str) -> bool:
+        return self.get(order_id) is not None
+
+    @abstractmethod
+    def list(
+        self,
+        *,
+        confirmed_from: Optional[str] = None,
+        confirmed_to: Optional[str] = None,
+        delivery_from: Optional[str] = None,
+        delivery_to: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[dict]:
+        """Orders filtered by ISO-8601 ranges (inclusive), newest confirmation first."""
+
+    def close(self) -> None:
+        pass
+
+
+class JsonFileOrderStore(OrderStore):
+    """Compatibility backend: one JSON file per order (<orders_dir>/<orderId>.json)."""
+
+    name = "json"
+
+    def __init__(self, orders_dir: Path) -> None:
+        self.orders_dir = orders_dir
+        self.orders_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, order_id: str) -> Path:
+        return self.orders_dir / f"{order_id}.json"
+
+    def _write_temp(self, record: dict) -> str:
+        # 임시 파일에 쓴 뒤 교체해 부분적으로 쓰인 파일이 남지 않도록 함
+        fd, tmp_path = tempfile.mkstemp(dir=self.orders_dir, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                json.dump(record, fp, ensure_ascii=False, indent=2)
+                fp.flush()
+                os.fsync(fp.fileno())
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return tmp_path
+
+    def _sync_dir(self) -> None:
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.orders_dir, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def save(self, record: dict) -> None:
+        self.save_many([record])
+
+    def save_many(self, records: Iterable[dict]) -> int:
+        """Write every record to a temp file first, then rename them and sync the directory once."""
+        pending = []
+        try:
+            for record in records:
+                path = self._path(record["orderId"])
+                pending.append((self._write_temp(record), path))
+        except BaseException:
+            for tmp_path, _ in pending:
+                Path(tmp_path).unlink(missing_ok=True)
+            raise
+        for tmp_path, path in pending:
+            os.replace(tmp_path, path)
+        if pending:
+            self._sync_dir()
+        return len(pending)
+
+    def get(self, order_id: str) -> Optional[dict]:
+        path = self._path(order_id)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def exists(self, order_id: str) -> bool:
+        return self._path(order_id).exists()
+
+    def list(
+        self,
+        *,
+        confirmed_from: Optional[str] = None,
+        confirmed_to: Optional[str] = None,
+        delivery_from: Optional[str] = None,
+        delivery_to: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[dict]:
+        records = []
+        for record in iter_json_orders(self.orders_dir):
+            confirmed = record.get("confirmedAt") or ""
+            delivery = _delivery_time(record)
+            if confirmed_from and confirmed < confirmed_from:
+                continue
+            if confirmed_to and confirmed > confirmed_to:
+                continue
+            if (delivery_from or delivery_to) and not delivery:
+                continue
+            if delivery_from and delivery < delivery_from:
+                continue
+            if delivery_to and delivery > delivery_to:
+                continue
+            records.append(record)
+        records.sort(key=lambda record: record.get("confirmedAt") or "", reverse=True)
+        return records[:limit]
+
+
+class SQLiteOrderStore(OrderStore):
+    """Default backend: SQLite in WAL mode, indexed by orderId, confirmedAt and deliveryTime."""
+
+    name = "sqlite"
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id TEXT PRIMARY KEY,
+            order_type TEXT NOT NULL,
+            confirmed_at TEXT NOT NULL,
+            delivery_time TEXT,
+            record TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_orders_confirmed_at ON orders (confirmed_at);
+        CREATE INDEX IF NOT EXISTS idx_orders_delivery_time ON orders (delivery_time);
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.created = not db_path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # 커밋마다 WAL을 fsync하므로 save_many 호출 단위로 내구성이 보장됨
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(self._SCHEMA)
+
+    @staticmethod
+    def _row(record: dict) -> tuple:
+        return (
+            record["orderId"],
+            record.get("orderType") or "주문확정",
+            record.get("confirmedAt") or "",
+            _delivery_time(record),
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")),
+        )
+
+    def save(self, record: dict) -> None:
+        self.save_many([record])
+
+    def save_many(self, records: Iterable[dict]) -> int:
+        """Write records in one transaction (all or nothing); existing orderIds are replaced."""
+        rows = [self._row(record) for record in records]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO orders (order_id, order_type, confirmed_at, delivery_time, record) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(rows)
+
+    def get(self, order_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def exists(self, order_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return row is not None
+
+    def list(
+        self,
+        *,
+        confirmed_from: Optional[str] = None,
+        confirmed_to: Optional[str] = None,
+        delivery_from: Optional[str] = None,
+        delivery_to: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[dict]:
+        clauses, params = [], []
+        for column, operator, value in (
+            ("confirmed_at", ">=", confirmed_from),
+            ("confirmed_at", "<=", confirmed_to),
+            ("delivery_time", ">=", delivery_from),
+            ("delivery_time", "<=", delivery_to),
+        ):
+            if value:
+                clauses.append(f"{column} {operator} ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT record FROM orders {where} ORDER BY confirmed_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*params, limit)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def iter_json_orders(orders_dir: Path) -> Iterable[dict]:
+    """Yield order records from a file-per-order directory, skipping unreadable files."""
+    for path in sorted(orders_dir.glob("*.json")):
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Failed to read order file {path}: {e}")
+            continue
+        if not isinstance(record, dict):
+            continue
+        # 초기 파일에는 orderType/orderId가 없을 수 있음
+        record.setdefault("orderId", path.stem)
+        record.setdefault("orderType", "주문확정")
+        record.setdefault("confirmedAt", (record.get("summary") or {}).get("orderTime") or "")
+        yield record
+
+
+def import_json_orders(orders_dir: Path, store: SQLiteOrderStore) -> int:
+    """One-shot import of existing <orderId>.json files into the SQLite store."""
+    return store.save_many(iter_json_orders(orders_dir))
+
+
+def _build_order_store() -> OrderStore:
+    orders_dir = default_orders_dir()
+    backend = (settings.VOICE_ORDER_ORDER_STORE or "sqlite").strip().lower()
+    if backend == "json":
+        return JsonFileOrderStore(orders_dir)
+    if backend != "sqlite":
+        raise RuntimeError(f"지원하지 않는 VOICE_ORDER_ORDER_STORE 값입니다: {backend}")
+
+    db_path = (
+        Path(settings.VOICE_ORDER_ORDER_DB_PATH).expanduser().resolve()
+        if settings.VOICE_ORDER_ORDER_DB_PATH
+        else orders_dir / "orders.sqlite3"
+    )
+    store = SQLiteOrderStore(db_path)
+    if store.created and orders_dir.exists():
+        imported = import_json_orders(orders_dir, store)
+        if imported:
+            print(f"✅ 기존 JSON 주문 {imported}건을 {db_path}로 가져왔습니다.")
+    return store
+
+
+_order_store: OrderStore | None = None
+_order_store_lock = threading.Lock()
+
+
+def get_order_store() -> OrderStore:
+    """Returns the configured order storage engine (VOICE_ORDER_ORDER_STORE=sqlite | json)."""
+    global _order_store
+    with _order_store_lock:
+        if _order_store is None:
+            _order_store = _build_order_store()
+        return _order_store
+
+
+if __name__ == "__main__":
+    # 수동 가져오기: python -m app.order_store [orders_dir]
+    source_dir = Path(sys.argv[1]).resolve() if len(sys.argv) > 1 else default_orders_dir()
+    target = get_order_store()
+    if not isinstance(target, SQLiteOrderStore):
+        raise SystemExit("VOICE_ORDER_ORDER_STORE=sqlite일 때만 가져올 수 있습니다.")
+    print(f"{import_json_orders(source_dir, target)}건을 가져왔습니다. (총 {target.count()}건)")
@@ -1,9 +1,19 @@
 from __future__ import annotations
 
+import json
+import re
+from functools import lru_cache
 from typing import Iterable
 
-from app.context import _load_all_catalog_data
+try:
+    import orjson
+except ImportError:  # orjson 미설치 시 표준 json 사용
+    orjson = None
+
+from app.context import CompiledCatalog, get_catalog
+from app.history import compact_history
 from app.schemas import ChatMessage, OrderSummary, OrderItem
+from app.timing import timed
 
 
 SUMMARY_KEYS = [
@@ -17,129 +27,144 @@ SUMMARY_KEYS = [
     "couponCode",
     "useCoupon",
 ]
+# 구조화 출력(JSON) 모드에서 모델이 채우는 필드: 메뉴는 항상 orderItems 배열로 받음
+JSON_SUMMARY_KEYS = ["customerName", "customerAddress", "deliveryTime", "couponCode", "useCoupon"]
 
 
-def _normalize_menu_key(value: str) -> str:
-    if not value:
-        return ""
-    return " ".join(value.strip().split()).casefold()
-
-
-def _extract_menu_key(entry: dict[str, str], candidate_fields: Iterable[str]) -> str:
-    for field in candidate_fields:
-        raw_value = entry.get(field)
-        if raw_value:
-            key = _normalize_menu_key(raw_value)
-            if key:
-                return key
-    return ""
-
-
-def _build_menu_item_guide() -> str:
-    """Build menu item guide dynamically from catalog data."""
-    catalog = _load_all_catalog_data()
-
-    # Group menu items by normalized menu identifier (name or ID)
-    menu_components = {}
-    for item in catalog.menu_items:
-        menu_key = _extract_menu_key(item, ("menu_id", "menu_name", "menu"))
-        item_name = item.get("item_name", "").strip()
-
-        # Skip non-food items (decorations, napkins, etc.) - only track items with prices
-        if not item.get("unit_price"):
-            continue
-
-        if not menu_key:
-            continue
-
-        if menu_key not in menu_components:
-            menu_components[menu_key] = []
-        menu_components[menu_key].append(item_name)
-
-    # Build guide text for each menu
-    guide_lines = ["For the menuItems line, describe final quantities per component using comma-separated `항목=수량` pairs. Reflect any changes the customer requested. Use these component sets:"]
-
-    for menu in catalog.menus:
-        menu_key = _extract_menu_key(menu, ("menu_id", "name"))
-        menu_name = menu.get("name", "").strip()
-
-        if menu_key and menu_key in menu_components:
-            components = ", ".join(menu_components[menu_key])
-            guide_lines.append(f"- {menu_name}: {components}")
+def _field_rules(assumed_date: str) -> list[str]:
+    return [
+        f"Use ISO 8601 format (YYYY-MM-DDTHH:mm:ss) for deliveryTime. Assume today is {assumed_date} and normalize any inferred delivery date to that day unless the customer explicitly requested another date.",
+        "For quantity: extract the number of menu sets ordered for EACH menu separately (e.g., '발렌타인 디너 2개' means quantity = 2 for that menu). If not mentioned, use 1.",
+        "For couponCode: extract the coupon code or name if the customer mentioned using a coupon (e.g., 'REGULAR10000', '단골 쿠폰', '쿠폰 사용'). If no coupon mentioned, use null.",
+        "For useCoupon: set to true if customer mentioned using a coupon, false if they explicitly said not to use one, null if not mentioned.",
+        "For deliveryTime: if customer mentioned a specific future date/time for delivery, set it here. If they want immediate delivery or didn't specify, use null.",
+    ]
 
-    guide_lines.append("If multiple 세트가 함께 주문되면 각 세트에 맞는 항목을 모두 포함하고, 언급되지 않은 항목은 `항목=미확인`으로 남기세요.")
-    guide_lines.append("")
-    guide_lines.append("IMPORTANT: When multiple menus are ordered, you must list each menu separately in the orderItems section below.")
 
-    return "\n".join(guide_lines)
+@lru_cache(maxsize=8)
+def _summary_system_prompt(catalog: CompiledCatalog, assumed_date: str) -> str:
+    """Summary instructions for a catalog snapshot; rebuilt only after a catalog reload."""
+    return "\n".join(
+        [
+            "You are an expert maître d' that produces structured order snapshots for Mr. Daebak Dinner.",
+            "Return plain text with the following structure:",
+            "",
+            "First, output these common fields (one per line):",
+            "customerName = <customer's name mentioned in conversation or greeting (e.g., '홍길동', '김철수') or null if not mentioned>",
+            "customerAddress = <value or null>",
+            "deliveryTime = <ISO 8601 datetime or null>",
+            "couponCode = <coupon code or coupon name mentioned by customer or null>",
+            "useCoupon = <true or false or null>",
+            "",
+            "Then, for the menu information:",
+            "- If only ONE menu is ordered, output these lines:",
+            "  menuName = <menu name>",
+            "  menuStyle = <style name or null>",
+            "  menuItems = <comma separated list of item=quantity>",
+            "  quantity = <integer number or null>",
+            "",
+            "- If MULTIPLE menus are ordered, output orderItems array instead:",
+            "  orderItems = [",
+            "    {menuName: '<menu name 1>', menuStyle: '<style or null>', menuItems: '<item=quantity pairs>', quantity: <number>},",
+            "    {menuName: '<menu name 2>', menuStyle: '<style or null>', menuItems: '<item=quantity pairs>', quantity: <number>}",
+            "  ]",
+            "",
+            "For orderItems: each menu must have its own entry with menuName, menuStyle (can be null), menuItems (can be null), and quantity.",
+            "When multiple menus are ordered, DO NOT use the single menuName/menuStyle/menuItems/quantity fields. Use orderItems array instead.",
+            "",
+            *_field_rules(assumed_date),
+            'Do not add extra lines or commentary. Use "null" (without quotes) for missing information. Use "true" or "false" (lowercase, without quotes) for boolean values.',
+            "When the conversation was in Korean, keep the values in Korean; otherwise mirror the customer language.",
+            "",
+            catalog.menu_item_guide,
+            "",
+            catalog.style_guide,
+        ]
+    )
 
 
-def _build_style_guide() -> str:
-    """Provide available style names to encourage consistent menuStyle output."""
-    catalog = _load_all_catalog_data()
-    lines = ["Use one of these 서빙 스타일 이름(또는 null) for menuStyle:"]
-    for style in catalog.styles:
-        name = style.get("name", "").strip()
-        if not name:
-            continue
-        description = style.get("description", "").strip() or "설명 없음"
-        lines.append(f"- {name}: {description}")
-    return "\n".join(lines)
+@lru_cache(maxsize=8)
+def _summary_json_system_prompt(catalog: CompiledCatalog, assumed_date: str) -> str:
+    """Instructions for the JSON-schema summary mode (the schema itself is sent as response_format)."""
+    return "\n".join(
+        [
+            "You are an expert maître d' that produces structured order snapshots for Mr. Daebak Dinner.",
+            "Return only a JSON object with customerName, customerAddress, deliveryTime, couponCode, useCoupon and orderItems.",
+            "customerName is the customer's name mentioned in the conversation or greeting (e.g., '홍길동'), null if not mentioned.",
+            "orderItems has one entry per ordered menu, even when only one menu is ordered: "
+            "{menuName, menuStyle (or null), menuItems ('item=quantity' pairs separated by ', ', or null), quantity}.",
+            *_field_rules(assumed_date),
+            "Use null for missing information. When the conversation was in Korean, keep the values in Korean; otherwise mirror the customer language.",
+            "",
+            catalog.menu_item_guide,
+            "",
+            catalog.style_guide,
+        ]
+    )
 
 
-def build_summary_prompt(history: Iterable[ChatMessage], final_message: str, assumed_date: str) -> list[dict]:
+def _strict_schema(schema: dict) -> dict:
+    """Pydantic JSON schema → strict structured-output form (every property required, no extras, no titles/defaults)."""
+    if not isinstance(schema, dict):
+        return schema
+    strict = {key: _strict_schema(value) for key, value in schema.items() if key not in {"title", "default", "description"}}
+    if "anyOf" in strict:
+        strict["anyOf"] = [_strict_schema(option) for option in schema["anyOf"]]
+    if "items" in strict:
+        strict["items"] = _strict_schema(schema["items"])
+    if strict.get("type") == "object" and "properties" in schema:
+        strict["properties"] = {name: _strict_schema(value) for name, value in schema["properties"].items()}
+        strict["required"] = list(strict["properties"])
+        strict["additionalProperties"] = False
+    return strict
+
+
+@lru_cache(maxsize=1)
+def summary_json_schema() -> dict:
+    """JSON schema of a summary derived from OrderSummary/OrderItem (legacy single-menu fields left out)."""
+    summary_properties = OrderSummary.model_json_schema()["properties"]
+    properties = {key: _strict_schema(summary_properties[key]) for key in JSON_SUMMARY_KEYS}
+    properties["orderItems"] = {"type": "array", "items": _strict_schema(OrderItem.model_json_schema())}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def summary_response_format() -> dict:
+    """OpenAI-style response_format (also accepted by vLLM/TGI OpenAI-compatible endpoints)."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "order_summary", "strict": True, "schema": summary_json_schema()},
+    }
+
+
+def build_summary_prompt(
+    history: Iterable[ChatMessage],
+    final_message: str,
+    assumed_date: str,
+    history_token_budget: int = 0,
+    structured: bool = False,
+) -> list[dict]:
+    if history_token_budget > 0:
+        # 오래된 대화는 주문 상태 요약으로 접어서 요약 프롬프트 길이를 제한
+        history = compact_history(list(history), budget=history_token_budget)
     conversation_lines = [
         f"{msg.role.upper()}: {msg.content}"
         for msg in history
     ]
     history_block = "\n".join(conversation_lines)
-    menu_guide = _build_menu_item_guide()
-    style_guide = _build_style_guide()
+    if structured:
+        system_prompt = _summary_json_system_prompt(get_catalog(), assumed_date)
+    else:
+        system_prompt = _summary_system_prompt(get_catalog(), assumed_date)
 
     prompt = [
         {
             "role": "system",
-            "content": "\n".join(
-                [
-                    "You are an expert maître d' that produces structured order snapshots for Mr. Daebak Dinner.",
-                    "Return plain text with the following structure:",
-                    "",
-                    "First, output these common fields (one per line):",
-                    "customerName = <customer's name mentioned in conversation or greeting (e.g., '홍길동', '김철수') or null if not mentioned>",
-                    "customerAddress = <value or null>",
-                    "deliveryTime = <ISO 8601 datetime or null>",
-                    "couponCode = <coupon code or coupon name mentioned by customer or null>",
-                    "useCoupon = <true or false or null>",
-                    "",
-                    "Then, for the menu information:",
-                    "- If only ONE menu is ordered, output these lines:",
-                    "  menuName = <menu name>",
-                    "  menuStyle = <style name or null>",
-                    "  menuItems = <comma separated list of item=quantity>",
-                    "  quantity = <integer number or null>",
-                    "",
-                    "- If MULTIPLE menus are ordered, output orderItems array instead:",
-                    "  orderItems = [",
-                    "    {menuName: '<menu name 1>', menuStyle: '<style or null>', menuItems: '<item=quantity pairs>', quantity: <number>},",
-                    "    {menuName: '<menu name 2>', menuStyle: '<style or null>', menuItems: '<item=quantity pairs>', quantity: <number>}",
-                    "  ]",
-                    "",
-                    "For orderItems: each menu must have its own entry with menuName, menuStyle (can be null), menuItems (can be null), and quantity.",
-                    "When multiple menus are ordered, DO NOT use the single menuName/menuStyle/menuItems/quantity fields. Use orderItems array instead.",
-                    "",
-                    f"Use ISO 8601 format (YYYY-MM-DDTHH:mm:ss) for deliveryTime. Assume today is {assumed_date} and normalize any inferred delivery date to that day unless the customer explicitly requested another date.",
-                    "For quantity: extract the number of menu sets ordered for EACH menu separately (e.g., '발렌타인 디너 2개' means quantity = 2 for that menu). If not mentioned, use 1.",
-                    "For couponCode: extract the coupon code or name if the customer mentioned using a coupon (e.g., 'REGULAR10000', '단골 쿠폰', '쿠폰 사용'). If no coupon mentioned, use null.",
-                    "For useCoupon: set to true if customer mentioned using a coupon, false if they explicitly said not to use one, null if not mentioned.",
-                    "For deliveryTime: if customer mentioned a specific future date/time for delivery, set it here. If they want immediate delivery or didn't specify, use null.",
-                    'Do not add extra lines or commentary. Use "null" (without quotes) for missing information. Use "true" or "false" (lowercase, without quotes) for boolean values.',
-                    "When the conversation was in Korean, keep the values in Korean; otherwise mirror the customer language.",
-                    "",
-                    menu_guide,
-                    "",
-                    style_guide,
-                ]
-            ),
+            "content": system_prompt,
         },
         {
             "role": "user",
@@ -160,6 +185,60 @@ def build_summary_prompt(history: Iterable[ChatMessage], final_message: str, ass
     return prompt
 
 
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+@timed()
+def parse_summary_json(raw_text: str) -> OrderSummary:
+    """
+    Parse a JSON summary (structured-output mode). Falls back to parse_summary_text only when the
+    reply is plain text, e.g. a provider that ignored response_format; a reply that starts as JSON
+    but does not parse (truncated output) or holds no menu raises ValueError instead of becoming an
+    empty order.
+    """
+    if not isinstance(raw_text, str) or not raw_text.strip():
+        raise ValueError("요약 결과가 비어있습니다.")
+    looks_like_json = raw_text.lstrip().startswith(("{", "```"))
+    # 코드 블록(```json ... ```)이나 앞뒤 설명이 붙은 경우 객체 부분만 사용
+    match = _JSON_OBJECT_RE.search(raw_text)
+    try:
+        data = (orjson.loads if orjson is not None else json.loads)(match.group(0) if match else raw_text)
+    except ValueError:
+        if looks_like_json:
+            raise ValueError("요약 JSON이 잘렸거나 올바르지 않습니다.") from None
+        return parse_summary_text(raw_text)
+    if not isinstance(data, dict):
+        if looks_like_json:
+            raise ValueError("요약 JSON이 객체가 아닙니다.")
+        return parse_summary_text(raw_text)
+
+    values = {key: data.get(key) for key in JSON_SUMMARY_KEYS}
+    for key in ("customerName", "customerAddress", "deliveryTime", "couponCode"):
+        value = values[key]
+        values[key] = None if value is None or str(value).strip().lower() in {"null", "-", "none", ""} else str(value).strip()
+    if not isinstance(values["useCoupon"], bool):
+        values["useCoupon"] = None
+
+    order_items = [
+        _parse_order_item(item) for item in data.get("orderItems") or [] if isinstance(item, dict) and item.get("menuName")
+    ]
+    if not order_items and data.get("menuName"):
+        # 스키마를 강제하지 못한 제공자가 기존 단일 메뉴 필드로 답한 경우
+        order_items = [_parse_order_item(data)]
+    if not order_items:
+        raise ValueError("요약 JSON에 주문 메뉴가 없습니다.")
+    summary = OrderSummary(orderItems=order_items, **values)
+    # parse_summary_text와 동일하게 단일 메뉴일 때는 기존 필드도 채움
+    if len(order_items) == 1:
+        item = order_items[0]
+        summary.menuName = item.menuName
+        summary.menuStyle = item.menuStyle
+        summary.menuItems = item.menuItems
+        summary.quantity = item.quantity
+    return summary
+
+
+@timed()
 def parse_summary_text(raw_text: str) -> OrderSummary:
     if not isinstance(raw_text, str) or not raw_text.strip():
         raise ValueError("요약 결과가 비어있습니다.")
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.order_store import OrderStore
+
+
+class OrderWriter:
+    """
+    Single writer task that group-commits queued order records.
+
+    submit() enqueues a record and returns once the batch containing it is durable, so the
+    event loop never blocks on disk I/O and concurrent confirmations share one fsync.
+    """
+
+    def __init__(self, store: OrderStore, max_batch_size: int, linger_ms: float) -> None:
+        self._store = store
+        self._max_batch_size = max(1, max_batch_size)
+        self._linger = max(0.0, linger_ms) / 1000
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.batches = 0
+        self.records = 0
+        self.failures = 0
+        self.last_batch_size = 0
+        self.max_observed_batch = 0
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._work())
+        return self._queue
+
+    def start(self) -> None:
+        self._ensure_worker()
+
+    async def submit(self, record: dict) -> None:
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((record, future))
+        await future
+
+    async def _next_batch(self) -> List[Tuple[dict, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        if self._linger:
+            # 동시에 들어오는 확정 요청을 같은 커밋에 묶기 위해 잠시 대기
+            await asyncio.sleep(self._linger)
+        while len(batch) < self._max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _work(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            records = [record for record, _ in batch]
+            try:
+                await run_in_threadpool(self._store.save_many, records)
+            except Exception as exc:  # noqa: BLE001
+                self.failures += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+            else:
+                self.batches += 1
+                self.records += len(records)
+                self.last_batch_size = len(records)
+                self.max_observed_batch = max(self.max_observed_batch, len(records))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def close(self) -> None:
+        """Flush queued records, then stop the writer task."""
+        if self._worker is None or self._worker.done() or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self._store.name,
+            "queueDepth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "records": self.records,
+            "failures": self.failures,
+            "lastBatchSize": self.last_batch_size,
+            "maxBatchSize": self.max_observed_batch,
+        }
+
+
+_order_writer: OrderWriter | None = None
+
+
+def get_order_writer(store: OrderStore) -> OrderWriter:
+    global _order_writer
+    if _order_writer is None:
+        _order_writer = OrderWriter(
+            store,
+            settings.VOICE_ORDER_ORDER_WRITER_MAX_BATCH,
+            settings.VOICE_ORDER_ORDER_WRITER_LINGER_MS,
+        )
+    return _order_writer
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import math
+import sys
+import time
+import wave
+from array import array
+from typing import Awaitable, Callable, Optional
+
+from app.config import settings
+from app.metrics import observe_stage
+from app.stt import AudioUpload, get_audio_budget, get_speech_recognizer, preprocess_audio
+
+AUDIO_FORMATS = ("webm", "pcm16")
+_VAD_FRAME_MS = 30
+# 겹치는 구간 때문에 이어 붙일 때 반복될 수 있는 최대 단어 수
+_MAX_OVERLAP_WORDS = 4
+
+
+class UtteranceBuffer:
+    """
+    Audio of the utterance currently being spoken on a realtime connection.
+
+    "webm" chunks (MediaRecorder timeslices, one recorder per utterance) are concatenated as-is
+    and the utterance ends on an explicit {"type": "end"} message. "pcm16" chunks (16-bit
+    little-endian mono) are additionally scanned with an energy VAD so trailing silence ends
+    the utterance on the server side.
+    """
+
+    def __init__(self, audio_format: str, sample_rate: int) -> None:
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self._data = bytearray()
+        self._reserved = 0
+        self._vad_offset = 0
+        self.speech_started = False
+        self.trailing_silence_ms = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def append(self, chunk: bytes) -> bool:
+        """Add a chunk; returns False when the audio budget or the utterance size limit is exceeded."""
+        if len(self._data) + len(chunk) > settings.VOICE_ORDER_STT_MAX_UPLOAD_BYTES:
+            return False
+        if not get_audio_budget().reserve(len(chunk)):
+            return False
+        self._reserved += len(chunk)
+        self._data.extend(chunk)
+        if self.audio_format == "pcm16":
+            self._scan_energy()
+        return True
+
+    def _scan_energy(self) -> None:
+        frame_bytes = self.sample_rate * _VAD_FRAME_MS // 1000 * 2
+        threshold = settings.VOICE_ORDER_STT_VAD_THRESHOLD_DBFS
+        while self._vad_offset + frame_bytes <= len(self._data):
+            samples = array("h", self._data[self._vad_offset:self._vad_offset + frame_bytes])
+            if sys.byteorder == "big":
+                samples.byteswap()
+            self._vad_offset += frame_bytes
+            rms = math.sqrt(sum(sample * sample for sample in samples) / len(samples)) / 32768.0
+            if 20 * math.log10(max(rms, 1e-10)) > threshold:
+                self.speech_started = True
+                self.trailing_silence_ms = 0
+            elif self.speech_started:
+                self.trailing_silence_ms += _VAD_FRAME_MS
+
+    @property
+    def end_of_utterance(self) -> bool:
+        return self.speech_started and self.trailing_silence_ms >= settings.VOICE_ORDER_REALTIME_EOU_SILENCE_MS
+
+    def snapshot(self) -> AudioUpload:
+        """Current audio as an uploadable file (pcm16 is wrapped in a WAV header)."""
+        if self.audio_format == "pcm16":
+            return self.segment(0)
+        data = bytes(self._data)
+        return AudioUpload(io.BytesIO(data), len(data), "audio.webm")
+
+    def segment(self, start: int, overlap_ms: int = 0) -> AudioUpload:
+        """pcm16 audio from byte offset start (moved back by overlap_ms) to the end, as a WAV file."""
+        if self.audio_format != "pcm16":
+            raise ValueError("only pcm16 audio can be cut into segments")
+        start = max(0, start - self.sample_rate * overlap_ms // 1000 * 2)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(bytes(self._data[start:]))
+        data = buffer.getvalue()
+        return AudioUpload(io.BytesIO(data), len(data), "audio.wav")
+
+    def reset(self) -> None:
+        get_audio_budget().release(self._reserved)
+        self._reserved = 0
+        self._data.clear()
+        self._vad_offset = 0
+        self.speech_started = False
+        self.trailing_silence_ms = 0
+
+
+def join_transcripts(previous: str, text: str) -> str:
+    """Append a segment transcript, dropping the words repeated from the overlapping audio."""
+    words, new_words = previous.split(), text.split()
+
+    def _norm(items: list[str]) -> list[str]:
+        return [word.strip(".,!?…").lower() for word in items]
+
+    for size in range(min(len(words), len(new_words), _MAX_OVERLAP_WORDS), 0, -1):
+        if _norm(words[-size:]) == _norm(new_words[:size]):
+            new_words = new_words[size:]
+            break
+    return " ".join([*words, *new_words])
+
+
+class PartialTranscriber:
+    """
+    Transcribes the growing utterance at most once per interval, one request at a time.
+
+    With pcm16 each partial sends only the audio after the previous one (plus a short overlap)
+    and the texts are joined, and finish() sends only the remaining tail, so every second of
+    audio is billed about once. webm timeslices cannot be decoded on their own, so webm
+    partials would resend the whole utterance each time and are off unless
+    VOICE_ORDER_REALTIME_WEBM_PARTIALS is set.
+    """
+
+    def __init__(self, language: Optional[str], on_partial: Callable[[str], Awaitable[None]]) -> None:
+        self.language = language
+        self._on_partial = on_partial
+        self._task: asyncio.Task | None = None
+        self._last_started = 0.0
+        self._last_size = 0
+        self._text = ""
+        # pcm16: 부분 인식으로 이미 텍스트가 된 바이트 위치
+        self._covered = 0
+
+    def maybe_start(self, buffer: UtteranceBuffer) -> None:
+        incremental = buffer.audio_format == "pcm16"
+        if not incremental and not settings.VOICE_ORDER_REALTIME_WEBM_PARTIALS:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        now = time.monotonic()
+        if len(buffer) <= self._last_size:
+            return
+        if (now - self._last_started) * 1000 < settings.VOICE_ORDER_REALTIME_PARTIAL_INTERVAL_MS:
+            return
+        self._last_started = now
+        self._last_size = len(buffer)
+        if incremental:
+            upload = buffer.segment(self._covered, settings.VOICE_ORDER_REALTIME_PARTIAL_OVERLAP_MS)
+        else:
+            upload = buffer.snapshot()
+        self._task = asyncio.create_task(self._run(upload, len(buffer), incremental))
+
+    async def _run(self, upload: AudioUpload, end: int, incremental: bool) -> None:
+        try:
+            text = await get_speech_recognizer().transcribe(upload.file, upload.filename, self.language)
+        except Exception as e:  # noqa: BLE001
+            # 부분 인식 실패는 최종 인식에 영향이 없으므로 무시 (pcm16은 다음 부분 인식이 같은 구간부터 다시 보냄)
+            print(f"Warning: partial transcription failed: {e}")
+            return
+        if incremental:
+            self._text = join_transcripts(self._text, text)
+            self._covered = end
+        else:
+            self._text = text
+        if self._text:
+            await self._on_partial(self._text)
+
+    async def finish(self, buffer: UtteranceBuffer) -> str:
+        """
+        Final transcript of the buffered utterance. For pcm16 with partials so far, only the audio
+        after the last partial is transcribed (alongside any partial still in flight) and joined
+        to the partial text; otherwise, or if that partial fails, the whole utterance is sent.
+        """
+        task, self._task = self._task, None
+        try:
+            if buffer.audio_format != "pcm16" or (task is None and not self._covered):
+                return await transcribe_utterance(buffer, self.language)
+            end = self._last_size if task is not None else self._covered
+            if end >= len(buffer):
+                tail = ""
+                if task is not None:
+                    await task
+            else:
+                upload = buffer.segment(end, settings.VOICE_ORDER_REALTIME_PARTIAL_OVERLAP_MS)
+                tail_text = _transcribe_upload(upload, self.language)
+                if task is not None:
+                    tail, _ = await asyncio.gather(tail_text, task)
+                else:
+                    tail = await tail_text
+            if self._covered != end:
+                return await transcribe_utterance(buffer, self.language)
+            return join_transcripts(self._text, tail)
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
+            self._reset()
+
+    async def cancel(self) -> None:
+        """Drop any partial in flight so it cannot arrive after the final transcript."""
+        task, self._task = self._task, None
+        self._reset()
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _reset(self) -> None:
+        self._last_size = 0
+        self._last_started = 0.0
+        self._text = ""
+        self._covered = 0
+
+
+async def _transcribe_upload(upload: AudioUpload, language: Optional[str]) -> str:
+    recognizer = get_speech_recognizer()
+    with observe_stage("stt", recognizer.name, recognizer.model):
+        upload = await preprocess_audio(upload)
+        return await recognizer.transcribe(upload.file, upload.filename, language)
+
+
+async def transcribe_utterance(buffer: UtteranceBuffer, language: Optional[str]) -> str:
+    return await _transcribe_upload(buffer.snapshot(), language)
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import queue
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from app.config import settings, APP_DIR
+from app.context import CompiledCatalog, get_catalog
+
+# 개인정보는 고정된 가짜 값으로 바꿈 (재생 시 같은 입력이 같은 키를 갖도록 결정적으로 치환)
+NAME_PLACEHOLDER = "홍길동"
+ADDRESS_PLACEHOLDER = "서울시 중구 세종대로 110"
+PHONE_PLACEHOLDER = "010-0000-0000"
+EMAIL_PLACEHOLDER = "customer@example.com"
+CARD_PLACEHOLDER = "0000-0000-0000-0000"
+
+# 줄 단위로만 매칭 (요약 프롬프트처럼 여러 메시지를 합친 텍스트도 같은 결과가 나오도록)
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_CARD_RE = re.compile(r"\b\d{4}[ -]?\d{4}[ -]?\d{4}[ -]?\d{4}\b")
+_PHONE_RE = re.compile(r"(?<!\d)(?:\+82[ -]?)?0\d{1,2}[ -]?\d{3,4}[ -]?\d{4}(?!\d)")
+_REGIONS = "서울|부산|대구|인천|광주|대전|울산|세종|경기|강원|충북|충남|전북|전남|경북|경남|제주"
+_ADDRESS_RE = re.compile(
+    rf"(?:[가-힣]+(?:특별시|광역시|특별자치시|특별자치도|시|도)|(?<![가-힣])(?:{_REGIONS}))[ \t]+"
+    r"(?:[가-힣]+(?:시|군|구)[ \t]+)+"
+    r"[가-힣0-9]+(?:읍|면|동|가|로|길)"
+    r"(?:[ \t]*\d+(?:-\d+)?(?:번길|길)(?=[ \t]))?"
+    r"(?:[ \t]*\d+(?:-\d+)?(?:번지)?(?![\d-]|동|층|호))?"
+    r"(?:[ \t]*\d+(?:동|층|호))*"
+)
+# 시/도 없이 말한 주소: "강남구 역삼동", "역삼동 123-4", "테헤란로 123 4층" (수량 단위가 붙은 숫자는 제외)
+_LOCAL_ADDRESS_RE = re.compile(
+    r"(?<![가-힣])[가-힣]+(?:구|군)[ \t]+[가-힣0-9]+(?:읍|면|동|가)(?=[^가-힣]|$|으로|로|에서|에|까지|쪽|이요|요|입니다|이에요)"
+    r"|(?<![가-힣])(?:[가-힣]+(?:구|군)[ \t]+)?[가-힣0-9]+(?:동|가|로|길)[ \t]*\d+(?:-\d+)?(?:번길|번지)?"
+    r"(?![\d-])(?![ \t]*(?:개|세트|인분|명|병|잔|접시|조각|포트|시|분|일|월|원))"
+    r"(?:[ \t]*\d+(?:동|층|호))*"
+)
+_NAME_PATTERNS = (
+    re.compile(r"(?<![가-힣])([가-힣]{2,4})[ \t]?(?:고객님|손님)"),
+    re.compile(r"(?:제[ \t]?이름은|이름은|성함은)[ \t]*([가-힣]{2,4}?)(?:이고|이에요|예요|입니다|이요|요|고|라고|[ \t,.]|$)"),
+    # "저는 X"는 이름을 말하는 어미로 끝날 때만 ("저는 스테이크 하나 더"는 제외)
+    re.compile(r"저는[ \t]*([가-힣]{2,4}?)(?:입니다|이에요|예요|이라고|라고)"),
+    re.compile(r"(?:[Mm]y name is|[Tt]his is|I am|I'm)[ \t]+([A-Z][a-z]+(?:[ \t][A-Z][a-z]+)?)"),
+    re.compile(r"(?:[Mm]r|[Mm]s|[Mm]rs)\.?[ \t]+([A-Z][a-z]+)"),
+    # 호칭 없이 "김철수로 주문할게요", "박민준 이름으로 예약": 흔한 성씨로 시작하는 세 글자만
+    re.compile(
+        r"(?<![가-힣])([김이박최정강조윤장임한오서신권황안송류전홍고문양손배백허유남심노하][가-힣]{2})"
+        r"[ \t]?(?:이름으로|으로|로)[ \t]?(?:주문|예약|배달|부탁|해)"
+    ),
+    # 호칭 없이 "김민수예요", "박민준입니다"
+    re.compile(
+        r"(?<![가-힣])([김이박최정강조윤장임한오서신권황안송류전홍고문양손배백허유남심노하][가-힣]{2})"
+        r"(?:입니다|이에요|예요)"
+    ),
+)
+# 이름 패턴에 걸리지만 이름이 아닌 말
+_NAME_STOPWORDS = {
+    "고객", "손님", "이름", "성함", "주문", "배달", "예약", "그냥", "지금", "여기",
+    "이건", "이거", "저건", "저거", "그건", "그거", "우리", "저희", "모든", "해당",
+}
+
+
+@lru_cache(maxsize=1)
+def _catalog_words(compiled: CompiledCatalog) -> frozenset:
+    """Words of menu, item and style names; never treated as customer names."""
+    catalog = compiled.data
+    names = [row.get("name") for row in [*catalog.menus, *catalog.styles]]
+    names += [row.get("item_name") for row in catalog.menu_items]
+    words = set()
+    for name in names:
+        for word in re.findall(r"[가-힣]+", name or ""):
+            words.add(word)
+            if word.endswith("스타일") and len(word) > 3:
+                words.add(word[:-3])
+    return frozenset(word for word in words if len(word) >= 2)
+
+
+def _is_catalog_word(name: str) -> bool:
+    return any(word in name or name in word for word in _catalog_words(get_catalog()))
+
+
+def _replace_address(match: re.Match) -> str:
+    # 이미 치환된 자리("세종대로 110으로")는 일부만 다시 매칭될 수 있으므로 그대로 둠
+    text, start = match.string, match.start()
+    index = text.find(ADDRESS_PLACEHOLDER, max(0, start - len(ADDRESS_PLACEHOLDER) + 1), match.end())
+    if index != -1 and index <= start:
+        return match.group(0)
+    return ADDRESS_PLACEHOLDER
+
+
+def _detect_names(texts: Iterable[str]) -> set:
+    names = set()
+    for text in texts:
+        for pattern in _NAME_PATTERNS:
+            for match in pattern.finditer(text):
+                name = match.group(1).strip()
+                if name and name not in _NAME_STOPWORDS and name != NAME_PLACEHOLDER and not _is_catalog_word(name):
+                    names.add(name)
+    return names
+
+
+def scrub_texts(
+    texts: Sequence[str],
+    names: Iterable[Optional[str]] = (),
+    detect_in: Optional[Sequence[str]] = None,
+    addresses: Iterable[Optional[str]] = (),
+) -> List[str]:
+    """
+    Replace PII with fixed placeholders: e-mail, card and phone numbers, Korean street addresses
+    (the given ones plus the address pattern) and customer names (the given ones plus names found
+    in greetings/self-introductions of `detect_in`, by default all texts).
+    """
+    detected = _detect_names(texts if detect_in is None else detect_in)
+    known = {name.strip() for name in names if name and name.strip()} | detected
+    # 긴 이름부터 치환해야 "김민수"가 "김민"보다 먼저 처리됨
+    ordered = sorted((name for name in known if name != NAME_PLACEHOLDER), key=len, reverse=True)
+    known_addresses = sorted(
+        {address.strip() for address in addresses if address and address.strip() and address.strip() != ADDRESS_PLACEHOLDER},
+        key=len,
+        reverse=True,
+    )
+    scrubbed = []
+    for text in texts:
+        # 요약에서 알아낸 주소는 패턴이 놓치는 형태일 수 있으므로 정규식보다 먼저 그대로 치환
+        for address in known_addresses:
+            text = text.replace(address, ADDRESS_PLACEHOLDER)
+        text = _EMAIL_RE.sub(EMAIL_PLACEHOLDER, text)
+        text = _CARD_RE.sub(CARD_PLACEHOLDER, text)
+        text = _PHONE_RE.sub(PHONE_PLACEHOLDER, text)
+        text = _ADDRESS_RE.sub(_replace_address, text)
+        text = _LOCAL_ADDRESS_RE.sub(_replace_address, text)
+        for name in ordered:
+            text = text.replace(name, NAME_PLACEHOLDER)
+        scrubbed.append(text)
+    return scrubbed
+
+
+def _as_dicts(messages: Sequence) -> List[dict]:
+    return [
+        {"role": message["role"], "content": message["content"] or ""}
+        if isinstance(message, dict)
+        else {"role": message.role, "content": message.content or ""}
+        for message in messages
+    ]
+
+
+def scrub_messages(
+    messages: Sequence,
+    names: Iterable[Optional[str]] = (),
+    addresses: Iterable[Optional[str]] = (),
+) -> List[dict]:
+    """Scrubbed {role, content} copies of ChatMessage/Turn objects or message dicts."""
+    messages = _as_dicts(messages)
+    # 시스템 프롬프트(메뉴/안내 문구)에서는 이름을 찾지 않음: 녹화와 재생 양쪽에서 같은 이름 집합이 나오도록
+    contents = scrub_texts(
+        [message["content"] for message in messages],
+        names,
+        detect_in=[message["content"] for message in messages if message["role"] != "system"],
+        addresses=addresses,
+    )
+    return [{"role": message["role"], "content": content} for message, content in zip(messages, contents)]
+
+
+def conversation_key(messages: Sequence[dict], is_summary: bool = False) -> str:
+    """
+    Cassette key of one provider request: hash of its non-system messages. System prompts are
+    left out so a recording still matches after catalog or prompt wording changes.
+    """
+    payload = [[message["role"], message["content"]] for message in messages if message["role"] != "system"]
+    digest = hashlib.sha256(json.dumps([is_summary, payload], ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+class TokenUsage:
+    """Provider tokens used by the LLM calls made inside a track_usage() block."""
+
+    __slots__ = ("input", "output", "calls")
+
+    def __init__(self) -> None:
+        self.input = 0
+        self.output = 0
+        self.calls = 0
+
+    def add(self, input_tokens: int, output_tokens: int) -> None:
+        self.input += max(0, input_tokens)
+        self.output += max(0, output_tokens)
+        self.calls += 1
+
+    def as_dict(self) -> dict:
+        return {"input": self.input, "output": self.output, "calls": self.calls}
+
+
+# 중첩된 블록 모두에 더하기 위해 튜플로 보관. reset() 대신 set()으로 되돌려서
+# 다른 컨텍스트에서 닫히는 스트리밍 제너레이터에서도 안전함
+_usage_sinks: ContextVar[tuple] = ContextVar("token_usage", default=())
+
+
+@contextmanager
+def track_usage() -> Iterator[TokenUsage]:
+    usage = TokenUsage()
+    previous = _usage_sinks.get()
+    _usage_sinks.set(previous + (usage,))
+    try:
+        yield usage
+    finally:
+        _usage_sinks.set(previous)
+
+
+def add_usage(input_tokens: int, output_tokens: int) -> None:
+    for usage in _usage_sinks.get():
+        usage.add(input_tokens, output_tokens)
+
+
+def default_recordings_dir() -> Path:
+    if settings.VOICE_ORDER_RECORDING_DIR:
+        return Path(settings.VOICE_ORDER_RECORDING_DIR).expanduser().resolve()
+    return APP_DIR / "data" / "recordings"
+
+
+def _summary_fields(summary) -> dict:
+    # orderId/orderTime은 실행마다 달라지므로 비교 대상이 아님
+    return summary.model_dump(exclude={"orderId", "orderTime"})
+
+
+class ConversationRecorder:
+    """
+    Opt-in (VOICE_ORDER_RECORDING_ENABLED) recorder of real traffic for bench.replay. Appends one
+    JSON line per event to <dir>/recording-YYYYMMDD.jsonl from a background thread:
+
+    - "chat": client history, final reply, latency and tokens of one chat turn
+    - "summary": history, final message and resulting OrderSummary fields of one summarization
+    - "llm": cassette entry (request key, raw provider reply, latency) for playback without a provider
+
+    Texts are PII-scrubbed before they are queued (VOICE_ORDER_RECORDING_SCRUB_PII).
+    """
+
+    def __init__(self) -> None:
+        self._queue: "queue.SimpleQueue[Optional[dict]]" = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.VOICE_ORDER_RECORDING_ENABLED
+
+    def _scrub(
+        self,
+        messages: Sequence,
+        names: Iterable[Optional[str]] = (),
+        addresses: Iterable[Optional[str]] = (),
+    ) -> List[dict]:
+        if settings.VOICE_ORDER_RECORDING_SCRUB_PII:
+            return scrub_messages(messages, names, addresses)
+        return _as_dicts(messages)
+
+    def _put(self, entry: dict) -> None:
+        entry = {"kind": entry.pop("kind"), "id": uuid.uuid4().hex[:12], "at": datetime.now().isoformat(timespec="milliseconds"), **entry}
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="conversation-recorder", daemon=True)
+                self._thread.start()
+        self._queue.put(entry)
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            # 쌓여 있는 항목은 한 번에 기록
+            while True:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self._write(batch)
+                    return
+                batch.append(entry)
+            self._write(batch)
+
+    def _write(self, batch: List[dict]) -> None:
+        directory = default_recordings_dir()
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"recording-{datetime.now():%Y%m%d}.jsonl"
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch))
+            self.written += len(batch)
+        except OSError as e:
+            self.failed += len(batch)
+            print(f"⚠️ 대화 기록 저장 실패 ({directory}): {e}")
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Stop the writer thread after it has written everything queued so far."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def record_llm(
+        self,
+        messages: List[dict],
+        is_summary: bool,
+        reply: str,
+        latency_ms: float,
+        names: Iterable[Optional[str]] = (),
+        addresses: Iterable[Optional[str]] = (),
+    ) -> None:
+        if not self.enabled:
+            return
+        scrubbed = self._scrub([*messages, {"role": "assistant", "content": reply}], names, addresses)
+        self._put({
+            "kind": "llm",
+            "key": conversation_key(scrubbed[:-1], is_summary),
+            "isSummary": is_summary,
+            "provider": settings.VOICE_ORDER_LLM_PROVIDER,
+            "reply": scrubbed[-1]["content"],
+            "latencyMs": round(latency_ms, 1),
+        })
+
+    def record_chat(self, history: Sequence, reply: str, latency_ms: float, usage: TokenUsage, stream: bool = False) -> None:
+        if not self.enabled:
+            return
+        scrubbed = self._scrub([*history, {"role": "assistant", "content": reply}])
+        self._put({
+            "kind": "chat",
+            "preset": settings.VOICE_ORDER_MODEL_PRESET,
+            "provider": settings.VOICE_ORDER_LLM_PROVIDER,
+            "stream": stream,
+            "history": scrubbed[:-1],
+            "reply": scrubbed[-1]["content"],
+            "latencyMs": round(latency_ms, 1),
+            "tokens": usage.as_dict(),
+        })
+
+    def record_summary(
+        self,
+        history: Sequence,
+        final_message: str,
+        summary,
+        source: str,
+        latency_ms: float,
+        usage: TokenUsage,
+    ) -> None:
+        if not self.enabled:
+            return
+        fields = _summary_fields(summary)
+        scrubbed = self._scrub(
+            [*history, {"role": "assistant", "content": final_message or ""}],
+            [fields.get("customerName")],
+            [fields.get("customerAddress")],
+        )
+        if settings.VOICE_ORDER_RECORDING_SCRUB_PII:
+            if fields.get("customerName"):
+                fields["customerName"] = NAME_PLACEHOLDER
+            if fields.get("customerAddress"):
+                fields["customerAddress"] = ADDRESS_PLACEHOLDER
+        self._put({
+            "kind": "summary",
+            "preset": settings.VOICE_ORDER_MODEL_PRESET,
+            "provider": settings.VOICE_ORDER_LLM_PROVIDER,
+            "source": source,
+            "history": scrubbed[:-1],
+            "finalMessage": scrubbed[-1]["content"],
+            "summary": fields,
+            "latencyMs": round(latency_ms, 1),
+            "tokens": usage.as_dict(),
+        })
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "directory": str(default_recordings_dir()),
+            "scrubPii": settings.VOICE_ORDER_RECORDING_SCRUB_PII,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+
+_recorder = ConversationRecorder()
+
+
+def get_recorder() -> ConversationRecorder:
+    return _recorder
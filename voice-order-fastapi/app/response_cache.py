@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.conversation import ORDER_CONFIRMATION_TOKEN, extract_greeting_name
+
+
+NAME_PLACEHOLDER = "{name}"
+# 숫자가 들어간 발화(날짜, 시간, 수량, 주소, 전화번호)는 고객별 응답으로 보고 캐시하지 않음
+_CUSTOMER_SPECIFIC_PATTERN = re.compile(r"[0-9@]")
+
+
+def _normalize_content(content: str) -> str:
+    return " ".join((content or "").split())
+
+
+class ResponseCache:
+    """LRU + TTL cache for LLM replies with hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self._max_entries = max(1, max_entries)
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._ttl_seconds > 0 and now - entry[0] > self._ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.VOICE_ORDER_RESPONSE_CACHE_ENABLED,
+                "size": len(self._entries),
+                "maxEntries": self._max_entries,
+                "ttlSeconds": self._ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hitRatio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+class CacheLookup:
+    """Cache key for one request plus the customer name templated out of it."""
+
+    __slots__ = ("key", "customer_name")
+
+    def __init__(self, key: str, customer_name: Optional[str]) -> None:
+        self.key = key
+        self.customer_name = customer_name
+
+    def restore(self, cached: str) -> str:
+        if self.customer_name:
+            return cached.replace(NAME_PLACEHOLDER, self.customer_name)
+        return cached
+
+    def template(self, reply: str) -> str:
+        if self.customer_name:
+            return reply.replace(self.customer_name, NAME_PLACEHOLDER)
+        return reply
+
+
+def build_cache_lookup(messages: List[dict], provider_signature: Iterable) -> Optional[CacheLookup]:
+    """
+    Return the cache lookup for a chat request, or None when it must bypass the cache
+    (too many customer turns or customer-specific details in them).
+    The greeting's customer name is replaced by a placeholder so popular openings are shared.
+    """
+    user_turns = [message["content"] for message in messages if message["role"] == "user"]
+    if not user_turns or len(user_turns) > settings.VOICE_ORDER_RESPONSE_CACHE_MAX_USER_TURNS:
+        return None
+    if any(_CUSTOMER_SPECIFIC_PATTERN.search(content) for content in user_turns):
+        return None
+
+    customer_name = None
+    normalized = []
+    for message in messages:
+        content = _normalize_content(message["content"])
+        if message["role"] == "assistant" and customer_name is None:
+            name = extract_greeting_name(content)
+            # 한 글자 이름은 치환 시 다른 단어까지 바뀔 수 있어 템플릿화하지 않음
+            if name and len(name.strip()) >= 2:
+                customer_name = name
+        if customer_name:
+            content = content.replace(customer_name, NAME_PLACEHOLDER)
+        normalized.append([message["role"], content])
+
+    payload = json.dumps([list(provider_signature), normalized], ensure_ascii=False, separators=(",", ":"))
+    key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return CacheLookup(key, customer_name)
+
+
+def is_cacheable_reply(reply: str) -> bool:
+    return bool(reply) and ORDER_CONFIRMATION_TOKEN not in reply
+
+
+_response_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide LLM response cache."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            settings.VOICE_ORDER_RESPONSE_CACHE_MAX_ENTRIES,
+            settings.VOICE_ORDER_RESPONSE_CACHE_TTL_SECONDS,
+        )
+    return _response_cache
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.admission import AdmissionRejected
+from app.config import settings
+
+
+class LatencyWindow:
+    """Most recent call latencies of one provider/kind, for percentile-based hedge delays."""
+
+    def __init__(self, size: int) -> None:
+        self._samples: deque[float] = deque(maxlen=max(1, size))
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = math.ceil(len(ordered) * min(max(percent, 0.0), 100.0) / 100) - 1
+        return ordered[min(max(rank, 0), len(ordered) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker for one provider.
+
+    closed → open after failure_threshold failures in a row; open rejects calls for
+    cooldown_seconds, then half_open lets a single trial call through, which closes the
+    breaker on success or reopens it on failure.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = max(0.0, cooldown_seconds)
+        self.failures = 0
+        self.trips = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown_seconds:
+            return "open"
+        return "half_open"
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or (self._opened_at is None and self.failures >= self.failure_threshold):
+            self._opened_at = time.monotonic()
+            self.trips += 1
+        self._trial_in_flight = False
+
+    def record_cancel(self) -> None:
+        # 취소된 호출은 성공/실패로 판단할 수 없으므로 시험 호출 기회만 돌려줌
+        self._trial_in_flight = False
+
+
+class ProviderRouter:
+    """
+    Routes LLM calls to the primary provider (VOICE_ORDER_LLM_PROVIDER) with an optional
+    secondary (VOICE_ORDER_LLM_FALLBACK_PROVIDER).
+
+    When the primary has not answered within the hedge delay (a percentile of its recent
+    latencies), the same request is also sent to the secondary; the first valid answer wins
+    and the other call is cancelled. A failed call falls back to the secondary immediately,
+    and a provider whose circuit breaker is open is skipped without waiting for its timeout.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latencies: Dict[tuple, LatencyWindow] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.calls = 0
+        self.hedged = 0
+        self.fallbacks = 0
+        self.secondary_wins = 0
+        self.short_circuited = 0
+
+    def providers(self) -> List[str]:
+        primary = settings.VOICE_ORDER_LLM_PROVIDER.lower()
+        secondary = (settings.VOICE_ORDER_LLM_FALLBACK_PROVIDER or "").strip().lower()
+        return [primary, secondary] if secondary and secondary != primary else [primary]
+
+    def _window(self, provider: str, kind: str) -> LatencyWindow:
+        key = (provider, kind)
+        window = self._latencies.get(key)
+        if window is None:
+            window = self._latencies[key] = LatencyWindow(settings.VOICE_ORDER_HEDGE_WINDOW)
+        return window
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = self._breakers[provider] = CircuitBreaker(
+                settings.VOICE_ORDER_BREAKER_FAILURE_THRESHOLD,
+                settings.VOICE_ORDER_BREAKER_COOLDOWN_SECONDS,
+            )
+        return breaker
+
+    def hedge_delay(self, provider: str, kind: str) -> float:
+        """Seconds to wait for provider before hedging; the configured default until enough samples exist."""
+        with self._lock:
+            window = self._window(provider, kind)
+            observed = window.percentile(settings.VOICE_ORDER_HEDGE_PERCENTILE)
+            if observed is None or len(window) < settings.VOICE_ORDER_HEDGE_MIN_SAMPLES:
+                delay_ms = settings.VOICE_ORDER_HEDGE_DELAY_MS
+            else:
+                delay_ms = observed * 1000
+        delay_ms = min(max(delay_ms, settings.VOICE_ORDER_HEDGE_MIN_DELAY_MS), settings.VOICE_ORDER_HEDGE_MAX_DELAY_MS)
+        return delay_ms / 1000
+
+    def _acquire(self, remaining: List[str]) -> Optional[str]:
+        """Pop the next provider whose breaker lets a call through."""
+        with self._lock:
+            while remaining:
+                provider = remaining.pop(0)
+                if self._breaker(provider).allow():
+                    return provider
+                self.short_circuited += 1
+            return None
+
+    def _record(self, provider: str, kind: str, started: float, outcome: str) -> None:
+        elapsed = time.monotonic() - started
+        with self._lock:
+            breaker = self._breaker(provider)
+            if outcome == "success":
+                breaker.record_success()
+                self._window(provider, kind).record(elapsed)
+            elif outcome == "failure":
+                breaker.record_failure()
+            elif outcome == "rejected":
+                breaker.record_cancel()
+            else:
+                breaker.record_cancel()
+                # 느려서 취소된 호출도 최소 그만큼 걸렸으므로 지연 분포에 반영 (꼬리 지연 과소평가 방지)
+                self._window(provider, kind).record(elapsed)
+
+    def _unavailable(self) -> HTTPException:
+        with self._lock:
+            wait = min((self._breaker(provider).retry_after() for provider in self.providers()), default=1.0)
+        return HTTPException(
+            status_code=503,
+            detail="LLM 제공자가 일시적으로 응답하지 않습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    async def _race(
+        self,
+        kind: str,
+        start: Callable[[str], Awaitable],
+        on_cancel: Callable[[str], Awaitable[None]] | None = None,
+    ):
+        """
+        Run start(provider) for the primary, hedge/fall back to the secondary, and return
+        (provider, started_at, result) of the first call that succeeds.
+        start must raise for invalid answers so they count as failures.
+        """
+        order = self.providers()
+        remaining = list(order)
+        pending: Dict[asyncio.Task, tuple] = {}
+        errors: List[BaseException] = []
+        hedging = settings.VOICE_ORDER_HEDGE_ENABLED
+
+        def launch() -> bool:
+            provider = self._acquire(remaining)
+            if provider is None:
+                return False
+            pending[asyncio.create_task(start(provider))] = (provider, time.monotonic())
+            return True
+
+        self._count("calls")
+        if not launch():
+            raise self._unavailable()
+        first = next(iter(pending.values()))[0]
+        try:
+            while pending:
+                timeout = self.hedge_delay(first, kind) if hedging and remaining and len(pending) == 1 else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if launch():
+                        self._count("hedged")
+                    continue
+                for task in done:
+                    provider, started = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except AdmissionRejected as e:
+                        # 승인 거절은 제공자 장애가 아니므로 브레이커에 반영하지 않음
+                        self._record(provider, kind, started, "rejected")
+                        errors.append(e)
+                        continue
+                    except Exception as e:  # noqa: BLE001
+                        self._record(provider, kind, started, "failure")
+                        print(f"⚠️ LLM 제공자 {provider} 호출 실패: {e}")
+                        errors.append(e)
+                        continue
+                    self._record(provider, kind, started, "success")
+                    if provider != order[0]:
+                        self._count("secondary_wins")
+                    return provider, started, result
+                if not pending and remaining:
+                    if launch():
+                        self._count("fallbacks")
+        finally:
+            for task, (provider, started) in pending.items():
+                task.cancel()
+                self._record(provider, kind, started, "cancel")
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                if on_cancel is not None:
+                    for provider, _ in pending.values():
+                        await on_cancel(provider)
+        if errors:
+            raise errors[0]
+        raise self._unavailable()
+
+    async def call(self, invoke: Callable[[str], Awaitable[str]], kind: str = "chat") -> str:
+        """Return the first valid (non-empty) answer of invoke(provider)."""
+
+        async def start(provider: str) -> str:
+            text = await invoke(provider)
+            if not (text or "").strip():
+                raise RuntimeError(f"{provider} 응답이 비어 있습니다.")
+            return text
+
+        _, _, text = await self._race(kind, start)
+        return text
+
+    async def stream(self, open_stream: Callable[[str], AsyncIterator[str]], kind: str = "stream") -> AsyncIterator[str]:
+        """
+        Streaming variant hedged on time to first chunk: once a provider has produced its first
+        chunk the other stream is closed and the rest comes from the winner only (no switching
+        after text has been sent).
+        """
+        streams: Dict[str, AsyncIterator[str]] = {}
+
+        async def start(provider: str) -> str:
+            stream = streams[provider] = open_stream(provider)
+            async for chunk in stream:
+                if chunk:
+                    return chunk
+            raise RuntimeError(f"{provider} 스트림이 비어 있습니다.")
+
+        async def close(provider: str) -> None:
+            stream = streams.get(provider)
+            if stream is not None:
+                await stream.aclose()
+
+        provider, started, first_chunk = await self._race(kind, start, on_cancel=close)
+        stream = streams[provider]
+        try:
+            yield first_chunk
+            async for chunk in stream:
+                yield chunk
+        except Exception:
+            self._record(provider, kind, started, "failure")
+            raise
+        finally:
+            await stream.aclose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            providers = {}
+            for provider in self.providers():
+                breaker = self._breaker(provider)
+                latencies = {}
+                for (name, kind), window in self._latencies.items():
+                    if name != provider or not len(window):
+                        continue
+                    latencies[kind] = {
+                        "samples": len(window),
+                        "p50Ms": round(window.percentile(50) * 1000, 1),
+                        "p95Ms": round(window.percentile(95) * 1000, 1),
+                    }
+                providers[provider] = {
+                    "breaker": breaker.state,
+                    "consecutiveFailures": breaker.failures,
+                    "trips": breaker.trips,
+                    "latency": latencies,
+                }
+            return {
+                "providers": providers,
+                "hedgeEnabled": settings.VOICE_ORDER_HEDGE_ENABLED,
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "fallbacks": self.fallbacks,
+                "secondaryWins": self.secondary_wins,
+                "shortCircuited": self.short_circuited,
+            }
+
+
+_provider_router = ProviderRouter()
+
+
+def get_provider_router() -> ProviderRouter:
+    return _provider_router
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import List, NamedTuple, Optional
 
 from pydantic import BaseModel, Field
 
@@ -10,6 +10,12 @@ class ChatMessage(BaseModel):
     content: str
 
 
+class Turn(NamedTuple):
+    """Compact server-side conversation turn (same role/content attributes as ChatMessage)."""
+    role: str
+    content: str
+
+
 class ChatRequest(BaseModel):
     messages: List[ChatMessage]
 
@@ -19,10 +25,35 @@ class ChatResponse(BaseModel):
     orderConfirmed: bool = False
     orderId: Optional[str] = None
     order: Optional[OrderSummary] = None
+    sessionId: Optional[str] = None
+
+
+class VoiceTurnResponse(ChatResponse):
+    transcript: str
+    language: str
+    # 언어가 바뀐 경우 history를 직접 관리하는 클라이언트가 추가해야 할 시스템 지시문
+    languageInstruction: Optional[str] = None
+
+
+class SessionCreateRequest(BaseModel):
+    customerName: Optional[str] = None
+    language: Optional[str] = None
+
+
+class SessionCreateResponse(BaseModel):
+    sessionId: str
+    language: str
+    greeting: str
+
+
+class SessionMessageRequest(BaseModel):
+    message: str
 
 
 class OrderConfirmRequest(BaseModel):
-    history: List[ChatMessage]
+    # history 대신 sessionId만 보내면 서버에 저장된 대화를 사용
+    history: List[ChatMessage] = []
+    sessionId: Optional[str] = None
     finalMessage: Optional[str] = None
 
 
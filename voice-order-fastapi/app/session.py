@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from app.config import settings
+from app.schemas import Turn
+
+
+class ConversationSession:
+    """Server-side conversation state; the system prompt is added per call, not stored."""
+
+    __slots__ = ("session_id", "language", "turns", "order_id", "touched_at")
+
+    def __init__(self, session_id: str, language: str, turns: Iterable[Turn] = ()) -> None:
+        self.session_id = session_id
+        self.language = language
+        self.turns: List[Turn] = list(turns)
+        self.order_id: Optional[str] = None
+        self.touched_at = time.monotonic()
+
+    def last_assistant_message(self) -> str:
+        for turn in reversed(self.turns):
+            if turn.role == "assistant":
+                return turn.content
+        return ""
+
+
+class SessionStore:
+    """Bounded in-memory session store with LRU eviction and idle TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self._max_entries = max(1, max_entries)
+        self._ttl_seconds = ttl_seconds
+        self._sessions: OrderedDict[str, ConversationSession] = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._expired = 0
+
+    def _is_expired(self, session: ConversationSession, now: float) -> bool:
+        return self._ttl_seconds > 0 and now - session.touched_at > self._ttl_seconds
+
+    def _purge(self, now: float) -> None:
+        # 가장 오래 사용되지 않은 세션부터 정렬되어 있으므로 앞에서부터만 확인
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if self._is_expired(session, now):
+                self._sessions.popitem(last=False)
+                self._expired += 1
+            elif len(self._sessions) > self._max_entries:
+                self._sessions.popitem(last=False)
+                self._evicted += 1
+            else:
+                break
+
+    def create(self, language: str, turns: Iterable[Turn] = ()) -> ConversationSession:
+        session = ConversationSession(uuid.uuid4().hex, language, turns)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._purge(session.touched_at)
+        return session
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if self._is_expired(session, now):
+                del self._sessions[session_id]
+                self._expired += 1
+                return None
+            session.touched_at = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._purge(time.monotonic())
+            return {
+                "size": len(self._sessions),
+                "maxEntries": self._max_entries,
+                "ttlSeconds": self._ttl_seconds,
+                "evicted": self._evicted,
+                "expired": self._expired,
+            }
+
+
+_session_store: SessionStore | None = None
+
+
+def get_session_store() -> SessionStore:
+    """Returns the process-wide session store."""
+    global _session_store
+    if _session_store is None:
+        _session_store = SessionStore(
+            settings.VOICE_ORDER_SESSION_MAX_ENTRIES,
+            settings.VOICE_ORDER_SESSION_TTL_SECONDS,
+        )
+    return _session_store
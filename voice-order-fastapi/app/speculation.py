@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.llm import extract_confident_order, summarize_order
+from app.schemas import ChatMessage, OrderSummary, Turn
+
+
+# 시스템 프롬프트 6번 항목의 "이대로 진행해도 될까요?" 확인 질문
+READBACK_CUES = (
+    "진행해도 될까요",
+    "진행할까요",
+    "진행하시겠습니까",
+    "shall i proceed",
+    "should i proceed",
+    "may i proceed",
+    "proceed with this order",
+)
+
+
+def is_readback(reply: str) -> bool:
+    lowered = (reply or "").casefold()
+    return any(cue in lowered for cue in READBACK_CUES)
+
+
+def _history_key(turns: Iterable[ChatMessage | Turn]) -> str:
+    # 시스템 메시지(프롬프트, 언어 지시)는 클라이언트마다 다를 수 있어 키에서 제외
+    normalized = [
+        [turn.role, " ".join((turn.content or "").split())]
+        for turn in turns
+        if turn.role != "system"
+    ]
+    payload = json.dumps(normalized, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# 확인 질문에 대한 단순 동의로 보는 단어: 메뉴/수량/시간 등 다른 단어가 섞이면 주문이 바뀐 것으로 간주
+_AFFIRMATION_WORDS = frozenset({
+    "네", "넵", "예", "응", "네네", "좋아요", "좋습니다", "좋아", "그래요", "그래", "그렇게", "그대로",
+    "진행", "진행해", "진행해요", "진행해주세요", "진행해줘", "진행할게요", "해주세요", "해줘", "해", "주세요",
+    "부탁해요", "부탁합니다", "부탁드려요", "맞아요", "맞습니다", "맞아", "확정", "확정해주세요",
+    "주문", "주문할게요", "주문해주세요", "감사합니다",
+    "yes", "yeah", "yep", "ok", "okay", "sure", "please", "proceed", "go", "ahead", "confirm",
+    "sounds", "good", "that's", "right", "correct",
+})
+
+
+def _is_bare_affirmation(text: str) -> bool:
+    words = [word.strip(".,!?~'\"").casefold() for word in (text or "").split()]
+    words = [word for word in words if word]
+    return bool(words) and all(word in _AFFIRMATION_WORDS for word in words)
+
+
+def _confirmed_prefix(history: Sequence[ChatMessage | Turn]) -> List[ChatMessage | Turn]:
+    """
+    History up to the last assistant turn when the customer's trailing turns only agree to the
+    read-back; a trailing turn that changes anything stays in, so the speculative key misses.
+    """
+    turns = [turn for turn in history if turn.role != "system"]
+    end = len(turns)
+    while end and turns[end - 1].role == "user":
+        if not _is_bare_affirmation(turns[end - 1].content):
+            return turns
+        end -= 1
+    return turns[:end]
+
+
+class SpeculativeSummaries:
+    """Background summaries started at the read-back turn, keyed by the history up to it."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self._max_entries = max(1, max_entries)
+        self._ttl_seconds = ttl_seconds
+        self._tasks: OrderedDict[str, Tuple[float, asyncio.Task]] = OrderedDict()
+        self.started = 0
+        self.reused = 0
+        self.missed = 0
+
+    def start(self, history: Sequence[ChatMessage | Turn], readback: str) -> None:
+        turns = [*history, Turn("assistant", readback)]
+        key = _history_key(turns)
+        if key in self._tasks:
+            return
+        task = asyncio.get_running_loop().create_task(summarize_order(turns, readback))
+        # 사용되지 않은 작업의 예외가 로그에 남지 않도록 결과를 소비
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._tasks[key] = (time.monotonic(), task)
+        self.started += 1
+        while len(self._tasks) > self._max_entries:
+            _, (_, evicted) = self._tasks.popitem(last=False)
+            evicted.cancel()
+
+    def take(self, history: Sequence[ChatMessage | Turn]) -> Optional[asyncio.Task]:
+        entry = self._tasks.pop(_history_key(_confirmed_prefix(history)), None)
+        if entry is None:
+            self.missed += 1
+            return None
+        started_at, task = entry
+        if self._ttl_seconds > 0 and time.monotonic() - started_at > self._ttl_seconds:
+            task.cancel()
+            self.missed += 1
+            return None
+        return task
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.VOICE_ORDER_SPECULATIVE_SUMMARY_ENABLED,
+            "pending": len(self._tasks),
+            "started": self.started,
+            "reused": self.reused,
+            "missed": self.missed,
+        }
+
+
+_speculative_summaries: SpeculativeSummaries | None = None
+
+
+def get_speculative_summaries() -> SpeculativeSummaries:
+    global _speculative_summaries
+    if _speculative_summaries is None:
+        _speculative_summaries = SpeculativeSummaries(
+            settings.VOICE_ORDER_SPECULATIVE_SUMMARY_MAX_ENTRIES,
+            settings.VOICE_ORDER_SPECULATIVE_SUMMARY_TTL_SECONDS,
+        )
+    return _speculative_summaries
+
+
+def maybe_start_speculative_summary(history: Sequence[ChatMessage | Turn], reply: str) -> None:
+    """Start summarizing in the background when the assistant has just read the order back."""
+    if not settings.VOICE_ORDER_SPECULATIVE_SUMMARY_ENABLED or not is_readback(reply):
+        return
+    # 규칙 기반 추출로 충분하면 확정 시점에 바로 처리되므로 LLM 호출을 미리 할 필요가 없음
+    if extract_confident_order([*history, Turn("assistant", reply)], reply) is not None:
+        return
+    get_speculative_summaries().start(history, reply)
+
+
+async def summarize_confirmed_order(history: Sequence[ChatMessage | Turn], final_message: str) -> OrderSummary:
+    """summarize_order that reuses a matching speculative summary when one is available."""
+    confident = extract_confident_order(history, final_message)
+    if confident is not None:
+        return confident
+
+    speculative = get_speculative_summaries()
+    task = speculative.take(history) if settings.VOICE_ORDER_SPECULATIVE_SUMMARY_ENABLED else None
+    if task is not None:
+        try:
+            summary = await task
+            speculative.reused += 1
+            return summary.model_copy(deep=True)
+        except Exception as e:  # noqa: BLE001
+            print(f"Warning: speculative summary failed, summarizing again: {e}")
+    return await summarize_order(history, final_message)
@@ -1,18 +1,323 @@
 from __future__ import annotations
 
-import os
+import io
 import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, BinaryIO, NamedTuple, Optional
 
 from fastapi import HTTPException, UploadFile
 from fastapi.concurrency import run_in_threadpool
 
 from app.config import settings
+from app.metrics import observe_stage
 from app.openai_client import get_openai_client
+from app.timing import timed
 
+try:
+    import av
+    import numpy as np
+except Exception:  # noqa: BLE001
+    av = None
+    np = None
 
-def _short_language_code(language: Optional[str]) -> Optional[str]:
+
+class AudioByteBudget:
+    """Per-process cap on audio bytes held by in-flight transcriptions."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size: int) -> bool:
+        with self._lock:
+            if self.max_bytes > 0 and self.in_flight + size > self.max_bytes:
+                self.rejected += 1
+                return False
+            self.in_flight += size
+            self.peak = max(self.peak, self.in_flight)
+            return True
+
+    def release(self, size: int) -> None:
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - size)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "inFlightBytes": self.in_flight,
+                "peakBytes": self.peak,
+                "maxBytes": self.max_bytes,
+                "rejected": self.rejected,
+            }
+
+
+_audio_budget = AudioByteBudget(settings.VOICE_ORDER_STT_MAX_INFLIGHT_BYTES)
+
+
+def get_audio_budget() -> AudioByteBudget:
+    return _audio_budget
+
+
+class AudioUpload(NamedTuple):
+    file: BinaryIO
+    size: int
+    filename: str
+
+
+def _too_large() -> HTTPException:
+    limit_mb = settings.VOICE_ORDER_STT_MAX_UPLOAD_BYTES / (1024 * 1024)
+    return HTTPException(status_code=413, detail=f"오디오 파일은 {limit_mb:g}MB 이하여야 합니다.")
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="동시에 처리 중인 음성이 많습니다. 잠시 후 다시 시도해주세요.",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _declared_size(file: UploadFile) -> Optional[int]:
+    """Upload size known before reading: Starlette's spooled size or the part's Content-Length."""
+    if file.size is not None:
+        return file.size
+    try:
+        value = int(file.headers.get("content-length", ""))
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+@asynccontextmanager
+async def open_audio_upload(file: UploadFile) -> AsyncIterator[AudioUpload]:
+    """
+    Yields the upload as a rewound file-like object while its bytes are counted against the
+    per-process budget. The declared size (Starlette's spool size or Content-Length) is checked
+    against the upload limit and reserved before anything is read. Starlette already spools
+    multipart files (memory, then disk), so when the size is known that spool is handed over
+    as-is; otherwise chunks are copied into a bounded SpooledTemporaryFile, writing off the
+    event loop since the spool may roll over to disk.
+    """
+    budget = get_audio_budget()
+    max_upload = settings.VOICE_ORDER_STT_MAX_UPLOAD_BYTES
+    suffix = Path(file.filename or "audio").suffix or ".webm"
+    filename = f"audio{suffix}"
+    declared = _declared_size(file)
+    reserved = 0
+    spool = None
+    try:
+        if declared is not None:
+            if declared > max_upload:
+                raise _too_large()
+            if not budget.reserve(declared):
+                raise _busy()
+            reserved = declared
+        if file.size is not None:
+            await file.seek(0)
+            source: BinaryIO = file.file
+            size = file.size
+        else:
+            spool = tempfile.SpooledTemporaryFile(max_size=settings.VOICE_ORDER_STT_SPOOL_MAX_BYTES)
+            size = 0
+            while chunk := await file.read(settings.VOICE_ORDER_STT_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_upload:
+                    raise _too_large()
+                # Content-Length보다 많이 들어오거나 길이를 모를 때만 추가로 예약
+                if size > reserved:
+                    if not budget.reserve(size - reserved):
+                        raise _busy()
+                    reserved = size
+                await run_in_threadpool(spool.write, chunk)
+            await run_in_threadpool(spool.seek, 0)
+            source = spool
+
+        if size == 0:
+            raise HTTPException(status_code=400, detail="빈 오디오 파일입니다.")
+        yield AudioUpload(source, size, filename)
+    finally:
+        budget.release(reserved)
+        if spool is not None:
+            spool.close()
+
+
+TARGET_SAMPLE_RATE = 16000
+_VAD_FRAME_MS = 30
+
+
+class AudioPreprocessStats:
+    """Bytes/duration in vs out of the optional preprocessing stage."""
+
+    def __init__(self) -> None:
+        self.processed = 0
+        self.passthrough = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds_in = 0.0
+        self.seconds_out = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, bytes_in: int, bytes_out: int, seconds_in: float = 0.0, seconds_out: float = 0.0) -> None:
+        with self._lock:
+            self.processed += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.seconds_in += seconds_in
+            self.seconds_out += seconds_out
+
+    def skip(self, failed: bool = False) -> None:
+        with self._lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.passthrough += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": settings.VOICE_ORDER_STT_PREPROCESS,
+                "available": av is not None and np is not None,
+                "processed": self.processed,
+                "passthrough": self.passthrough,
+                "failed": self.failed,
+                "bytesIn": self.bytes_in,
+                "bytesOut": self.bytes_out,
+                "secondsIn": round(self.seconds_in, 3),
+                "secondsOut": round(self.seconds_out, 3),
+                "byteRatio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+            }
+
+
+_preprocess_stats = AudioPreprocessStats()
+if settings.VOICE_ORDER_STT_PREPROCESS and (av is None or np is None):
+    print("⚠️ VOICE_ORDER_STT_PREPROCESS가 켜져 있지만 av/numpy 패키지가 없어 원본 오디오를 전송합니다.")
+
+
+def get_audio_preprocess_stats() -> AudioPreprocessStats:
+    return _preprocess_stats
+
+
+def _decode_mono_16k(source: BinaryIO, max_samples: int) -> Optional["np.ndarray"]:
+    """
+    Decode any container/codec FFmpeg understands into mono 16 kHz int16 samples.
+    Returns None as soon as the audio turns out longer than max_samples.
+    """
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=TARGET_SAMPLE_RATE)
+    chunks = []
+    decoded = 0
+    with av.open(source, mode="r") as container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray().reshape(-1))
+                decoded += len(chunks[-1])
+            if decoded > max_samples:
+                return None
+    for out in resampler.resample(None):
+        chunks.append(out.to_ndarray().reshape(-1))
+        decoded += len(chunks[-1])
+    if decoded > max_samples:
+        return None
+    if not chunks:
+        return np.zeros(0, dtype=np.int16)
+    return np.concatenate(chunks)
+
+
+def _trim_silence(samples: "np.ndarray") -> Optional["np.ndarray"]:
+    """
+    Energy VAD: drop leading/trailing frames quieter than the threshold, keeping some padding.
+    Returns None when no frame is above the threshold (no speech found).
+    """
+    frame = TARGET_SAMPLE_RATE * _VAD_FRAME_MS // 1000
+    usable = len(samples) // frame * frame
+    if usable == 0:
+        return None
+    frames = samples[:usable].astype(np.float32).reshape(-1, frame) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    dbfs = 20 * np.log10(np.maximum(rms, 1e-10))
+    voiced = np.flatnonzero(dbfs > settings.VOICE_ORDER_STT_VAD_THRESHOLD_DBFS)
+    if voiced.size == 0:
+        return None
+    pad = TARGET_SAMPLE_RATE * settings.VOICE_ORDER_STT_VAD_PADDING_MS // 1000
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def _encode_opus(samples: "np.ndarray") -> bytes:
+    buffer = io.BytesIO()
+    with av.open(buffer, mode="w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=TARGET_SAMPLE_RATE)
+        stream.layout = "mono"
+        stream.bit_rate = settings.VOICE_ORDER_STT_OPUS_BITRATE
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = TARGET_SAMPLE_RATE
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+def _passthrough(upload: AudioUpload) -> AudioUpload:
+    upload.file.seek(0)
+    _preprocess_stats.skip()
+    return upload
+
+
+def _preprocess_sync(upload: AudioUpload) -> AudioUpload:
+    max_samples = int(settings.VOICE_ORDER_STT_PREPROCESS_MAX_SECONDS * TARGET_SAMPLE_RATE)
+    # 디코딩 버퍼(int16)도 업로드와 같은 바이트 상한에서 예약; 여유가 없으면 원본 그대로 전송
+    decode_bytes = max_samples * 2
+    budget = get_audio_budget()
+    if not budget.reserve(decode_bytes):
+        return _passthrough(upload)
+    try:
+        samples = _decode_mono_16k(upload.file, max_samples)
+        if samples is None:
+            return _passthrough(upload)
+        trimmed = _trim_silence(samples)
+        if trimmed is None:
+            # 음성을 찾지 못하면 재인코딩하지 않고 원본을 보내 STT가 직접 판단하도록 함
+            return _passthrough(upload)
+        encoded = _encode_opus(trimmed)
+    finally:
+        budget.release(decode_bytes)
+    if len(encoded) >= upload.size:
+        return _passthrough(upload)
+    _preprocess_stats.record(
+        upload.size,
+        len(encoded),
+        len(samples) / TARGET_SAMPLE_RATE,
+        len(trimmed) / TARGET_SAMPLE_RATE,
+    )
+    return AudioUpload(io.BytesIO(encoded), len(encoded), "audio.ogg")
+
+
+async def preprocess_audio(upload: AudioUpload) -> AudioUpload:
+    """
+    Optional stage before STT: decode, downmix to mono, resample to 16 kHz, trim silence and
+    re-encode as Ogg/Opus. Falls back to the original upload when disabled, when PyAV/numpy
+    are missing, on decode errors, or when the result would not be smaller.
+    """
+    if not settings.VOICE_ORDER_STT_PREPROCESS or av is None or np is None:
+        return upload
+    try:
+        return await run_in_threadpool(_preprocess_sync, upload)
+    except Exception as e:  # noqa: BLE001
+        print(f"⚠️ 오디오 전처리 실패, 원본으로 전송합니다: {e}")
+        _preprocess_stats.skip(failed=True)
+        upload.file.seek(0)
+        return upload
+
+
+def short_language_code(language: Optional[str]) -> Optional[str]:
     if not language:
         return None
     lang = language.strip()
@@ -21,36 +326,76 @@ def _short_language_code(language: Optional[str]) -> Optional[str]:
     return lang.split("-")[0].split("_")[0]
 
 
+class SpeechRecognizer(ABC):
+    """STT engine interface; audio is a file-like object or raw bytes in a container named by filename."""
+
+    name = "base"
+
+    @property
+    def model(self) -> str:
+        return ""
+
+    @abstractmethod
+    async def transcribe(self, audio: BinaryIO | bytes, filename: str, language: Optional[str]) -> str:
+        ...
+
+
+class OpenAISpeechRecognizer(SpeechRecognizer):
+    name = "openai"
+
+    @property
+    def model(self) -> str:
+        return settings.VOICE_ORDER_STT_MODEL
+
+    async def transcribe(self, audio: BinaryIO | bytes, filename: str, language: Optional[str]) -> str:
+        client = get_openai_client()
+        # 파일 객체를 그대로 넘기면 httpx가 multipart 본문을 청크 단위로 전송함
+        response = await client.audio.transcriptions.create(
+            file=(filename, audio),
+            model=settings.VOICE_ORDER_STT_MODEL,
+            **({"language": language} if language else {}),
+        )
+        return getattr(response, "text", None) or ""
+
+
+class EchoSpeechRecognizer(SpeechRecognizer):
+    """Local stand-in engine for tests: the "audio" payload is UTF-8 text and is returned as the transcript."""
+
+    name = "echo"
+
+    async def transcribe(self, audio: BinaryIO | bytes, filename: str, language: Optional[str]) -> str:
+        data = audio if isinstance(audio, bytes) else audio.read()
+        return data.decode("utf-8", errors="ignore").strip()
+
+
+SPEECH_RECOGNIZERS: dict[str, type[SpeechRecognizer]] = {
+    OpenAISpeechRecognizer.name: OpenAISpeechRecognizer,
+    EchoSpeechRecognizer.name: EchoSpeechRecognizer,
+}
+
+_speech_recognizer: SpeechRecognizer | None = None
+
+
+def get_speech_recognizer() -> SpeechRecognizer:
+    """Returns the configured STT engine (VOICE_ORDER_STT_PROVIDER=openai | echo)."""
+    global _speech_recognizer
+    if _speech_recognizer is None:
+        provider = (settings.VOICE_ORDER_STT_PROVIDER or "openai").strip().lower()
+        recognizer_cls = SPEECH_RECOGNIZERS.get(provider)
+        if recognizer_cls is None:
+            raise RuntimeError(f"지원하지 않는 VOICE_ORDER_STT_PROVIDER 값입니다: {provider}")
+        _speech_recognizer = recognizer_cls()
+    return _speech_recognizer
+
+
+@timed()
 async def transcribe_audio(file: UploadFile, language: Optional[str]) -> str:
-    client = get_openai_client()
-    data = await file.read()
-    if not data:
-        raise HTTPException(status_code=400, detail="빈 오디오 파일입니다.")
-
-    lang_code = _short_language_code(language)
-
-    def _run_transcription() -> str:
-        suffix = Path(file.filename or "audio").suffix or ".webm"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(data)
-            tmp_path = Path(tmp.name)
-
-        try:
-            with tmp_path.open("rb") as audio_file:
-                response = client.audio.transcriptions.create(
-                    file=audio_file,
-                    model=settings.VOICE_ORDER_STT_MODEL,
-                    **({"language": lang_code} if lang_code else {}),
-                )
-        finally:
-            try:
-                tmp_path.unlink(missing_ok=True)
-            except OSError:
-                pass
-
-        text = getattr(response, "text", None)
-        if not text:
-            raise RuntimeError("STT 응답이 비어 있습니다.")
-        return text
-
-    return await run_in_threadpool(_run_transcription)
+    recognizer = get_speech_recognizer()
+    with observe_stage("stt", recognizer.name, recognizer.model):
+        async with open_audio_upload(file) as upload:
+            upload = await preprocess_audio(upload)
+            text = await recognizer.transcribe(upload.file, upload.filename, short_language_code(language))
+
+    if not text:
+        raise RuntimeError("STT 응답이 비어 있습니다.")
+    return text
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.config import settings
+
+
+class RequestTimings:
+    """Spans recorded while handling one HTTP request, aggregated by name (total ms, count)."""
+
+    __slots__ = ("started", "spans")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        entry = self.spans.setdefault(name, [0.0, 0])
+        entry[0] += elapsed_ms
+        entry[1] += 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={total:.1f}" + (f';desc="x{count}"' if count > 1 else "") for name, (total, count) in self.spans.items()]
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+    def as_dict(self) -> dict:
+        return {name: {"ms": round(total, 1), "count": count} for name, (total, count) in self.spans.items()}
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Record the time spent in this block on the current request (no-op outside a request)."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - started) * 1000)
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator recording each call of a sync or async function as a span (default: function name)."""
+
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__name__
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(label):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware collecting request spans. Spans finished before the response starts are sent
+    as a Server-Timing header (for streamed responses that is the time to the first byte);
+    requests slower than VOICE_ORDER_SLOW_REQUEST_MS are logged as one JSON line with all spans.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = {"code": 500}
+
+        async def _send(message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if settings.VOICE_ORDER_SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers") or [])
+                    headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current.reset(token)
+            elapsed_ms = timings.elapsed_ms()
+            threshold = settings.VOICE_ORDER_SLOW_REQUEST_MS
+            if threshold > 0 and elapsed_ms >= threshold:
+                route = scope.get("route")
+                print(json.dumps(
+                    {
+                        "event": "slow_request",
+                        "at": datetime.utcnow().isoformat(),
+                        "method": scope.get("method"),
+                        "path": scope.get("path"),
+                        "route": getattr(route, "path", None),
+                        "status": status["code"],
+                        "durationMs": round(elapsed_ms, 1),
+                        "spans": timings.as_dict(),
+                    },
+                    ensure_ascii=False,
+                ))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler over sys._current_frames(): every interval it records the
+    stack of each thread (except itself). The result is in collapsed-stack format
+    ("thread;outer;...;inner count" per line), readable by flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def run(self, seconds: float, interval_ms: float, thread_id: Optional[int] = None) -> tuple[str, int]:
+        """Sample for `seconds` (only thread_id when given); returns (collapsed stacks, samples). Blocking."""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("프로파일러가 이미 실행 중입니다.")
+        try:
+            own_id = threading.get_ident()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks: Counter = Counter()
+            interval = max(1.0, interval_ms) / 1000
+            deadline = time.monotonic() + seconds
+            samples = 0
+            while time.monotonic() < deadline:
+                for sampled_id, frame in sys._current_frames().items():
+                    if sampled_id == own_id or (thread_id is not None and sampled_id != thread_id):
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    if sampled_id not in names:
+                        names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    thread_name = names.get(sampled_id, str(sampled_id)).replace(";", "_").replace(" ", "_")
+                    stacks[";".join([thread_name, *reversed(labels)])] += 1
+                samples += 1
+                time.sleep(interval)
+            return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n", samples
+        finally:
+            self._lock.release()
+
+
+_profiler = SamplingProfiler()
+
+
+def get_profiler() -> SamplingProfiler:
+    return _profiler
@@ -0,0 +1,265 @@
+"""
+Local stand-ins for the LLM/STT providers (no network, no API keys) used by the benchmark.
+
+    python -m bench.mock_providers --port 9100 --latency lognormal:400:0.5 --chunk-ms 15
+
+OpenAI-compatible routes are served under /openai/v1 (chat completions, audio transcriptions)
+and the Hugging Face chat endpoint under /hf/v1/chat/completions.
+
+Latency specs (milliseconds): "fixed:300", "uniform:200:800", "normal:400:100",
+"lognormal:<median>:<sigma>". Chat latency is the time to the first token; every further
+streamed chunk adds --chunk-ms (non-streaming replies wait for the whole generation).
+
+With --cassette (recordings written by app.recording) chat requests are answered with the recorded
+provider reply after the recorded latency (times --cassette-latency-scale); requests that are not
+in the cassette fall back to the canned replies above.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHAT_REPLY = (
+    "프렌치 디너 1세트를 심플 스타일로 준비해 드릴까요? "
+    "배달 희망 시간과 받으실 분 성함을 알려주시면 주문 내용을 다시 확인해 드리겠습니다."
+)
+SUMMARY_REPLY = "\n".join(
+    [
+        "customerName = 홍길동",
+        "customerAddress = null",
+        "deliveryTime = 2025-12-09T18:00:00",
+        "couponCode = null",
+        "useCoupon = false",
+        "menuName = 프렌치 디너",
+        "menuStyle = 심플 스타일",
+        "menuItems = 커피=1, 와인(잔)=1, 샐러드=1, 스테이크=1",
+        "quantity = 1",
+    ]
+)
+# response_format(json_schema) 요청에 대한 요약 응답
+SUMMARY_JSON_REPLY = json.dumps(
+    {
+        "customerName": "홍길동",
+        "customerAddress": None,
+        "deliveryTime": "2025-12-09T18:00:00",
+        "couponCode": None,
+        "useCoupon": False,
+        "orderItems": [
+            {
+                "menuName": "프렌치 디너",
+                "menuStyle": "심플 스타일",
+                "menuItems": "커피=1, 와인(잔)=1, 샐러드=1, 스테이크=1",
+                "quantity": 1,
+            }
+        ],
+    },
+    ensure_ascii=False,
+)
+TRANSCRIPT = "프렌치 디너 심플 스타일로 하나 주문할게요"
+_SUMMARY_MARKER = "structured order snapshots"
+_CHUNK_CHARS = 8
+
+
+class LatencyDistribution:
+    """Samples latencies in seconds from a "<kind>:<params...>" spec in milliseconds."""
+
+    def __init__(self, spec: str, rng: random.Random) -> None:
+        self.spec = spec
+        kind, *params = spec.split(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(value) for value in params]
+        self._rng = rng
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"잘못된 지연 분포입니다: {spec} (fixed:MS | uniform:LO:HI | normal:MEAN:STD | lognormal:MEDIAN:SIGMA)")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = self._rng.uniform(*self.params)
+        elif self.kind == "normal":
+            ms = self._rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            ms = self._rng.lognormvariate(math.log(max(median, 1e-3)), sigma)
+        return max(0.0, ms) / 1000
+
+
+class Cassette:
+    """Recorded provider replies ("llm" entries of app.recording files) keyed by request."""
+
+    def __init__(self, paths: List[Path], latency_scale: float = 1.0) -> None:
+        # 녹화 키 계산과 같은 함수를 써야 하므로 카세트 모드에서만 앱 모듈을 가져옴
+        from app.recording import conversation_key
+
+        self._key = conversation_key
+        self.latency_scale = latency_scale
+        self.entries: Dict[str, dict] = {}
+        for path in paths:
+            for line in path.read_text(encoding="utf-8").splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get("kind") == "llm":
+                    self.entries[entry["key"]] = entry
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, messages: list, is_summary: bool) -> Optional[dict]:
+        entry = self.entries.get(self._key(messages, is_summary))
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+
+def _chunks(text: str) -> List[str]:
+    return [text[i:i + _CHUNK_CHARS] for i in range(0, len(text), _CHUNK_CHARS)]
+
+
+def _usage(messages: list, reply: str) -> dict:
+    # 대략적인 토큰 수 (한글 1자 ≈ 1토큰)
+    prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // 2
+    completion_tokens = len(reply) // 2
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def create_app(
+    chat_latency: LatencyDistribution,
+    stt_latency: LatencyDistribution,
+    chunk_ms: float,
+    error_rate: float,
+    rng: random.Random,
+    cassette: Optional[Cassette] = None,
+) -> FastAPI:
+    app = FastAPI(title="Mock LLM/STT providers")
+    stats = {"chat": 0, "stream": 0, "transcriptions": 0, "errors": 0}
+
+    def _fail() -> JSONResponse | None:
+        if error_rate > 0 and rng.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "mock overloaded", "type": "server_error"}}, status_code=503)
+        return None
+
+    def _reply_for(messages: list, structured: bool) -> tuple[str, Optional[float]]:
+        """Reply text and, for cassette hits, the recorded total latency in seconds."""
+        system = str((messages[0] or {}).get("content") or "") if messages else ""
+        is_summary = _SUMMARY_MARKER in system
+        if cassette is not None:
+            entry = cassette.lookup(messages, is_summary)
+            if entry is not None:
+                return entry["reply"], entry["latencyMs"] / 1000 * cassette.latency_scale
+        if is_summary:
+            return (SUMMARY_JSON_REPLY if structured else SUMMARY_REPLY), None
+        return CHAT_REPLY, None
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        failure = _fail()
+        if failure is not None:
+            return failure
+        messages = body.get("messages") or []
+        model = body.get("model") or "mock"
+        reply, recorded = _reply_for(messages, bool(body.get("response_format")))
+        chunks = _chunks(reply)
+        created = int(time.time())
+        generation = chunk_ms / 1000 * (len(chunks) - 1)
+        # 녹화된 지연은 응답 전체 시간이므로 첫 토큰 시간은 나머지 청크 시간을 뺀 값
+        first_token = chat_latency.sample() if recorded is None else max(0.0, recorded - generation)
+
+        if not body.get("stream"):
+            stats["chat"] += 1
+            await asyncio.sleep(first_token + generation)
+            return {
+                "id": f"chatcmpl-mock-{created}",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": _usage(messages, reply),
+            }
+
+        stats["stream"] += 1
+
+        async def events():
+            await asyncio.sleep(first_token)
+            for index, chunk in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(chunk_ms / 1000)
+                event = {
+                    "id": f"chatcmpl-mock-{created}",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.add_api_route("/openai/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/hf/v1/chat/completions", chat_completions, methods=["POST"])
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def transcriptions(file: UploadFile = File(...), model: str = Form(...)):
+        await file.read()
+        failure = _fail()
+        if failure is not None:
+            return failure
+        stats["transcriptions"] += 1
+        await asyncio.sleep(stt_latency.sample())
+        return {"text": TRANSCRIPT}
+
+    @app.get("/stats")
+    async def mock_stats() -> dict:
+        if cassette is not None:
+            return {**stats, "cassetteHits": cassette.hits, "cassetteMisses": cassette.misses}
+        return stats
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Hugging Face providers for benchmarking")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="lognormal:400:0.5", help="chat time to first token (ms spec)")
+    parser.add_argument("--stt-latency", default="lognormal:300:0.3", help="transcription latency (ms spec)")
+    parser.add_argument("--chunk-ms", type=float, default=15.0, help="delay between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cassette", type=Path, action="append", default=[], help="recording file to play back")
+    parser.add_argument("--cassette-latency-scale", type=float, default=1.0, help="0 answers cassette hits immediately")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = create_app(
+        LatencyDistribution(args.latency, rng),
+        LatencyDistribution(args.stt_latency, rng),
+        args.chunk_ms,
+        args.error_rate,
+        rng,
+        Cassette(args.cassette, args.cassette_latency_scale) if args.cassette else None,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
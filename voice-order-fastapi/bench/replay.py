@@ -0,0 +1,470 @@
+"""
+Record-and-replay harness: re-runs recorded conversations (VOICE_ORDER_RECORDING_ENABLED, see
+app.recording) and saved orders against a model preset or a cassette playback stub, and reports
+latency, token usage and how well the resulting OrderSummary fields match the expected ones.
+
+    python -m bench.replay run --preset hf_finetune --recording app/data/recordings/recording-20261016.jsonl
+    python -m bench.replay run --preset openai --orders app/data/orders --env VOICE_ORDER_EXTRACTOR_ENABLED=false
+    python -m bench.replay run --cassette app/data/recordings/recording-20261016.jsonl   # no provider needed
+    python -m bench.replay compare bench/results/replay-openai-<ts>.json bench/results/replay-hf_finetune-<ts>.json
+
+Chat turns go through generate_completion/stream_completion and summaries through summarize_order
+in this process (no API server), so latency is the pipeline time without HTTP. Provider credentials
+come from the regular .env; --preset only switches which provider/model is used. Saved orders have no
+chat history, so a customer conversation is synthesized from each summary and the saved summary is
+the expected result. With --cassette the recorded provider replies are served by bench.mock_providers.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+from bench.run import RESULTS_DIR, _free_port, _git_revision, _process, percentile
+
+PRESETS = ("openai", "hf_base", "hf_finetune", "local_finetune")
+KINDS = ("chat", "summary")
+# 비교하는 OrderSummary 필드 (orderId/orderTime은 실행마다 달라짐, 구 menu* 필드는 orderItems로 합침)
+SUMMARY_FIELDS = ("customerName", "customerAddress", "deliveryTime", "couponCode", "useCoupon", "orderItems")
+
+
+def _menu_items(value: Optional[str]) -> List[tuple]:
+    """ "커피=4, 와인(잔)=1" → [("와인(잔)", "1"), ("커피", "4")] """
+    pairs = []
+    for part in (value or "").split(","):
+        name, _, quantity = part.partition("=")
+        if name.strip():
+            pairs.append((name.strip(), quantity.strip() or "1"))
+    return sorted(pairs)
+
+
+def _order_items(summary: dict) -> List[dict]:
+    items = summary.get("orderItems") or []
+    if not items and summary.get("menuName"):
+        items = [{
+            "menuName": summary.get("menuName"),
+            "menuStyle": summary.get("menuStyle"),
+            "menuItems": summary.get("menuItems"),
+            "quantity": summary.get("quantity") or 1,
+        }]
+    return items
+
+
+def _normalized(summary: dict) -> dict:
+    def _text(value) -> Optional[str]:
+        return (str(value).strip() or None) if value is not None else None
+
+    delivery = _text(summary.get("deliveryTime"))
+    return {
+        "customerName": _text(summary.get("customerName")),
+        "customerAddress": _text(summary.get("customerAddress")),
+        # 초 단위 차이는 무시
+        "deliveryTime": delivery[:16] if delivery else None,
+        "couponCode": _text(summary.get("couponCode")),
+        "useCoupon": bool(summary.get("useCoupon")),
+        "orderItems": sorted(
+            (
+                _text(item.get("menuName")),
+                _text(item.get("menuStyle")) or "",
+                int(item.get("quantity") or 1),
+                tuple(_menu_items(item.get("menuItems"))),
+            )
+            for item in _order_items(summary)
+        ),
+    }
+
+
+def compare_summaries(expected: dict, actual: dict) -> Dict[str, bool]:
+    """Per-field match of two OrderSummary dicts after normalization."""
+    expected, actual = _normalized(expected), _normalized(actual)
+    return {field: expected[field] == actual[field] for field in SUMMARY_FIELDS}
+
+
+def load_recordings(paths: Iterable[Path], kinds: Iterable[str]) -> List[dict]:
+    kinds = set(kinds)
+    items = []
+    for path in paths:
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("kind") in kinds:
+                items.append({**entry, "origin": "recording"})
+    return items
+
+
+def _delivery_phrase(value: Optional[str]) -> Optional[str]:
+    match = re.match(r"\d{4}-(\d{2})-(\d{2})T(\d{2}):(\d{2})", value or "")
+    if not match:
+        return None
+    month, day, hour, minute = (int(part) for part in match.groups())
+    return f"{month}월 {day}일 {hour}시" + (f" {minute}분" if minute else "")
+
+
+def _order_conversation(summary: dict) -> Optional[dict]:
+    """Customer conversation that leads to this saved summary (names/addresses replaced by placeholders)."""
+    from app.conversation import greeting_by_language
+    from app.recording import ADDRESS_PLACEHOLDER, NAME_PLACEHOLDER
+
+    items = _order_items(summary)
+    if not items:
+        return None
+    expected = {**summary}
+    if expected.get("customerName"):
+        expected["customerName"] = NAME_PLACEHOLDER
+    if expected.get("customerAddress"):
+        expected["customerAddress"] = ADDRESS_PLACEHOLDER
+
+    sentences = []
+    for item in items:
+        sentence = f"{item['menuName']}" + (f" {item['menuStyle']}로" if item.get("menuStyle") else "")
+        sentence += f" {int(item.get('quantity') or 1)}개 주문할게요."
+        components = ", ".join(f"{name} {quantity}개" for name, quantity in _menu_items(item.get("menuItems")))
+        if components:
+            sentence += f" 구성은 {components}로 해주세요."
+        sentences.append(sentence)
+    delivery = _delivery_phrase(summary.get("deliveryTime"))
+    if delivery:
+        sentences.append(f"{delivery}에 배달해 주세요.")
+    if expected.get("customerAddress"):
+        sentences.append(f"주소는 {ADDRESS_PLACEHOLDER}입니다.")
+    if summary.get("couponCode"):
+        sentences.append(f"쿠폰 {summary['couponCode']} 사용할게요.")
+    request = " ".join(sentences)
+
+    history = [
+        {"role": "assistant", "content": greeting_by_language("ko-KR", NAME_PLACEHOLDER if expected.get("customerName") else "")},
+        {"role": "user", "content": request},
+        {"role": "assistant", "content": f"주문 내용을 확인하겠습니다. {request} 이대로 주문하시겠습니까?"},
+        {"role": "user", "content": "네, 그렇게 해주세요."},
+    ]
+    return {"history": history, "finalMessage": "주문이 확정되었습니다. 감사합니다.", "summary": expected}
+
+
+def load_orders(path: Path, limit: int) -> List[dict]:
+    """Summary items from an order directory (<orderId>.json files) or an orders.sqlite3 file."""
+    from app.order_store import SQLiteOrderStore, iter_json_orders
+
+    if path.is_dir():
+        records = list(iter_json_orders(path))
+    else:
+        store = SQLiteOrderStore(path)
+        try:
+            records = store.list(limit=limit or 1_000_000)
+        finally:
+            store.close()
+    items = []
+    for record in records:
+        conversation = _order_conversation(record.get("summary") or {})
+        if conversation is not None:
+            items.append({"kind": "summary", "id": record.get("orderId"), "origin": "order", **conversation})
+    return items[:limit] if limit else items
+
+
+def _apply_overrides(settings, overrides: List[str]) -> None:
+    from pydantic import TypeAdapter
+
+    for override in overrides:
+        key, _, value = override.partition("=")
+        key = key.strip()
+        field = type(settings).model_fields.get(key)
+        if field is None:
+            raise SystemExit(f"알 수 없는 설정입니다: {key}")
+        setattr(settings, key, TypeAdapter(field.annotation).validate_python(value))
+
+
+async def _replay_item(item: dict) -> dict:
+    from app.conversation import ORDER_CONFIRMATION_TOKEN
+    from app.llm import generate_completion, stream_completion, summarize_order
+    from app.metrics import error_type
+    from app.recording import track_usage
+    from app.schemas import ChatMessage
+
+    history = [ChatMessage(**message) for message in item["history"]]
+    result = {"id": item.get("id"), "kind": item["kind"], "origin": item["origin"], "recordedLatencyMs": item.get("latencyMs")}
+    if item.get("tokens"):
+        result["recordedTokens"] = item["tokens"]
+    started = time.perf_counter()
+    try:
+        with track_usage() as usage:
+            if item["kind"] == "chat":
+                if item.get("stream"):
+                    chunks = []
+                    async for chunk in stream_completion(history):
+                        if not chunks:
+                            result["ttftMs"] = round((time.perf_counter() - started) * 1000, 1)
+                        chunks.append(chunk)
+                    reply = "".join(chunks)
+                else:
+                    reply = await generate_completion(history)
+                result["replyChars"] = len(reply)
+                result["confirmed"] = ORDER_CONFIRMATION_TOKEN in reply
+                result["expectedConfirmed"] = ORDER_CONFIRMATION_TOKEN in (item.get("reply") or "")
+            else:
+                summary = (await summarize_order(history, item.get("finalMessage") or "")).model_dump()
+                result["fields"] = compare_summaries(item["summary"], summary)
+                result["match"] = all(result["fields"].values())
+                result["summary"] = {field: summary.get(field) for field in SUMMARY_FIELDS}
+    except Exception as e:  # noqa: BLE001
+        result["error"] = error_type(e)
+    result["latencyMs"] = round((time.perf_counter() - started) * 1000, 1)
+    result["tokens"] = usage.as_dict()
+    return result
+
+
+async def replay(items: List[dict], concurrency: int) -> List[dict]:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _bounded(item: dict) -> dict:
+        async with semaphore:
+            return await _replay_item(item)
+
+    try:
+        return await asyncio.gather(*(_bounded(item) for item in items))
+    finally:
+        from app.http_client import close_http_client
+        from app.openai_client import close_openai_client
+
+        await close_http_client()
+        await close_openai_client()
+
+
+def _latency(values: List[float]) -> dict:
+    def _ms(value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value is not None else None
+
+    return {
+        "p50": _ms(percentile(values, 50)),
+        "p95": _ms(percentile(values, 95)),
+        "p99": _ms(percentile(values, 99)),
+        "mean": _ms(sum(values) / len(values) if values else None),
+    }
+
+
+def _aggregate(results: List[dict], kind: str) -> Optional[dict]:
+    rows = [row for row in results if row["kind"] == kind]
+    if not rows:
+        return None
+    ok = [row for row in rows if "error" not in row]
+    errors: Dict[str, int] = {}
+    for row in rows:
+        if "error" in row:
+            errors[row["error"]] = errors.get(row["error"], 0) + 1
+    input_tokens = sum(row["tokens"]["input"] for row in ok)
+    output_tokens = sum(row["tokens"]["output"] for row in ok)
+    summary = {
+        "count": len(rows),
+        "errors": len(rows) - len(ok),
+        "errorsByType": errors,
+        "latencyMs": _latency([row["latencyMs"] for row in ok]),
+        "recordedLatencyMs": _latency([row["recordedLatencyMs"] for row in ok if row.get("recordedLatencyMs") is not None]),
+        "tokens": {
+            "input": input_tokens,
+            "output": output_tokens,
+            "meanInput": round(input_tokens / len(ok), 1) if ok else None,
+            "meanOutput": round(output_tokens / len(ok), 1) if ok else None,
+            "llmCalls": sum(row["tokens"]["calls"] for row in ok),
+        },
+    }
+    if kind == "chat":
+        streamed = [row["ttftMs"] for row in ok if "ttftMs" in row]
+        if streamed:
+            summary["ttftMs"] = _latency(streamed)
+        summary["confirmationAgreement"] = (
+            round(sum(row["confirmed"] == row["expectedConfirmed"] for row in ok) / len(ok), 4) if ok else None
+        )
+    else:
+        summary["exactMatch"] = round(sum(row["match"] for row in ok) / len(ok), 4) if ok else None
+        summary["fieldAccuracy"] = {
+            field: round(sum(row["fields"][field] for row in ok) / len(ok), 4) if ok else None
+            for field in SUMMARY_FIELDS
+        }
+    return summary
+
+
+def _print_summary(name: str, summary: dict) -> None:
+    latency = summary["latencyMs"]
+    line = (
+        f"  {name:8s} n={summary['count']} errors={summary['errors']} p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+        f"tokens/turn {summary['tokens']['meanInput']} in / {summary['tokens']['meanOutput']} out"
+    )
+    if "exactMatch" in summary:
+        line += f", exact match {summary['exactMatch']}"
+    if "confirmationAgreement" in summary:
+        line += f", confirmation agreement {summary['confirmationAgreement']}"
+    print(line)
+
+
+def run(args: argparse.Namespace) -> None:
+    if not args.recording and not args.orders:
+        args.recording = list(args.cassette)
+    if not args.recording and not args.orders:
+        raise SystemExit("--recording, --orders 또는 --cassette 중 하나는 필요합니다.")
+
+    started_at = datetime.now()
+    with tempfile.TemporaryDirectory(prefix="voice-order-replay-") as tmp:
+        if args.cassette:
+            mock_port = _free_port()
+            mock_url = f"http://127.0.0.1:{mock_port}"
+            mock_args = [
+                sys.executable, "-m", "bench.mock_providers", "--port", str(mock_port),
+                "--cassette-latency-scale", str(args.cassette_latency_scale),
+            ]
+            for path in args.cassette:
+                mock_args += ["--cassette", str(path.resolve())]
+            with _process(mock_args, f"{mock_url}/stats", log_path=Path(tmp) / "mock.log"):
+                results, settings_info = _run_in_process(args, Path(tmp), mock_url)
+                settings_info["cassette"] = _mock_stats(f"{mock_url}/stats")
+        else:
+            results, settings_info = _run_in_process(args, Path(tmp), None)
+
+    label = "cassette" if args.cassette else args.preset
+    result = {
+        "startedAt": started_at.isoformat(timespec="seconds"),
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "preset": label,
+        "settings": settings_info,
+        "chat": _aggregate(results, "chat"),
+        "summary": _aggregate(results, "summary"),
+        "items": results,
+    }
+    print(f"\n▶ replay ({label}): {len(results)} items")
+    for name in KINDS:
+        if result[name]:
+            _print_summary(name, result[name])
+
+    output = args.output or RESULTS_DIR / f"replay-{label}-{started_at:%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"\n결과 저장: {output}")
+
+
+def _mock_stats(url: str) -> dict:
+    """Cassette hit/miss counters of the mock server (best effort)."""
+    try:
+        return httpx.get(url, timeout=2.0).json()
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+def _run_in_process(args: argparse.Namespace, workdir: Path, mock_url: Optional[str]) -> tuple[List[dict], dict]:
+    from app.config import apply_model_preset, settings
+
+    if mock_url:
+        # .env 로드 이후에 지정해야 함 (OpenAI 클라이언트는 처음 만들어질 때 OPENAI_BASE_URL을 읽음)
+        os.environ["OPENAI_BASE_URL"] = f"{mock_url}/openai/v1"
+        settings.OPENAI_API_KEY = "cassette"
+        settings.VOICE_ORDER_LLM_FALLBACK_PROVIDER = None
+    apply_model_preset(settings, "openai" if mock_url else args.preset)
+    settings.VOICE_ORDER_MODEL_PRESET = "openai" if mock_url else args.preset
+    # 재생 결과가 다시 녹화되거나 주문이 저장되지 않도록
+    settings.VOICE_ORDER_RECORDING_ENABLED = False
+    settings.VOICE_ORDER_ORDER_DIR = str(workdir / "orders")
+    _apply_overrides(settings, args.env)
+
+    items: List[dict] = []
+    if args.recording:
+        items += load_recordings(args.recording, args.kinds)
+    if args.orders and "summary" in args.kinds:
+        items += load_orders(args.orders, args.limit)
+    if args.limit:
+        items = items[:args.limit]
+    print(
+        f"▶ {len(items)} items, provider={settings.VOICE_ORDER_LLM_PROVIDER} "
+        f"(preset={settings.VOICE_ORDER_MODEL_PRESET}), concurrency={args.concurrency}"
+    )
+    results = asyncio.run(replay(items, args.concurrency))
+    return results, {
+        "provider": settings.VOICE_ORDER_LLM_PROVIDER,
+        "recordings": [str(path) for path in args.recording],
+        "orders": str(args.orders) if args.orders else None,
+        "kinds": list(args.kinds),
+        "concurrency": args.concurrency,
+        "limit": args.limit,
+        "env": args.env,
+    }
+
+
+def compare(paths: List[Path]) -> None:
+    """Print the headline numbers of several replay result files side by side."""
+    runs = [json.loads(path.read_text(encoding="utf-8")) for path in paths]
+    labels = [f"{run['preset']}@{(run.get('git') or {}).get('commit', '')[:7]}" for run in runs]
+    print(f"{'':28s}" + "".join(f"{label:>22s}" for label in labels))
+
+    def _row(name: str, values: List) -> None:
+        print(f"{name:28s}" + "".join(f"{'-' if value is None else value!s:>22s}" for value in values))
+
+    for kind in KINDS:
+        sections = [run.get(kind) or {} for run in runs]
+        if not any(sections):
+            continue
+        print(f"[{kind}]")
+        _row("count / errors", [f"{s.get('count')} / {s.get('errors')}" if s else None for s in sections])
+        for key in ("p50", "p95", "p99"):
+            _row(f"latency {key} ms", [(s.get("latencyMs") or {}).get(key) for s in sections])
+        if any("ttftMs" in s for s in sections):
+            _row("ttft p50 ms", [(s.get("ttftMs") or {}).get("p50") for s in sections])
+        _row("tokens/turn in", [(s.get("tokens") or {}).get("meanInput") for s in sections])
+        _row("tokens/turn out", [(s.get("tokens") or {}).get("meanOutput") for s in sections])
+        _row("llm calls", [(s.get("tokens") or {}).get("llmCalls") for s in sections])
+        if kind == "chat":
+            _row("confirmation agreement", [s.get("confirmationAgreement") for s in sections])
+        else:
+            _row("exact match", [s.get("exactMatch") for s in sections])
+            for field in SUMMARY_FIELDS:
+                _row(f"  {field}", [(s.get("fieldAccuracy") or {}).get(field) for s in sections])
+
+    # 같은 항목에서 결과가 갈린 요약 (첫 번째 실행 기준)
+    baseline = {(row["kind"], row["id"]): row for row in runs[0]["items"] if row["kind"] == "summary"}
+    for label, run in zip(labels[1:], runs[1:]):
+        changed = [
+            row["id"] for row in run["items"]
+            if (row["kind"], row["id"]) in baseline and row.get("summary") != baseline[(row["kind"], row["id"])].get("summary")
+        ]
+        print(f"\n{label}: {len(changed)} summaries differ from {labels[0]}" + (f" ({', '.join(map(str, changed[:10]))})" if changed else ""))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded conversations and saved orders against a preset")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="replay a workload and store the results as JSON")
+    run_parser.add_argument("--preset", choices=PRESETS, default="openai")
+    run_parser.add_argument("--recording", type=Path, action="append", default=[], help="app.recording JSONL file")
+    run_parser.add_argument("--orders", type=Path, help="order directory or orders.sqlite3 (summaries only)")
+    run_parser.add_argument("--cassette", type=Path, action="append", default=[], help="play back recorded provider replies instead of a preset")
+    run_parser.add_argument("--cassette-latency-scale", type=float, default=1.0)
+    run_parser.add_argument("--kinds", default="chat,summary", help=f"comma separated: {', '.join(KINDS)}")
+    run_parser.add_argument("--limit", type=int, default=0, help="replay at most this many items")
+    run_parser.add_argument("--concurrency", type=int, default=1)
+    run_parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="setting override")
+    run_parser.add_argument("--output", type=Path, help="result file (default: bench/results/replay-<preset>-<timestamp>.json)")
+
+    compare_parser = commands.add_parser("compare", help="compare replay result files")
+    compare_parser.add_argument("results", type=Path, nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.results)
+        return
+    args.kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    unknown = [kind for kind in args.kinds if kind not in KINDS]
+    if unknown:
+        parser.error(f"알 수 없는 종류: {', '.join(unknown)}")
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+Load-test harness: starts the mock providers and the API on free local ports, drives the
+chosen scenarios at a target concurrency and stores the results as JSON.
+
+    python -m bench.run --preset openai --concurrency 16 --duration 20
+    python -m bench.run --preset hf_base --latency lognormal:800:0.6 --compare bench/results/<earlier>.json
+    python -m bench.run --target http://127.0.0.1:5001 --scenarios chat   # benchmark a running server
+
+Extra server settings can be passed with --env KEY=VALUE (e.g. --env VOICE_ORDER_EXTRACTOR_ENABLED=false
+to force LLM summaries on confirm). The default .env is not loaded for the spawned server.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import httpx
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+PRESETS = ("openai", "hf_base", "hf_finetune")
+
+CHAT_CONVERSATIONS = [
+    [{"role": "user", "content": "안녕하세요, 이번 주 금요일 저녁에 프렌치 디너 배달 가능할까요?"}],
+    [
+        {"role": "assistant", "content": "안녕하세요, 미스터 대박 디너입니다. 어떤 디너를 준비해 드릴까요?"},
+        {"role": "user", "content": "발렌타인 디너 두 세트 주문하고 싶어요. 스타일은 어떤 게 좋을까요?"},
+    ],
+    [{"role": "user", "content": "I'd like the English dinner delivered tomorrow at 7 pm, please."}],
+    [
+        {"role": "user", "content": "샴페인 축제 디너 하나 할게요"},
+        {"role": "assistant", "content": "샴페인 축제 디너는 그랜드 또는 디럭스 스타일로만 가능합니다. 어떤 스타일로 하시겠어요?"},
+        {"role": "user", "content": "디럭스로 하고 바게트빵 하나 추가해 주세요"},
+    ],
+]
+CONFIRM_HISTORY = [
+    {"role": "assistant", "content": "안녕하세요 홍길동 고객님, 미스터 대박 디너입니다."},
+    {"role": "user", "content": "프렌치 디너 심플 스타일로 하나 주문할게요. 12월 9일 저녁 6시에 배달해 주세요."},
+    {
+        "role": "assistant",
+        "content": "프렌치 디너 1세트, 심플 스타일, 12월 9일 오후 6시 배달로 주문하시겠습니까?",
+    },
+    {"role": "user", "content": "네 그렇게 해주세요"},
+]
+
+
+def _test_wav(seconds: float = 1.0, sample_rate: int = 16000) -> bytes:
+    samples = array("h", (int(8000 * math.sin(2 * math.pi * 440 * i / sample_rate)) for i in range(int(seconds * sample_rate))))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+_WAV = _test_wav()
+
+# 시나리오 이름 → i번째 요청의 httpx.request 인자
+SCENARIOS: Dict[str, Callable[[int], dict]] = {
+    "chat": lambda i: {
+        "method": "POST",
+        "url": "/api/llm/generate",
+        "json": {"messages": CHAT_CONVERSATIONS[i % len(CHAT_CONVERSATIONS)]},
+    },
+    "stt": lambda i: {
+        "method": "POST",
+        "url": "/api/stt/transcribe",
+        "files": {"file": ("bench.wav", _WAV, "audio/wav")},
+    },
+    "confirm": lambda i: {
+        "method": "POST",
+        "url": "/api/order/confirm",
+        "json": {"history": CONFIRM_HISTORY, "finalMessage": "주문이 확정되었습니다. 감사합니다."},
+    },
+}
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(len(ordered) * percent / 100) - 1
+    return ordered[min(max(rank, 0), len(ordered) - 1)]
+
+
+def _summarize(latencies_ms: List[float], outcomes: Counter, elapsed: float) -> dict:
+    total = sum(outcomes.values())
+    errors = {outcome: count for outcome, count in outcomes.items() if not outcome.startswith("2")}
+    error_count = sum(errors.values())
+
+    def _ms(value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value is not None else None
+
+    return {
+        "requests": total,
+        "ok": total - error_count,
+        "errors": error_count,
+        "errorRate": round(error_count / total, 4) if total else 0.0,
+        "errorsByType": errors,
+        "durationSeconds": round(elapsed, 3),
+        "rps": round((total - error_count) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latencyMs": {
+            "p50": _ms(percentile(latencies_ms, 50)),
+            "p95": _ms(percentile(latencies_ms, 95)),
+            "p99": _ms(percentile(latencies_ms, 99)),
+            "mean": _ms(sum(latencies_ms) / len(latencies_ms) if latencies_ms else None),
+            "max": _ms(max(latencies_ms) if latencies_ms else None),
+        },
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    concurrency: int,
+    duration: float,
+    max_requests: int,
+    warmup: int,
+) -> dict:
+    """Closed-loop load: `concurrency` workers send back-to-back requests until the duration or request count is reached."""
+    build = SCENARIOS[name]
+    for i in range(warmup):
+        try:
+            await client.request(**build(i))
+        except httpx.HTTPError:
+            pass
+
+    latencies_ms: List[float] = []
+    outcomes: Counter = Counter()
+    sequence = itertools.count()
+    started = time.perf_counter()
+    deadline = started + duration
+
+    async def worker() -> None:
+        while True:
+            index = next(sequence)
+            if max_requests and index >= max_requests:
+                return
+            if not max_requests and time.perf_counter() >= deadline:
+                return
+            request_started = time.perf_counter()
+            try:
+                response = await client.request(**build(index))
+                outcome = str(response.status_code)
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            # 지연 분포는 성공한 요청만 집계 (오류는 오류율로 따로 보고)
+            if outcome.startswith("2"):
+                latencies_ms.append((time.perf_counter() - request_started) * 1000)
+            outcomes[outcome] += 1
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return _summarize(latencies_ms, outcomes, time.perf_counter() - started)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def _process(args: List[str], ready_url: str, env: Optional[dict] = None, log_path: Optional[Path] = None) -> Iterator[None]:
+    log = open(log_path, "wb") if log_path else subprocess.DEVNULL
+    process = subprocess.Popen(args, cwd=PROJECT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"프로세스가 종료되었습니다: {' '.join(args)} (로그: {log_path})")
+            try:
+                if httpx.get(ready_url, timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"준비 시간 초과: {ready_url}")
+            time.sleep(0.2)
+        yield
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if log is not subprocess.DEVNULL:
+            log.close()
+
+
+def _server_env_file(workdir: Path, preset: str, mock_url: str, overrides: List[str]) -> Path:
+    hf_endpoint = f"{mock_url}/hf/v1/chat/completions"
+    values = {
+        "VOICE_ORDER_MODEL_PRESET": preset,
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{mock_url}/openai/v1",
+        "VOICE_ORDER_HF_TOKEN": "bench",
+        "VOICE_ORDER_HF_ENDPOINT": hf_endpoint,
+        "VOICE_ORDER_HF_BASE_ENDPOINT": hf_endpoint,
+        "VOICE_ORDER_HF_FINETUNE_ENDPOINT": hf_endpoint,
+        "VOICE_ORDER_SUMMARY_HF_ENDPOINT": hf_endpoint,
+        "VOICE_ORDER_ORDER_DIR": str(workdir / "orders"),
+        "VOICE_ORDER_SLOW_REQUEST_MS": "0",
+    }
+    for override in overrides:
+        key, _, value = override.partition("=")
+        values[key.strip()] = value
+    path = workdir / "bench.env"
+    path.write_text("".join(f"{key}={value}\n" for key, value in values.items()), encoding="utf-8")
+    return path
+
+
+def _git_revision() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--", "."], cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+async def _drive(base_url: str, args: argparse.Namespace) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        for name in args.scenarios:
+            print(f"▶ {name}: concurrency={args.concurrency} " + (f"requests={args.requests}" if args.requests else f"duration={args.duration}s"))
+            results[name] = await run_scenario(client, name, args.concurrency, args.duration, args.requests, args.warmup)
+            summary = results[name]
+            latency = summary["latencyMs"]
+            print(
+                f"  {summary['rps']} rps, p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+                f"p99 {latency['p99']} ms, errors {summary['errorRate']:.2%}"
+            )
+    return results
+
+
+def compare(previous: dict, current: dict) -> None:
+    """Print how rps and latency percentiles moved against an earlier result file."""
+    print(f"\n비교 기준: {previous.get('startedAt')} ({(previous.get('git') or {}).get('commit')})")
+    for name, summary in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        rows = [("rps", before["rps"], summary["rps"])]
+        rows += [(key, before["latencyMs"][key], summary["latencyMs"][key]) for key in ("p50", "p95", "p99")]
+        rows.append(("errorRate", before["errorRate"], summary["errorRate"]))
+        for metric, old, new in rows:
+            change = f"{(new - old) / old:+.1%}" if old and new is not None else "n/a"
+            print(f"  {name:8s} {metric:9s} {old!s:>10} → {new!s:<10} {change}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the voice order API against mock providers")
+    parser.add_argument("--preset", choices=PRESETS, default="openai")
+    parser.add_argument("--scenarios", default="chat,stt,confirm", help=f"comma separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario")
+    parser.add_argument("--requests", type=int, default=0, help="requests per scenario (overrides --duration)")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--latency", default="lognormal:400:0.5", help="mock chat time to first token (ms spec)")
+    parser.add_argument("--stt-latency", default="lognormal:300:0.3", help="mock transcription latency (ms spec)")
+    parser.add_argument("--chunk-ms", type=float, default=15.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra server setting")
+    parser.add_argument("--target", help="benchmark an already running server instead of spawning one")
+    parser.add_argument("--output", type=Path, help="result file (default: bench/results/<preset>-<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier result file to compare against")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"알 수 없는 시나리오: {', '.join(unknown)}")
+
+    started_at = datetime.now()
+    if args.target:
+        scenarios = asyncio.run(_drive(args.target.rstrip("/"), args))
+    else:
+        with tempfile.TemporaryDirectory(prefix="voice-order-bench-") as tmp:
+            workdir = Path(tmp)
+            mock_port, app_port = _free_port(), _free_port()
+            mock_url = f"http://127.0.0.1:{mock_port}"
+            mock_args = [
+                sys.executable, "-m", "bench.mock_providers", "--port", str(mock_port),
+                "--latency", args.latency, "--stt-latency", args.stt_latency,
+                "--chunk-ms", str(args.chunk_ms), "--error-rate", str(args.error_rate), "--seed", str(args.seed),
+            ]
+            env = {**os.environ, "VOICE_ORDER_ENV_FILE": str(_server_env_file(workdir, args.preset, mock_url, args.env))}
+            app_args = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning"]
+            with _process(mock_args, f"{mock_url}/stats", log_path=workdir / "mock.log"), \
+                    _process(app_args, f"http://127.0.0.1:{app_port}/health", env=env, log_path=workdir / "server.log"):
+                scenarios = asyncio.run(_drive(f"http://127.0.0.1:{app_port}", args))
+
+    result = {
+        "startedAt": started_at.isoformat(timespec="seconds"),
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "target": args.target or "spawned",
+        "preset": None if args.target else args.preset,
+        "settings": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "latency": args.latency,
+            "sttLatency": args.stt_latency,
+            "chunkMs": args.chunk_ms,
+            "errorRate": args.error_rate,
+            "seed": args.seed,
+            "env": args.env,
+        },
+        "scenarios": scenarios,
+    }
+    output = args.output or RESULTS_DIR / f"{result['preset'] or 'target'}-{started_at:%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"\n결과 저장: {output}")
+    if args.compare:
+        compare(json.loads(args.compare.read_text(encoding="utf-8")), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from app.history import compact_history
+from app.schemas import ChatMessage
+
+
+def test_folded_name_and_address_survive_compaction():
+    messages = [
+        ChatMessage(role="system", content="system prompt"),
+        ChatMessage(role="assistant", content="안녕하세요, 김철수 고객님. 원하시는 디너 주문을 말씀해 주세요."),
+        ChatMessage(role="user", content="주소는 서울 강남구 역삼동 123-4 101호예요. 프렌치 디너 주세요"),
+    ]
+    for turn in range(30):
+        messages.append(ChatMessage(role="assistant", content="네, 알겠습니다. 더 필요하신 것이 있으신가요?"))
+        messages.append(ChatMessage(role="user", content=f"와인 {turn}잔 더 추가해 주세요. 스테이크도 하나 더요." * 3))
+
+    compacted = compact_history(messages, budget=500, keep_turns=6)
+    note = compacted[1].content
+    assert len(compacted) < len(messages)
+    assert "customerName: 김철수" in note
+    assert "서울 강남구 역삼동 123-4 101호" in note
@@ -0,0 +1,28 @@
+from app.order_extractor import extract_order
+from app.schemas import ChatMessage
+
+READBACK = "프렌치 디너 심플 스타일 1세트, 내일 저녁 7시에 배달해 드리겠습니다."
+
+
+def _extract(user_text: str):
+    history = [
+        ChatMessage(role="assistant", content="안녕하세요, 김철수 고객님. 원하시는 디너 주문을 말씀해 주세요."),
+        ChatMessage(role="user", content=f"프렌치 디너 심플로 내일 저녁 7시에 주세요. {user_text}"),
+    ]
+    return extract_order(history, READBACK, "2025-01-01")
+
+
+def test_plain_order_is_confident():
+    extraction = _extract("")
+    assert extraction.confidence == 1.0
+    assert extraction.summary.customerName == "김철수"
+
+
+def test_address_with_particle_falls_back_to_llm():
+    extraction = _extract("강남구 역삼동으로 보내주세요")
+    assert extraction.confidence == 0.0
+    assert "address mentioned" in extraction.reasons
+
+
+def test_district_with_particle_falls_back_to_llm():
+    assert _extract("강남구에 살아요").confidence == 0.0
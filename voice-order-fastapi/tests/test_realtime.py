@@ -0,0 +1,55 @@
+import asyncio
+import io
+import wave
+
+from app import realtime
+from app.realtime import PartialTranscriber, UtteranceBuffer, join_transcripts
+from app.stt import SpeechRecognizer
+
+_RATE = 16000
+
+
+class _FakeRecognizer(SpeechRecognizer):
+    name = "fake"
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+
+    async def transcribe(self, audio, filename, language):
+        with wave.open(io.BytesIO(audio.read()), "rb") as wav:
+            self.seconds += wav.getnframes() / wav.getframerate()
+        return "주문"
+
+
+def test_join_transcripts_drops_overlapping_words():
+    assert join_transcripts("불고기 버거 두 개", "두 개 그리고 콜라") == "불고기 버거 두 개 그리고 콜라"
+    assert join_transcripts("불고기 버거 두", "두 개, 콜라") == "불고기 버거 두 개, 콜라"
+    assert join_transcripts("", "콜라") == "콜라"
+
+
+def test_pcm16_partials_send_each_second_of_audio_about_once(monkeypatch):
+    recognizer = _FakeRecognizer()
+    monkeypatch.setattr(realtime, "get_speech_recognizer", lambda: recognizer)
+    monkeypatch.setattr(realtime.settings, "VOICE_ORDER_REALTIME_PARTIAL_INTERVAL_MS", 0)
+    partial_texts = []
+
+    async def on_partial(text):
+        partial_texts.append(text)
+
+    async def speak() -> str:
+        buffer = UtteranceBuffer("pcm16", _RATE)
+        partials = PartialTranscriber("ko", on_partial)
+        try:
+            for _ in range(10):
+                buffer.append(b"\x00\x10" * _RATE)
+                partials.maybe_start(buffer)
+                await asyncio.sleep(0)
+            return await partials.finish(buffer)
+        finally:
+            buffer.reset()
+
+    transcript = asyncio.run(speak())
+    assert partial_texts
+    assert transcript
+    # 10초 발화: 전체를 매번 다시 보내면 약 65초, 구간만 보내면 겹침을 더해도 13초 이하
+    assert recognizer.seconds <= 13
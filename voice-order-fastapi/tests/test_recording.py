@@ -0,0 +1,21 @@
+from app.recording import ADDRESS_PLACEHOLDER, NAME_PLACEHOLDER, scrub_messages
+
+
+def _scrub(*contents: str) -> list:
+    return [message["content"] for message in scrub_messages([{"role": "user", "content": text} for text in contents])]
+
+
+def test_menu_words_are_not_names():
+    text = "저는 스테이크 하나 더 추가해주세요. 프렌치 디너 와인 2병"
+    assert _scrub(text) == [text]
+
+
+def test_names_without_honorific_are_scrubbed():
+    assert _scrub("김민수예요.", "이건 고객님 주문이에요") == [f"{NAME_PLACEHOLDER}예요.", "이건 고객님 주문이에요"]
+
+
+def test_addresses_without_region_are_scrubbed():
+    assert _scrub("역삼동 123-4로 보내주세요", "강남구 역삼동으로 와주세요") == [
+        f"{ADDRESS_PLACEHOLDER}로 보내주세요",
+        f"{ADDRESS_PLACEHOLDER}으로 와주세요",
+    ]